@@ -0,0 +1,454 @@
+import os
+import struct
+import threading
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+from galeria import linhas_galeria
+
+# Arquivo de dados: cabeçalho de 64 bytes e, depois dele, linhas float32
+# normalizadas, só acrescentadas. O número de linhas no cabeçalho é o ponto
+# de confirmação: o que estiver além dele é lixo de uma gravação interrompida.
+# O cabeçalho também guarda os totais de linhas ativas e de pessoas e se eles
+# batem com a tabela de ids; arquivos antigos têm zeros nesses bytes e são
+# recontados uma vez na abertura
+ASSINATURA_DADOS = b'RFEA'
+CABECALHO_DADOS = struct.Struct('<4sII8sqqqqB')
+ASSINATURA_IDS = b'RFEI'
+CABECALHO_IDS = struct.Struct('<4sI8s')
+TAMANHO_CABECALHO = 64
+VERSAO_FORMATO = 1
+
+# Tabela de ids: um registro por linha do arquivo de dados. Uma pessoa pode
+# ter várias linhas ativas (encoding principal e modelos adicionais), todas
+# com a versão da galeria em que foram gravadas; arquivos anteriores aos
+# modelos têm versão 0 nos bytes que eram de preenchimento
+TIPO_REGISTRO = np.dtype({
+    'names': ['pessoa_id', 'ativo', 'versao'],
+    'formats': ['<i8', 'u1', '<u4'],
+    'offsets': [0, 8, 12],
+    'itemsize': 16,
+})
+
+
+def caminho_armazem(db_path):
+    """Arquivo de encodings associado ao banco"""
+    return os.path.splitext(db_path)[0] + '.encodings'
+
+
+class ArmazemEncodings:
+    """Galeria em disco, mapeada em memória, para galerias que não cabem na RAM
+
+    Cada cadastro ou alteração acrescenta as linhas da pessoa (uma por modelo)
+    ao arquivo de dados e os registros (id, ativo, versão) à tabela de ids; as
+    linhas antigas só são marcadas como inativas. O arquivo guarda a versão
+    da galeria no banco, então abrir custa apenas o mapeamento e as
+    alterações desde a última sincronização.
+    A busca percorre o arquivo em blocos contíguos de `linhas_bloco` linhas.
+    """
+
+    def __init__(self, caminho, linhas_bloco=65536):
+        self.caminho = caminho
+        self.caminho_ids = caminho + '.ids'
+        self.caminho_trava = caminho + '.trava'
+        self.linhas_bloco = linhas_bloco
+
+        self.versao = 0
+        self.dimensao = 0
+        self._token = b''
+        self._ativos = 0
+        self._pessoas = 0
+        # (matriz, registros) da última confirmação; trocado de uma vez a cada sincronização
+        self._estado = (np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=TIPO_REGISTRO))
+        self._lock = threading.Lock()
+
+        with self._travar():
+            if not self._abrir():
+                self._criar_vazio()
+
+    # -- arquivos ----------------------------------------------------------
+
+    @contextmanager
+    def _travar(self):
+        """Trava exclusiva entre processos para gravar nos arquivos
+
+        O gerenciador (cadastros) e o reconhecimento podem sincronizar o mesmo
+        arquivo: cada um acrescenta linhas na posição que tem em memória e a
+        reconstrução troca os arquivos. Sob a trava, quem grava relê antes o
+        cabeçalho (ver _recarregar). É um flock em um arquivo ao lado, não
+        reentrante: só os métodos públicos a adquirem.
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self.caminho_trava, 'a+b') as trava:
+            fcntl.flock(trava.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(trava.fileno(), fcntl.LOCK_UN)
+
+    def _ler_cabecalho(self):
+        """Campos do cabeçalho do arquivo de dados, ou None se ele não puder ser lido"""
+        try:
+            with open(self.caminho, 'rb') as arquivo:
+                return CABECALHO_DADOS.unpack(arquivo.read(CABECALHO_DADOS.size))
+        except (OSError, struct.error):
+            return None
+
+    def _abrir(self):
+        """Mapeia os arquivos existentes; retorna False se faltarem ou forem inválidos"""
+        cabecalho = self._ler_cabecalho()
+        try:
+            with open(self.caminho_ids, 'rb') as arquivo:
+                assinatura_ids, formato_ids, token_ids = CABECALHO_IDS.unpack(arquivo.read(CABECALHO_IDS.size))
+        except (OSError, struct.error):
+            return False
+        if cabecalho is None:
+            return False
+        assinatura, formato, dimensao, token, versao, linhas, ativos, pessoas, consistente = cabecalho
+
+        if (assinatura, assinatura_ids) != (ASSINATURA_DADOS, ASSINATURA_IDS) \
+                or formato != VERSAO_FORMATO or formato_ids != VERSAO_FORMATO or token != token_ids:
+            print("Arquivo de encodings inválido, reconstruindo")
+            return False
+
+        tamanho_dados = TAMANHO_CABECALHO + linhas * dimensao * 4
+        tamanho_ids = TAMANHO_CABECALHO + linhas * TIPO_REGISTRO.itemsize
+        if os.path.getsize(self.caminho) < tamanho_dados or os.path.getsize(self.caminho_ids) < tamanho_ids:
+            print("Arquivo de encodings incompleto, reconstruindo")
+            return False
+
+        # Descartar o que uma gravação interrompida deixou além da última confirmação
+        os.truncate(self.caminho, tamanho_dados)
+        os.truncate(self.caminho_ids, tamanho_ids)
+
+        self.versao = versao
+        self.dimensao = dimensao
+        self._token = token
+        self._mapear(linhas)
+
+        if consistente:
+            self._ativos, self._pessoas = ativos, pessoas
+        else:
+            # Sincronização interrompida (ou arquivo antigo): varrer a tabela de ids uma vez
+            print("Arquivo de encodings não foi fechado corretamente, verificando")
+            self._corrigir_duplicados()
+            self._contar()
+            self._confirmar(linhas)
+        return True
+
+    def _recarregar(self):
+        """Remapeia os arquivos se outro processo gravou neles (com a trava adquirida)
+
+        Retorna o número de pessoas com linhas acrescentadas pelo outro processo.
+        """
+        cabecalho = self._ler_cabecalho()
+        _, registros = self._estado
+        linhas_antes = len(registros)
+        if cabecalho is not None:
+            token, versao, linhas, consistente = cabecalho[3], cabecalho[4], cabecalho[5], cabecalho[8]
+            if (token, versao, linhas) == (self._token, self.versao, linhas_antes) and consistente:
+                return 0
+
+        # Arquivo reconstruído por outro processo: todas as linhas são novas
+        mesmo_arquivo = cabecalho is not None and cabecalho[3] == self._token
+        if not self._abrir():
+            self._criar_vazio()
+        _, registros = self._estado
+        novas = registros['pessoa_id'][linhas_antes:] if mesmo_arquivo else registros['pessoa_id']
+        return len(np.unique(novas))
+
+    def _criar_vazio(self, caminho=None, caminho_ids=None):
+        """Cria arquivos sem linhas (por padrão, no lugar dos atuais)"""
+        self._token = uuid.uuid4().bytes[:8]
+        self.dimensao = 0
+        with open(caminho or self.caminho, 'wb') as arquivo:
+            arquivo.write(CABECALHO_DADOS.pack(ASSINATURA_DADOS, VERSAO_FORMATO, 0, self._token, 0, 0, 0, 0, 1)
+                          .ljust(TAMANHO_CABECALHO, b'\0'))
+        with open(caminho_ids or self.caminho_ids, 'wb') as arquivo:
+            arquivo.write(CABECALHO_IDS.pack(ASSINATURA_IDS, VERSAO_FORMATO, self._token)
+                          .ljust(TAMANHO_CABECALHO, b'\0'))
+        if caminho is None:
+            self.versao = 0
+            self._mapear(0)
+            self._ativos = self._pessoas = 0
+
+    def _mapear(self, linhas):
+        """Mapeia as linhas confirmadas e publica o novo estado"""
+        if linhas and self.dimensao:
+            matriz = np.memmap(self.caminho, dtype=np.float32, mode='r',
+                               offset=TAMANHO_CABECALHO, shape=(linhas, self.dimensao))
+            registros = np.memmap(self.caminho_ids, dtype=TIPO_REGISTRO, mode='r+',
+                                  offset=TAMANHO_CABECALHO, shape=(linhas,))
+        else:
+            matriz = np.empty((0, self.dimensao), dtype=np.float32)
+            registros = np.empty(0, dtype=TIPO_REGISTRO)
+        self._estado = (matriz, registros)
+
+    def _contar(self):
+        """Reconta as linhas ativas e as pessoas distintas entre elas (varre a tabela de ids)"""
+        _, registros = self._estado
+        ativos = registros['ativo'] != 0
+        self._ativos = int(np.count_nonzero(ativos))
+        self._pessoas = len(np.unique(registros['pessoa_id'][ativos]))
+
+    def _confirmar(self, linhas, caminho=None, consistente=True):
+        """Grava versão, dimensão, número de linhas e totais no cabeçalho (ponto de confirmação)
+
+        Com consistente=False, a próxima abertura recontará a tabela de ids:
+        é o estado do arquivo enquanto uma sincronização altera registros.
+        """
+        with open(caminho or self.caminho, 'r+b') as arquivo:
+            arquivo.write(CABECALHO_DADOS.pack(
+                ASSINATURA_DADOS, VERSAO_FORMATO, self.dimensao, self._token, self.versao, linhas,
+                self._ativos, self._pessoas, int(consistente)
+            ))
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+    def _corrigir_duplicados(self):
+        """Mantém só as linhas da versão mais nova de cada pessoa (caso a gravação tenha parado no meio)"""
+        _, registros = self._estado
+        ativas = np.flatnonzero(registros['ativo'])
+        if len(ativas) == 0:
+            return
+        ids = registros['pessoa_id'][ativas]
+        versoes = registros['versao'][ativas]
+
+        # Ordenar por id, versão e posição: a última linha de cada id é a mais nova
+        ordem = np.lexsort((ativas, versoes, ids))
+        ids, versoes = ids[ordem], versoes[ordem]
+        inicio_grupo = np.r_[True, ids[1:] != ids[:-1]]
+        ultima = np.r_[ids[1:] != ids[:-1], True]
+        versao_grupo = versoes[ultima][np.cumsum(inicio_grupo) - 1]
+
+        # Linhas sem versão (arquivo antigo) eram uma por pessoa: só a última fica
+        manter = np.empty(len(ativas), dtype=bool)
+        manter[ordem] = (versoes == versao_grupo) & ((versoes != 0) | ultima)
+        if not manter.all():
+            registros['ativo'][ativas[~manter]] = 0
+            registros.flush()
+
+    def _acrescentar(self, ids, matriz, versao):
+        """Escreve linhas e registros depois da última confirmação; retorna o novo total"""
+        _, registros = self._estado
+        linhas = len(registros)
+        if len(ids) == 0:
+            return linhas
+
+        novos = np.zeros(len(ids), dtype=TIPO_REGISTRO)
+        novos['pessoa_id'] = ids
+        novos['ativo'] = 1
+        novos['versao'] = versao
+
+        with open(self.caminho, 'r+b') as arquivo:
+            arquivo.seek(TAMANHO_CABECALHO + linhas * self.dimensao * 4)
+            arquivo.write(np.ascontiguousarray(matriz, dtype='<f4').tobytes())
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        with open(self.caminho_ids, 'r+b') as arquivo:
+            arquivo.seek(TAMANHO_CABECALHO + linhas * TIPO_REGISTRO.itemsize)
+            arquivo.write(novos.tobytes())
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        return linhas + len(ids)
+
+    def _desativar(self, registros, pessoa_ids):
+        """Marca como inativas as linhas atuais das pessoas informadas
+
+        Retorna (linhas desativadas, pessoas que tinham linhas ativas).
+        """
+        if len(registros) == 0 or not pessoa_ids:
+            return 0, 0
+        alvo = np.isin(registros['pessoa_id'], np.fromiter(pessoa_ids, dtype=np.int64)) \
+            & (registros['ativo'] != 0)
+        if not alvo.any():
+            return 0, 0
+        pessoas = len(np.unique(registros['pessoa_id'][alvo]))
+        registros['ativo'][alvo] = 0
+        registros.flush()
+        return int(np.count_nonzero(alvo)), pessoas
+
+    # -- sincronização com o banco -----------------------------------------
+
+    def sincronizar(self, db):
+        """Aplica as alterações de pessoas_conhecidas desde a versão gravada no arquivo
+
+        Retorna o número de pessoas alteradas (incluindo as que outro processo
+        já gravou no arquivo). Se o banco estiver em uma versão anterior à do
+        arquivo (backup restaurado), o arquivo é reconstruído.
+        """
+        with self._lock, self._travar():
+            alteradas_fora = self._recarregar()
+            if db.obter_versao_galeria() < self.versao:
+                print("Banco anterior ao arquivo de encodings (backup restaurado?), reconstruindo")
+                return self._reconstruir(db)
+
+            versao, alteradas, removidas, modelos = db.obter_alteracoes_pessoas(self.versao, com_modelos=True)
+            if versao == self.versao:
+                return alteradas_fora
+
+            ids_novos, matriz, _ = linhas_galeria(alteradas, modelos)
+            matriz = self._normalizar(matriz)
+
+            if len(ids_novos) and self.dimensao and matriz.shape[1] != self.dimensao:
+                print(f"Aviso: {len(ids_novos)} encodings com dimensão {matriz.shape[1]} ignorados "
+                      f"(arquivo usa {self.dimensao})")
+                ids_novos = ids_novos[:0]
+            elif len(ids_novos) and not self.dimensao:
+                self.dimensao = matriz.shape[1]
+
+            ids_alterados = set(removidas) | {pessoa[0] for pessoa in alteradas}
+            ids_readicionados = set(ids_novos.tolist())
+            _, registros = self._estado
+
+            # Até a última confirmação, registros e totais do cabeçalho podem
+            # divergir; uma interrupção aqui é corrigida na próxima abertura
+            self._confirmar(len(registros), consistente=False)
+
+            # Removidas antes da confirmação; as linhas substituídas só depois,
+            # para que nenhuma busca concorrente fique sem a pessoa
+            linhas = self._acrescentar(ids_novos, matriz, versao)
+            removidas_linhas, removidas_pessoas = self._desativar(registros, ids_alterados - ids_readicionados)
+            self.versao = versao
+            self._confirmar(linhas, consistente=False)
+            self._mapear(linhas)
+            substituidas_linhas, substituidas_pessoas = self._desativar(registros, ids_readicionados)
+
+            # Totais atualizados só com as linhas tocadas, sem varrer o arquivo
+            self._ativos += len(ids_novos) - removidas_linhas - substituidas_linhas
+            self._pessoas += len(ids_readicionados) - removidas_pessoas - substituidas_pessoas
+            self._confirmar(linhas)
+
+            # Muitas linhas substituídas: reescrever o arquivo só com as ativas
+            inativas = linhas - self._ativos
+            if inativas > 1000 and inativas > self._ativos:
+                self._reconstruir(db)
+            return alteradas_fora + len(ids_alterados)
+
+    def reconstruir(self, db):
+        """Reescreve o arquivo a partir do banco (também compacta as linhas inativas)"""
+        with self._lock, self._travar():
+            return self._reconstruir(db)
+
+    def _reconstruir(self, db):
+        versao, pessoas, _, modelos = db.obter_alteracoes_pessoas(0, com_modelos=True)
+        ids, matriz, _ = linhas_galeria(pessoas, modelos)
+        matriz = self._normalizar(matriz)
+
+        # Arquivos novos ao lado e troca com os.replace: mapeamentos em uso
+        # continuam apontando para os arquivos antigos
+        temporario = f"{self.caminho}.{os.getpid()}.tmp"
+        temporario_ids = f"{self.caminho_ids}.{os.getpid()}.tmp"
+        self._criar_vazio(temporario, temporario_ids)
+        self.dimensao = matriz.shape[1] if len(ids) else 0
+
+        registros = np.zeros(len(ids), dtype=TIPO_REGISTRO)
+        registros['pessoa_id'] = ids
+        registros['ativo'] = 1
+        registros['versao'] = versao
+        with open(temporario, 'r+b') as arquivo:
+            arquivo.seek(TAMANHO_CABECALHO)
+            arquivo.write(np.ascontiguousarray(matriz, dtype='<f4').tobytes())
+        with open(temporario_ids, 'r+b') as arquivo:
+            arquivo.seek(TAMANHO_CABECALHO)
+            arquivo.write(registros.tobytes())
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+        self.versao = versao
+        self._ativos = len(ids)
+        self._pessoas = len(np.unique(ids))
+        self._confirmar(len(ids), temporario)
+        os.replace(temporario_ids, self.caminho_ids)
+        os.replace(temporario, self.caminho)
+        self._mapear(len(ids))
+        print(f"Arquivo de encodings reconstruído com {self._pessoas} pessoas ({len(ids)} linhas)")
+        return self._pessoas
+
+    @staticmethod
+    def _normalizar(matriz):
+        matriz = np.asarray(matriz, dtype=np.float32)
+        if len(matriz) == 0:
+            return matriz.reshape(0, matriz.shape[1] if matriz.ndim == 2 else 0)
+        normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+        normas[normas == 0.0] = 1.0
+        return matriz / normas
+
+    # -- busca ---------------------------------------------------------------
+
+    def __len__(self):
+        return self._ativos
+
+    @property
+    def total_pessoas(self):
+        """Pessoas distintas nas linhas ativas (cada uma pode ter vários modelos)"""
+        return self._pessoas
+
+    @property
+    def ids(self):
+        """Ids das linhas ativas (cópia em memória)"""
+        _, registros = self._estado
+        return np.asarray(registros['pessoa_id'][registros['ativo'] != 0])
+
+    @property
+    def matriz(self):
+        """Linhas ativas (cópia em memória; para publicar ou exportar)"""
+        matriz, registros = self._estado
+        return np.asarray(matriz[registros['ativo'] != 0])
+
+    def reconhecer(self, encoding, tolerancia):
+        """Retorna (id, confiança) do melhor match acima da tolerância, ou (None, 0.0)"""
+        if encoding is None or len(encoding) != self.dimensao:
+            return None, 0.0
+        return self.reconhecer_lote([encoding], tolerancia)[0]
+
+    def reconhecer_lote(self, encodings, tolerancia):
+        """Compara todas as faces com o arquivo, percorrido em blocos contíguos"""
+        if len(encodings) == 0:
+            return []
+
+        matriz, registros = self._estado
+        try:
+            consultas = np.asarray(encodings, dtype=np.float32)
+        except (ValueError, TypeError):
+            consultas = None
+
+        # Encodings de dimensões variadas caem na comparação individual
+        if consultas is None or consultas.ndim != 2:
+            return [self.reconhecer(encoding, tolerancia) for encoding in encodings]
+        if self._ativos == 0 or consultas.shape[1] != self.dimensao:
+            return [(None, 0.0)] * len(encodings)
+
+        consultas = self._normalizar(consultas)
+        melhores_ids = np.full(len(consultas), -1, dtype=np.int64)
+        melhores = np.full(len(consultas), -np.inf, dtype=np.float32)
+        indices = np.arange(len(consultas))
+
+        for inicio in range(0, len(matriz), self.linhas_bloco):
+            bloco = matriz[inicio:inicio + self.linhas_bloco]
+            ativos = registros['ativo'][inicio:inicio + self.linhas_bloco] != 0
+            if not ativos.any():
+                continue
+
+            similaridades = consultas @ bloco.T
+            similaridades[:, ~ativos] = -np.inf
+            linhas = np.argmax(similaridades, axis=1)
+            valores = similaridades[indices, linhas]
+
+            melhorou = valores > melhores
+            melhores[melhorou] = valores[melhorou]
+            melhores_ids[melhorou] = registros['pessoa_id'][inicio + linhas[melhorou]]
+
+        return [
+            (int(pessoa_id), float(confianca)) if confianca > tolerancia else (None, 0.0)
+            for pessoa_id, confianca in zip(melhores_ids, melhores)
+        ]
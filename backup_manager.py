@@ -1,9 +1,11 @@
+import csv
 import os
 import shutil
 import sqlite3
 import json
 from datetime import datetime
 import zipfile
+from database import CONSULTA_PRESENCAS, filtro_periodo
 
 class BackupManager:
     def __init__(self, db_path="igreja_reconhecimento.db"):
@@ -14,9 +16,18 @@ class BackupManager:
         if not os.path.exists(self.backup_dir):
             os.makedirs(self.backup_dir)
     
+    def _checkpoint(self):
+        """Grava no arquivo principal as transações que ainda estão no WAL"""
+        if os.path.exists(self.db_path):
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            conn.close()
+    
     def criar_backup_completo(self):
         """Cria backup completo do sistema"""
         try:
+            self._checkpoint()
+            
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_name = f"backup_completo_{timestamp}"
             backup_path = os.path.join(self.backup_dir, f"{backup_name}.zip")
@@ -63,6 +74,7 @@ class BackupManager:
             backup_path = os.path.join(self.backup_dir, backup_name)
             
             if os.path.exists(self.db_path):
+                self._checkpoint()
                 shutil.copy2(self.db_path, backup_path)
                 print(f"Backup dos dados criado: {backup_path}")
                 return backup_path
@@ -74,6 +86,21 @@ class BackupManager:
             print(f"Erro ao criar backup dos dados: {e}")
             return None
     
+    def _escrever_csv(self, csv_path, cabecalho, cursor, tamanho_bloco=1000):
+        """Grava o resultado do cursor no CSV em blocos, sem carregar tudo na memória"""
+        total = 0
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            # O módulo csv coloca entre aspas os campos com vírgula, aspas ou quebra de linha
+            escritor = csv.writer(f)
+            escritor.writerow(cabecalho)
+            while True:
+                bloco = cursor.fetchmany(tamanho_bloco)
+                if not bloco:
+                    break
+                escritor.writerows(bloco)
+                total += len(bloco)
+        return total
+    
     def exportar_pessoas_csv(self):
         """Exporta lista de pessoas para CSV"""
         try:
@@ -81,24 +108,22 @@ class BackupManager:
             csv_path = os.path.join(self.backup_dir, f"pessoas_{timestamp}.csv")
             
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT nome, idade, sexo, etnia, telefone, data_cadastro, ativo
-                FROM pessoas_conhecidas
-                ORDER BY nome
-            ''')
-            
-            pessoas = cursor.fetchall()
-            
-            with open(csv_path, 'w', encoding='utf-8') as f:
-                f.write("Nome,Idade,Sexo,Etnia,Telefone,Data_Cadastro,Ativo\n")
-                for pessoa in pessoas:
-                    linha = ','.join([str(campo) if campo is not None else '' for campo in pessoa])
-                    f.write(linha + '\n')
+            try:
+                cursor = conn.cursor()
+                
+                cursor.execute('''
+                    SELECT nome, idade, sexo, etnia, telefone, data_cadastro, ativo
+                    FROM pessoas_conhecidas
+                    ORDER BY nome
+                ''')
+                
+                total = self._escrever_csv(
+                    csv_path, ["Nome", "Idade", "Sexo", "Etnia", "Telefone", "Data_Cadastro", "Ativo"], cursor
+                )
+            finally:
+                conn.close()
             
-            conn.close()
-            print(f"Lista de pessoas exportada: {csv_path}")
+            print(f"Lista de pessoas exportada: {csv_path} ({total} pessoas)")
             return csv_path
             
         except Exception as e:
@@ -112,40 +137,19 @@ class BackupManager:
             csv_path = os.path.join(self.backup_dir, f"presencas_{timestamp}.csv")
             
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            query = '''
-                SELECT 
-                    rp.data_presenca,
-                    CASE 
-                        WHEN rp.tipo_pessoa = 'conhecida' THEN pc.nome
-                        ELSE pd.codigo_temp
-                    END as identificacao,
-                    rp.tipo_pessoa,
-                    rp.confianca
-                FROM registros_presenca rp
-                LEFT JOIN pessoas_conhecidas pc ON rp.pessoa_id = pc.id AND rp.tipo_pessoa = 'conhecida'
-                LEFT JOIN pessoas_desconhecidas pd ON rp.pessoa_id = pd.id AND rp.tipo_pessoa = 'desconhecida'
-            '''
-            
-            params = []
-            if data_inicio and data_fim:
-                query += ' WHERE DATE(rp.data_presenca) BETWEEN ? AND ?'
-                params = [data_inicio, data_fim]
-            
-            query += ' ORDER BY rp.data_presenca DESC'
-            
-            cursor.execute(query, params)
-            registros = cursor.fetchall()
-            
-            with open(csv_path, 'w', encoding='utf-8') as f:
-                f.write("Data_Presenca,Identificacao,Tipo_Pessoa,Confianca\n")
-                for registro in registros:
-                    linha = ','.join([str(campo) if campo is not None else '' for campo in registro])
-                    f.write(linha + '\n')
+            try:
+                cursor = conn.cursor()
+                
+                filtro, params = filtro_periodo(data_inicio, data_fim)
+                cursor.execute(CONSULTA_PRESENCAS + filtro + ' ORDER BY rp.data_presenca DESC', params)
+                
+                total = self._escrever_csv(
+                    csv_path, ["Data_Presenca", "Identificacao", "Tipo_Pessoa", "Confianca"], cursor
+                )
+            finally:
+                conn.close()
             
-            conn.close()
-            print(f"Relatório de presenças exportado: {csv_path}")
+            print(f"Relatório de presenças exportado: {csv_path} ({total} registros)")
             return csv_path
             
         except Exception as e:
@@ -189,6 +193,7 @@ class BackupManager:
             
             # Fazer backup do banco atual antes de restaurar
             if os.path.exists(self.db_path):
+                self._checkpoint()
                 backup_atual = f"{self.db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                 shutil.copy2(self.db_path, backup_atual)
                 print(f"Backup do banco atual salvo em: {backup_atual}")
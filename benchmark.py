@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do Sistema de Reconhecimento Facial
+Mede desempenho dos componentes com dados sintéticos
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Dimensão dos encodings gerados pelo extrator de características
+DIMENSAO_ENCODING = 261
+
+
+def gerar_galeria_sintetica(n_pessoas, dimensao=DIMENSAO_ENCODING, n_grupos=64, dispersao=1.0, semente=0):
+    """Gera encodings sintéticos agrupados (rostos reais não são uniformes no espaço)"""
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(size=(n_grupos, dimensao)).astype(np.float32)
+    grupos = rng.integers(0, n_grupos, n_pessoas)
+    encodings = centros[grupos] + dispersao * rng.normal(size=(n_pessoas, dimensao)).astype(np.float32)
+    return np.arange(1, n_pessoas + 1, dtype=np.int64), encodings
+
+
+def gerar_consultas(encodings, n_consultas, ruido=0.3, semente=1):
+    """Gera consultas como versões ruidosas de encodings da galeria"""
+    rng = np.random.default_rng(semente)
+    escolhidos = rng.integers(0, len(encodings), n_consultas)
+    consultas = encodings[escolhidos] + ruido * rng.normal(size=(n_consultas, encodings.shape[1])).astype(np.float32)
+    return consultas.astype(np.float32)
+
+
+def benchmark_indice(n_pessoas=100000, n_consultas=500, sondas=(1, 2, 4, 8, 16, 32)):
+    """Recall@1 e latência do índice IVF comparado à busca exata"""
+    from galeria import GaleriaFacial
+    from indice_galeria import criar_indice
+
+    print(f"\n=== ÍNDICE DA GALERIA: {n_pessoas} encodings, {n_consultas} consultas ===")
+    ids, encodings = gerar_galeria_sintetica(n_pessoas)
+    consultas = gerar_consultas(encodings, n_consultas)
+
+    galeria_exata = GaleriaFacial(ids, encodings)
+    inicio = time.perf_counter()
+    esperados = [galeria_exata.reconhecer(consulta, -1.0)[0] for consulta in consultas]
+    latencia_exata = (time.perf_counter() - inicio) / n_consultas * 1000
+
+    inicio = time.perf_counter()
+    indice = criar_indice('ivf')
+    galeria_ivf = GaleriaFacial(ids, encodings, indice=indice)
+    tempo_construcao = time.perf_counter() - inicio
+
+    print(f"Construção do IVF: {tempo_construcao:.2f}s ({len(indice.centroides)} listas)")
+    print(f"\n{'Índice':<14} {'Recall@1':<10} {'Latência (ms)':<14} {'Speedup':<8}")
+    print("-"*50)
+    print(f"{'exato':<14} {1.0:<10.3f} {latencia_exata:<14.3f} {1.0:<8.1f}")
+
+    for n_sondas in sondas:
+        indice.n_sondas = n_sondas
+        inicio = time.perf_counter()
+        obtidos = [galeria_ivf.reconhecer(consulta, -1.0)[0] for consulta in consultas]
+        latencia = (time.perf_counter() - inicio) / n_consultas * 1000
+        recall = np.mean([obtido == esperado for obtido, esperado in zip(obtidos, esperados)])
+        print(f"{'ivf/' + str(n_sondas):<14} {recall:<10.3f} {latencia:<14.3f} {latencia_exata / latencia:<8.1f}")
+
+    return True
+
+
+def carregar_quadros(fonte, n_quadros):
+    """Lê até n_quadros de uma câmera (índice) ou arquivo de vídeo para a memória"""
+    import cv2
+
+    cap = cv2.VideoCapture(int(fonte) if str(fonte).isdigit() else fonte)
+    quadros = []
+    try:
+        while len(quadros) < n_quadros:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            quadros.append(frame)
+    finally:
+        cap.release()
+    return quadros
+
+
+def benchmark_modos_deteccao(fonte=0, n_quadros=200):
+    """FPS do pipeline 'completo' (FaceDetection + FaceMesh) versus 'malha' (só FaceMesh)"""
+    from reconhecimento_facial import FaceRecognitionSystem
+
+    print(f"\n=== MODOS DE DETECÇÃO: {fonte} ===")
+    quadros = carregar_quadros(fonte, n_quadros)
+    if not quadros:
+        print("Não foi possível ler quadros da fonte")
+        return False
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        sistema = FaceRecognitionSystem(db_path=os.path.join(diretorio, "benchmark.db"))
+        resultados = {}
+        try:
+            for modo in ('completo', 'malha'):
+                sistema.definir_modo_deteccao(modo)
+                inicio = time.perf_counter()
+                for frame in quadros:
+                    sistema.processar_frame(frame.copy())
+                resultados[modo] = len(quadros) / (time.perf_counter() - inicio)
+        finally:
+            sistema.encerrar()
+
+    print(f"\n{'Modo':<12} {'FPS':<10} {'ms/quadro':<10}")
+    print("-"*34)
+    for modo, fps in resultados.items():
+        print(f"{modo:<12} {fps:<10.1f} {1000 / fps:<10.2f}")
+    print(f"\nGanho do modo 'malha': {resultados['malha'] / resultados['completo']:.2f}x")
+    return True
+
+
+def benchmark_sem_interface(fonte=0, n_quadros=200):
+    """Custo por quadro com desenho e textos (interface) versus o modo sem interface"""
+    import cv2
+    from reconhecimento_facial import FaceRecognitionSystem
+    from rastreador import RastreadorFaces
+
+    print(f"\n=== MODO SEM INTERFACE: {fonte} ===")
+    quadros = carregar_quadros(fonte, n_quadros)
+    if not quadros:
+        print("Não foi possível ler quadros da fonte")
+        return False
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        sistema = FaceRecognitionSystem(db_path=os.path.join(diretorio, "benchmark.db"))
+        resultados = {}
+        try:
+            for nome, desenhar in (('interface', True), ('sem interface', False)):
+                sistema.desenhar = desenhar
+                sistema.rastreador = RastreadorFaces(
+                    intervalo_atualizacao=sistema.rastreador.intervalo_atualizacao,
+                    confianca_minima=sistema.rastreador.confianca_minima
+                )
+                sistema.contador_quadros = 0
+                tempo = 0.0
+                for frame in quadros:
+                    # A cópia só preserva o quadro original entre as rodadas; fica fora da medição
+                    frame = frame.copy()
+                    inicio = time.perf_counter()
+                    frame = sistema.processar_frame(frame)
+                    if desenhar:
+                        # Mesmos textos que a renderização escreve antes do imshow
+                        for linha, texto in enumerate(("Pessoas conhecidas", "Tolerancia", "Inferencia")):
+                            cv2.putText(frame, texto, (10, 30 * (linha + 1)),
+                                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                    tempo += time.perf_counter() - inicio
+                resultados[nome] = tempo / len(quadros)
+        finally:
+            sistema.encerrar()
+
+    print(f"\n{'Modo':<15} {'ms/quadro':<10} {'FPS':<10}")
+    print("-"*37)
+    for nome, segundos in resultados.items():
+        print(f"{nome:<15} {segundos * 1000:<10.2f} {1 / segundos:<10.1f}")
+    economia = resultados['interface'] - resultados['sem interface']
+    print(f"\nEconomia por quadro: {economia * 1000:.2f} ms "
+          f"({100 * economia / resultados['interface']:.1f}%); o imshow, ausente aqui, também deixa de ser pago")
+    return True
+
+
+def benchmark_banco(n_insercoes=2000):
+    """Inserções de presença por segundo: conexão por operação versus conexão persistente"""
+    import sqlite3
+    from database import DatabaseManager
+
+    print(f"\n=== BANCO DE DADOS: {n_insercoes} inserções ===")
+    resultados = {}
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # Antes: uma conexão, um commit (com fsync) e um close por inserção
+        db_path = os.path.join(diretorio, "antes.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE registros_presenca (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pessoa_id INTEGER,
+                data_presenca TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                tipo_pessoa TEXT,
+                confianca REAL
+            )
+        ''')
+        conn.close()
+
+        inicio = time.perf_counter()
+        for i in range(n_insercoes):
+            conn = sqlite3.connect(db_path)
+            conn.execute(
+                'INSERT INTO registros_presenca (pessoa_id, tipo_pessoa, confianca) VALUES (?, ?, ?)',
+                (i, 'conhecida', 0.9)
+            )
+            conn.commit()
+            conn.close()
+        resultados['conexão por operação'] = n_insercoes / (time.perf_counter() - inicio)
+
+        # Depois: conexão persistente da thread, WAL e synchronous=NORMAL
+        db = DatabaseManager(os.path.join(diretorio, "depois.db"))
+        inicio = time.perf_counter()
+        for i in range(n_insercoes):
+            db.registrar_presenca(i, 'conhecida', 0.9)
+        resultados['conexão persistente (WAL)'] = n_insercoes / (time.perf_counter() - inicio)
+        db.fechar()
+
+    print(f"\n{'Modo':<28} {'Inserções/s':<12}")
+    print("-"*42)
+    for modo, taxa in resultados.items():
+        print(f"{modo:<28} {taxa:<12.0f}")
+    return True
+
+
+def gerar_ano_presencas(db, n_registros, n_pessoas=2000, ano=2024, semente=0):
+    """Preenche o banco com um ano sintético de presenças (cultos às quartas e domingos)"""
+    from datetime import datetime, timedelta
+    from formato_encoding import serializar_encoding
+
+    rng = np.random.default_rng(semente)
+    conn = db._conectar()
+    conn.executemany(
+        'INSERT INTO pessoas_conhecidas (nome, idade, sexo, etnia, telefone, encoding) VALUES (?, ?, ?, ?, ?, ?)',
+        [(f"Pessoa {i}", 30, 'M', '', '', serializar_encoding(np.zeros(4))) for i in range(n_pessoas)]
+    )
+
+    dias = [datetime(ano, 1, 1) + timedelta(days=d) for d in range(365)]
+    cultos = [dia for dia in dias if dia.weekday() in (2, 6)]
+    escolhidos = rng.integers(0, len(cultos), n_registros)
+    segundos = rng.integers(18 * 3600, 21 * 3600, n_registros)
+    pessoas = rng.integers(1, n_pessoas + 1, n_registros)
+
+    linhas = (
+        (int(pessoa), (cultos[culto] + timedelta(seconds=int(segundo))).strftime('%Y-%m-%d %H:%M:%S'),
+         'conhecida', 0.9)
+        for pessoa, culto, segundo in zip(pessoas, escolhidos, segundos)
+    )
+    conn.executemany(
+        'INSERT INTO registros_presenca (pessoa_id, data_presenca, tipo_pessoa, confianca) VALUES (?, ?, ?, ?)',
+        linhas
+    )
+    conn.commit()
+
+
+def benchmark_relatorios(n_registros=500000):
+    """Relatórios por período: DATE() BETWEEN sem índice versus intervalo semiaberto com índice"""
+    from database import CONSULTA_PRESENCAS, DatabaseManager
+
+    print(f"\n=== RELATÓRIOS: {n_registros} presenças em um ano ===")
+    periodos = [('dia', '2024-06-16', '2024-06-16'), ('mês', '2024-06-01', '2024-06-30'),
+                ('trimestre', '2024-04-01', '2024-06-30')]
+
+    # Mesma consulta do relatório; só o filtro de período é o antigo
+    consulta_antiga = (CONSULTA_PRESENCAS + ' WHERE DATE(rp.data_presenca) BETWEEN ? AND ?'
+                       ' ORDER BY rp.data_presenca DESC')
+    indices = ('idx_registros_presenca_data', 'idx_registros_presenca_pessoa')
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        db = DatabaseManager(os.path.join(diretorio, "relatorios.db"))
+        gerar_ano_presencas(db, n_registros)
+        conn = db._conectar()
+
+        # Antes: sem índices e com DATE() na coluna
+        for indice in indices:
+            conn.execute(f'DROP INDEX IF EXISTS {indice}')
+        antes = {}
+        for nome, inicio, fim in periodos:
+            t = time.perf_counter()
+            total = len(conn.execute(consulta_antiga, (inicio, fim)).fetchall())
+            antes[nome] = (time.perf_counter() - t, total)
+
+        # Depois: índices da migração e a consulta do relatório
+        db._migrar_indices_relatorios(conn)
+        conn.commit()
+        depois = {}
+        for nome, inicio, fim in periodos:
+            t = time.perf_counter()
+            total = len(db.obter_relatorio_presencas(inicio, fim))
+            depois[nome] = (time.perf_counter() - t, total)
+        db.fechar()
+
+    print(f"\n{'Período':<12} {'Linhas':<10} {'Antes (ms)':<12} {'Depois (ms)':<12} {'Ganho':<8}")
+    print("-"*58)
+    for nome, _, _ in periodos:
+        (tempo_antes, linhas_antes), (tempo_depois, linhas_depois) = antes[nome], depois[nome]
+        aviso = "" if linhas_antes == linhas_depois else "  (resultados diferentes!)"
+        print(f"{nome:<12} {linhas_depois:<10} {tempo_antes * 1000:<12.1f} {tempo_depois * 1000:<12.1f} "
+              f"{tempo_antes / tempo_depois:<.1f}x{aviso}")
+    return True
+
+
+def benchmark_trabalhadores(n_pessoas=50000, n_faces=20000, max_trabalhadores=None, tamanho_lote=32):
+    """Escalonamento do pool de reconhecimento de 1 a N trabalhadores (threads e processos)"""
+    from galeria import GaleriaFacial
+    from pipeline_video import FilaProcessamento
+    from pool_reconhecimento import PoolReconhecimento, ReconhecedorProcessos
+
+    max_trabalhadores = max_trabalhadores or os.cpu_count() or 1
+    print(f"\n=== TRABALHADORES DE RECONHECIMENTO: galeria de {n_pessoas}, {n_faces} faces ===")
+    ids, encodings = gerar_galeria_sintetica(n_pessoas)
+    faces = gerar_consultas(encodings, n_faces)
+    galeria = GaleriaFacial(ids, encodings)
+    tolerancia = 0.0
+
+    def executar(n, reconhecer):
+        # Fluxo sintético: uma face por item, rastros repetidos como em uma câmera real
+        fila = FilaProcessamento(capacidade=n_faces, politica='bloquear')
+        for i, face in enumerate(faces):
+            fila.colocar((face, i, i % 50, time.perf_counter()))
+
+        # Escritor simulado: o registro roda em série, como no sistema
+        registrados = {}
+        pool = PoolReconhecimento(
+            fila, reconhecer, lambda item, resultado: registrados.__setitem__(item[1], resultado[0]),
+            trabalhadores=n, tamanho_lote=tamanho_lote
+        )
+        inicio = time.perf_counter()
+        pool.iniciar()
+        pool.parar(timeout=None)
+        return time.perf_counter() - inicio, registrados
+
+    esperado = None
+    print(f"\n{'Tipo':<10} {'Trab.':<7} {'Faces/s':<12} {'Speedup':<8}")
+    print("-"*40)
+    for tipo in ('threads', 'processos'):
+        base = None
+        for n in range(1, max_trabalhadores + 1):
+            reconhecedor = None
+            if tipo == 'threads':
+                reconhecer = lambda lote: galeria.reconhecer_lote(lote, tolerancia)
+            else:
+                reconhecedor = ReconhecedorProcessos(n, galeria)
+                # Aquecer: cada processo anexa à galeria antes da medição
+                for _ in range(n * 2):
+                    reconhecedor.reconhecer_lote(faces[:1], tolerancia)
+                reconhecer = lambda lote: reconhecedor.reconhecer_lote(lote, tolerancia)
+
+            try:
+                decorrido, registrados = executar(n, reconhecer)
+            finally:
+                if reconhecedor is not None:
+                    reconhecedor.encerrar()
+
+            if esperado is None:
+                esperado = registrados
+            aviso = "" if registrados == esperado else "  (resultados diferentes!)"
+            taxa = n_faces / decorrido
+            base = base or taxa
+            print(f"{tipo:<10} {n:<7} {taxa:<12.0f} {taxa / base:<8.2f}{aviso}")
+
+    print("\nObs.: com threads, o BLAS do NumPy já usa vários núcleos em cada produto de matrizes;")
+    print("o ganho de mais trabalhadores aparece sobretudo com lotes pequenos ou BLAS de uma thread.")
+    return True
+
+
+def menu_benchmark():
+    """Menu interativo de benchmarks"""
+    while True:
+        print("\n" + "="*50)
+        print("    BENCHMARKS DO SISTEMA")
+        print("="*50)
+        print("1. Índice da Galeria (recall x latência)")
+        print("2. Modos de Detecção (FPS)")
+        print("3. Banco de Dados (inserções/s)")
+        print("4. Modo sem Interface (ms/quadro)")
+        print("5. Relatórios de Presença (consultas por período)")
+        print("6. Trabalhadores de Reconhecimento (1 a N núcleos)")
+        print("0. Sair")
+        print("-"*50)
+
+        opcao = input("Escolha uma opção: ").strip()
+
+        if opcao == "1":
+            n_pessoas = input("Tamanho da galeria (padrão: 100000): ").strip()
+            benchmark_indice(int(n_pessoas) if n_pessoas.isdigit() else 100000)
+        elif opcao == "2":
+            fonte = input("Câmera (índice) ou arquivo de vídeo (padrão: 0): ").strip()
+            benchmark_modos_deteccao(fonte or 0)
+        elif opcao == "3":
+            benchmark_banco()
+        elif opcao == "4":
+            fonte = input("Câmera (índice) ou arquivo de vídeo (padrão: 0): ").strip()
+            benchmark_sem_interface(fonte or 0)
+        elif opcao == "5":
+            n_registros = input("Presenças no ano (padrão: 500000): ").strip()
+            benchmark_relatorios(int(n_registros) if n_registros.isdigit() else 500000)
+        elif opcao == "6":
+            n_pessoas = input("Tamanho da galeria (padrão: 50000): ").strip()
+            benchmark_trabalhadores(int(n_pessoas) if n_pessoas.isdigit() else 50000)
+        elif opcao == "0":
+            print("Saindo dos benchmarks...")
+            break
+        else:
+            print("Opção inválida!")
+
+        input("\nPressione Enter para continuar...")
+
+
+if __name__ == "__main__":
+    try:
+        menu_benchmark()
+    except KeyboardInterrupt:
+        print("\n\nBenchmark interrompido pelo usuário.")
@@ -1,16 +1,99 @@
 import sqlite3
 import os
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta, timezone
 import uuid
+from formato_encoding import formato_binario, carregar_encoding_legado, serializar_encoding
+
+def timestamp_utc(momento=None):
+    """Data/hora no mesmo formato UTC do CURRENT_TIMESTAMP do SQLite"""
+    momento = momento or datetime.now(timezone.utc)
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc)
+    return momento.strftime('%Y-%m-%d %H:%M:%S')
+
+def intervalo_datas(data_inicio, data_fim):
+    """Converte dias locais 'AAAA-MM-DD' (inclusivos) no intervalo UTC semiaberto [início, fim + 1 dia)
+    
+    Os dias são locais, como nos resumos de presença (DATE(..., 'localtime'));
+    os limites vão para UTC, o formato de data_presenca. Comparar a coluna
+    direto com os limites usa o índice, ao contrário de DATE(data_presenca)
+    BETWEEN ? AND ?.
+    """
+    inicio = datetime.strptime(str(data_inicio)[:10], '%Y-%m-%d')
+    fim = datetime.strptime(str(data_fim)[:10], '%Y-%m-%d') + timedelta(days=1)
+    return timestamp_utc(inicio.astimezone()), timestamp_utc(fim.astimezone())
+
+# Relatório de presenças: data, nome ou código temporário, tipo e confiança
+CONSULTA_PRESENCAS = '''
+    SELECT 
+        rp.data_presenca,
+        CASE 
+            WHEN rp.tipo_pessoa = 'conhecida' THEN pc.nome
+            ELSE pd.codigo_temp
+        END as identificacao,
+        rp.tipo_pessoa,
+        rp.confianca
+    FROM registros_presenca rp
+    LEFT JOIN pessoas_conhecidas pc ON rp.pessoa_id = pc.id AND rp.tipo_pessoa = 'conhecida'
+    LEFT JOIN pessoas_desconhecidas pd ON rp.pessoa_id = pd.id AND rp.tipo_pessoa = 'desconhecida'
+'''
+
+def filtro_periodo(data_inicio=None, data_fim=None):
+    """Cláusula WHERE (e parâmetros) do período sobre rp.data_presenca; vazia sem datas"""
+    if data_inicio and data_fim:
+        return ' WHERE rp.data_presenca >= ? AND rp.data_presenca < ?', list(intervalo_datas(data_inicio, data_fim))
+    return '', []
+
+def gerar_codigo_temp():
+    """Gera o código temporário de uma pessoa desconhecida"""
+    return f"TEMP_{uuid.uuid4().hex[:8].upper()}"
 
 class DatabaseManager:
     def __init__(self, db_path="igreja_reconhecimento.db"):
         self.db_path = db_path
+        
+        # Uma conexão persistente por thread (sqlite3 não compartilha conexões entre threads)
+        self._local = threading.local()
+        self._conexoes = []
+        self._lock_conexoes = threading.Lock()
+        
         self.init_database()
     
+    def _conectar(self):
+        """Retorna a conexão da thread atual, criando-a na primeira chamada"""
+        conn = getattr(self._local, 'conn', None)
+        
+        if conn is None:
+            # O cache de statements da conexão reaproveita as consultas preparadas
+            conn = sqlite3.connect(self.db_path, timeout=30, cached_statements=256)
+            # WAL permite leituras simultâneas à escrita (gerenciador e reconhecimento);
+            # synchronous=NORMAL dispensa o fsync a cada commit, mantendo a integridade
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            
+            self._local.conn = conn
+            with self._lock_conexoes:
+                self._conexoes.append(conn)
+        
+        return conn
+    
+    def fechar(self):
+        """Fecha todas as conexões abertas pelo gerenciador"""
+        with self._lock_conexoes:
+            for conn in self._conexoes:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    # Conexões de outras threads só podem ser fechadas por elas
+                    pass
+            self._conexoes = []
+        self._local = threading.local()
+    
     def init_database(self):
         """Inicializa o banco de dados com as tabelas necessárias"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
         # Tabela de pessoas conhecidas
@@ -74,58 +157,582 @@ class DatabaseManager:
             VALUES ('intervalo_deteccao', '5', 'Intervalo mínimo entre detecções da mesma pessoa (segundos)')
         ''')
         
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('tipo_indice', 'exato', 'Índice da galeria: exato (força bruta) ou ivf (aproximado, para galerias grandes)')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('sondas_indice', '8', 'Listas visitadas por busca no índice ivf (mais = maior recall, mais lento)')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('modo_deteccao', 'malha', 'Pipeline por frame: malha (só FaceMesh) ou completo (FaceDetection + FaceMesh)')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('intervalo_reconhecimento', '3', 'Segundos até reconhecer novamente um rosto já rastreado')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('intervalo_sincronizacao', '0.5', 'Segundos entre verificações de alterações na galeria feitas por outros processos')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('armazenamento_galeria', 'memoria', 'Galeria de conhecidos: memoria (carregada do banco) ou arquivo (mapeada em disco, para galerias muito grandes)')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('quadros_estavel', '3', 'Com todos os rostos identificados, processar 1 a cada N quadros')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('capacidade_fila', '256', 'Máximo de faces aguardando reconhecimento')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('politica_fila', 'descartar_antigos', 'Fila cheia: descartar_antigos, agrupar_rastro (uma face pendente por rastro) ou bloquear')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('lote_reconhecimento', '32', 'Máximo de faces comparadas com a galeria em uma única chamada')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('trabalhadores_reconhecimento', '1', 'Trabalhadores comparando faces com a galeria em paralelo')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('tipo_trabalhadores', 'threads', 'Trabalhadores de reconhecimento: threads ou processos (galeria em memória compartilhada)')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('modelos_por_pessoa', '5', 'Amostras do rosto capturadas e guardadas no cadastro de cada pessoa')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('tamanho_minimo_face', '120', 'Largura mínima do rosto, em pixels, para uma amostra de cadastro')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('nitidez_minima', '60', 'Nitidez mínima (variância do Laplaciano) para uma amostra de cadastro')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('limite_desconhecidas', '5000', 'Visitantes desconhecidos mantidos em memória para reconhecer o mesmo rosto (os vistos há mais tempo saem primeiro)')
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO configuracoes (chave, valor, descricao) 
+            VALUES ('tolerancia_desconhecidas', '0.998', 'Similaridade mínima para tratar um desconhecido como um visitante já registrado (mais alta que a de reconhecimento)')
+        ''')
+        
         conn.commit()
-        conn.close()
+        
+        self._aplicar_migracoes(conn)
         print("Banco de dados inicializado com sucesso!")
     
-    def adicionar_pessoa_conhecida(self, nome, idade, sexo, etnia, telefone, encoding):
-        """Adiciona uma nova pessoa conhecida ao banco de dados"""
-        conn = sqlite3.connect(self.db_path)
+    def _aplicar_migracoes(self, conn):
+        """Aplica migrações pendentes, controladas pelo PRAGMA user_version"""
+        versao = conn.execute('PRAGMA user_version').fetchone()[0]
+        
+        if versao < 1:
+            self._migrar_encodings_binarios(conn)
+            conn.execute('PRAGMA user_version = 1')
+            conn.commit()
+        
+        if versao < 2:
+            conn.execute('BEGIN')
+            self._migrar_versionamento_galeria(conn)
+            conn.execute('PRAGMA user_version = 2')
+            conn.commit()
+        
+        if versao < 3:
+            self._migrar_indices_relatorios(conn)
+            conn.execute('PRAGMA user_version = 3')
+            conn.commit()
+        
+        if versao < 4:
+            conn.execute('BEGIN')
+            self._migrar_resumos_presenca(conn)
+            self._recalcular_resumos_presenca(conn)
+            conn.execute('PRAGMA user_version = 4')
+            conn.commit()
+        
+        if versao < 5:
+            conn.execute('BEGIN')
+            self._migrar_modelos_faciais(conn)
+            conn.execute('PRAGMA user_version = 5')
+            conn.commit()
+        
+        if versao < 6:
+            conn.execute('BEGIN')
+            self._migrar_lotes_importacao(conn)
+            conn.execute('PRAGMA user_version = 6')
+            conn.commit()
+    
+    def _migrar_indices_relatorios(self, conn):
+        """Cria os índices usados pelos relatórios e pela lista de desconhecidos"""
         cursor = conn.cursor()
         
+        # Filtros por período e ORDER BY data_presenca
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_registros_presenca_data ON registros_presenca (data_presenca)')
+        
+        # Presenças de uma pessoa (conhecida ou desconhecida)
         cursor.execute('''
-            INSERT INTO pessoas_conhecidas (nome, idade, sexo, etnia, telefone, encoding)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (nome, idade, sexo, etnia, telefone, encoding))
+            CREATE INDEX IF NOT EXISTS idx_registros_presenca_pessoa
+            ON registros_presenca (tipo_pessoa, pessoa_id)
+        ''')
         
-        pessoa_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # Desconhecidos pendentes, já na ordem em que são listados
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_pessoas_desconhecidas_processado
+            ON pessoas_desconhecidas (processado, total_deteccoes, ultima_deteccao)
+        ''')
+    
+    def _migrar_lotes_importacao(self, conn):
+        """Cria a tabela dos lotes de importação já gravados
+        
+        O lote entra na mesma transação que as pessoas: repetir a gravação de
+        um lote já registrado não cadastra ninguém de novo.
+        """
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS lotes_importacao (
+                lote TEXT PRIMARY KEY,
+                pessoas INTEGER NOT NULL,
+                data_importacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    
+    def _migrar_modelos_faciais(self, conn):
+        """Cria a tabela de modelos faciais adicionais (vários encodings por pessoa)"""
+        cursor = conn.cursor()
+        
+        # O encoding de pessoas_conhecidas continua sendo o modelo principal;
+        # aqui ficam os outros, capturados em poses diferentes no cadastro
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS modelos_faciais (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pessoa_id INTEGER NOT NULL,
+                encoding BLOB NOT NULL,
+                qualidade REAL,
+                data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (pessoa_id) REFERENCES pessoas_conhecidas (id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_modelos_faciais_pessoa ON modelos_faciais (pessoa_id)')
+        
+        # Incluir ou remover um modelo é uma alteração da pessoa para a galeria
+        for evento, linha in (('INSERT', 'NEW'), ('DELETE', 'OLD')):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_modelos_faciais_{evento.lower()}
+                AFTER {evento} ON modelos_faciais
+                BEGIN
+                    UPDATE controle_versao SET valor = valor + 1 WHERE chave = 'galeria';
+                    UPDATE pessoas_conhecidas
+                    SET versao = (SELECT valor FROM controle_versao WHERE chave = 'galeria')
+                    WHERE id = {linha}.pessoa_id;
+                END
+            ''')
+        
+        # Modelos de pessoas apagadas não têm mais uso
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_pessoas_conhecidas_remocao_modelos
+            AFTER DELETE ON pessoas_conhecidas
+            BEGIN
+                DELETE FROM modelos_faciais WHERE pessoa_id = OLD.id;
+            END
+        ''')
+    
+    def _migrar_resumos_presenca(self, conn):
+        """Cria as tabelas de resumo de presenças e o trigger que as mantém"""
+        cursor = conn.cursor()
+        
+        # Um registro por dia de culto (dia local): detecções e pessoas distintas presentes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS presencas_diarias (
+                dia TEXT PRIMARY KEY,
+                deteccoes INTEGER NOT NULL DEFAULT 0,
+                deteccoes_conhecidas INTEGER NOT NULL DEFAULT 0,
+                deteccoes_desconhecidas INTEGER NOT NULL DEFAULT 0,
+                presentes_conhecidas INTEGER NOT NULL DEFAULT 0,
+                presentes_desconhecidas INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        
+        # Dias em que cada pessoa esteve presente (base das sequências e dos visitantes únicos)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS presencas_pessoa_dia (
+                tipo_pessoa TEXT NOT NULL,
+                pessoa_id INTEGER NOT NULL,
+                dia TEXT NOT NULL,
+                deteccoes INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (tipo_pessoa, pessoa_id, dia)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_presencas_pessoa_dia_dia ON presencas_pessoa_dia (dia)')
+        
+        # Totais por pessoa: primeira e última presença (UTC, como em registros_presenca)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS presencas_pessoa (
+                tipo_pessoa TEXT NOT NULL,
+                pessoa_id INTEGER NOT NULL,
+                primeira_presenca TIMESTAMP,
+                ultima_presenca TIMESTAMP,
+                dias_presentes INTEGER NOT NULL DEFAULT 0,
+                deteccoes INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (tipo_pessoa, pessoa_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Cada presença gravada atualiza os resumos na mesma transação. A primeira
+        # detecção da pessoa no dia (deteccoes = 1) conta como mais um presente.
+        # Registros sem pessoa_id contam só nas detecções do dia
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_registros_presenca_resumo
+            AFTER INSERT ON registros_presenca
+            BEGIN
+                INSERT OR IGNORE INTO presencas_pessoa_dia (tipo_pessoa, pessoa_id, dia)
+                SELECT NEW.tipo_pessoa, NEW.pessoa_id, DATE(NEW.data_presenca, 'localtime')
+                WHERE NEW.pessoa_id IS NOT NULL;
+                UPDATE presencas_pessoa_dia SET deteccoes = deteccoes + 1
+                WHERE tipo_pessoa = NEW.tipo_pessoa AND pessoa_id = NEW.pessoa_id
+                  AND dia = DATE(NEW.data_presenca, 'localtime');
+                
+                INSERT OR IGNORE INTO presencas_diarias (dia) VALUES (DATE(NEW.data_presenca, 'localtime'));
+                UPDATE presencas_diarias SET
+                    deteccoes = deteccoes + 1,
+                    deteccoes_conhecidas = deteccoes_conhecidas + (NEW.tipo_pessoa IS 'conhecida'),
+                    deteccoes_desconhecidas = deteccoes_desconhecidas + (NEW.tipo_pessoa IS 'desconhecida'),
+                    presentes_conhecidas = presentes_conhecidas + COALESCE(NEW.tipo_pessoa = 'conhecida' AND (
+                        SELECT deteccoes = 1 FROM presencas_pessoa_dia
+                        WHERE tipo_pessoa = NEW.tipo_pessoa AND pessoa_id = NEW.pessoa_id
+                          AND dia = DATE(NEW.data_presenca, 'localtime')), 0),
+                    presentes_desconhecidas = presentes_desconhecidas + COALESCE(NEW.tipo_pessoa = 'desconhecida' AND (
+                        SELECT deteccoes = 1 FROM presencas_pessoa_dia
+                        WHERE tipo_pessoa = NEW.tipo_pessoa AND pessoa_id = NEW.pessoa_id
+                          AND dia = DATE(NEW.data_presenca, 'localtime')), 0)
+                WHERE dia = DATE(NEW.data_presenca, 'localtime');
+                
+                INSERT OR IGNORE INTO presencas_pessoa (tipo_pessoa, pessoa_id, primeira_presenca, ultima_presenca)
+                SELECT NEW.tipo_pessoa, NEW.pessoa_id, NEW.data_presenca, NEW.data_presenca
+                WHERE NEW.pessoa_id IS NOT NULL;
+                UPDATE presencas_pessoa SET
+                    deteccoes = deteccoes + 1,
+                    dias_presentes = dias_presentes + (
+                        SELECT deteccoes = 1 FROM presencas_pessoa_dia
+                        WHERE tipo_pessoa = NEW.tipo_pessoa AND pessoa_id = NEW.pessoa_id
+                          AND dia = DATE(NEW.data_presenca, 'localtime')),
+                    primeira_presenca = MIN(primeira_presenca, NEW.data_presenca),
+                    ultima_presenca = MAX(ultima_presenca, NEW.data_presenca)
+                WHERE tipo_pessoa = NEW.tipo_pessoa AND pessoa_id = NEW.pessoa_id;
+            END
+        ''')
+    
+    def _recalcular_resumos_presenca(self, conn):
+        """Refaz as tabelas de resumo a partir de registros_presenca (sem commit)"""
+        cursor = conn.cursor()
+        
+        cursor.execute('DELETE FROM presencas_pessoa_dia')
+        cursor.execute('DELETE FROM presencas_diarias')
+        cursor.execute('DELETE FROM presencas_pessoa')
+        
+        cursor.execute('''
+            INSERT INTO presencas_pessoa_dia (tipo_pessoa, pessoa_id, dia, deteccoes)
+            SELECT tipo_pessoa, pessoa_id, DATE(data_presenca, 'localtime'), COUNT(*)
+            FROM registros_presenca
+            WHERE pessoa_id IS NOT NULL
+            GROUP BY tipo_pessoa, pessoa_id, DATE(data_presenca, 'localtime')
+        ''')
+        
+        cursor.execute('''
+            INSERT INTO presencas_diarias (dia, deteccoes, deteccoes_conhecidas, deteccoes_desconhecidas,
+                                           presentes_conhecidas, presentes_desconhecidas)
+            SELECT r.dia, r.deteccoes, r.conhecidas, r.desconhecidas,
+                   COALESCE(p.conhecidas, 0), COALESCE(p.desconhecidas, 0)
+            FROM (
+                SELECT DATE(data_presenca, 'localtime') AS dia, COUNT(*) AS deteccoes,
+                       SUM(tipo_pessoa IS 'conhecida') AS conhecidas,
+                       SUM(tipo_pessoa IS 'desconhecida') AS desconhecidas
+                FROM registros_presenca
+                GROUP BY DATE(data_presenca, 'localtime')
+            ) r
+            LEFT JOIN (
+                SELECT dia, SUM(tipo_pessoa = 'conhecida') AS conhecidas,
+                       SUM(tipo_pessoa = 'desconhecida') AS desconhecidas
+                FROM presencas_pessoa_dia
+                GROUP BY dia
+            ) p ON p.dia = r.dia
+        ''')
+        
+        cursor.execute('''
+            INSERT INTO presencas_pessoa (tipo_pessoa, pessoa_id, primeira_presenca, ultima_presenca,
+                                          dias_presentes, deteccoes)
+            SELECT r.tipo_pessoa, r.pessoa_id, MIN(r.data_presenca), MAX(r.data_presenca),
+                   (SELECT COUNT(*) FROM presencas_pessoa_dia d
+                    WHERE d.tipo_pessoa = r.tipo_pessoa AND d.pessoa_id = r.pessoa_id),
+                   COUNT(*)
+            FROM registros_presenca r
+            WHERE r.pessoa_id IS NOT NULL
+            GROUP BY r.tipo_pessoa, r.pessoa_id
+        ''')
+    
+    def _migrar_versionamento_galeria(self, conn):
+        """Cria o contador de alterações da galeria usado na sincronização incremental"""
+        cursor = conn.cursor()
+        
+        # Contador monotônico, incrementado a cada alteração em pessoas_conhecidas
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS controle_versao (
+                chave TEXT PRIMARY KEY,
+                valor INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO controle_versao (chave, valor) VALUES ('galeria', 0)")
+        
+        # Versão em que cada pessoa foi alterada pela última vez
+        cursor.execute('ALTER TABLE pessoas_conhecidas ADD COLUMN versao INTEGER NOT NULL DEFAULT 0')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_pessoas_conhecidas_versao ON pessoas_conhecidas (versao)')
+        
+        # Pessoas já cadastradas entram em uma versão nova: as consultas filtram
+        # versao > desde_versao, e na versão 0 nunca seriam carregadas
+        cursor.execute("UPDATE controle_versao SET valor = valor + 1 WHERE chave = 'galeria'")
+        cursor.execute('''
+            UPDATE pessoas_conhecidas
+            SET versao = (SELECT valor FROM controle_versao WHERE chave = 'galeria')
+        ''')
+        
+        # Linhas apagadas não podem ser consultadas depois; guardar o id e a versão
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pessoas_conhecidas_removidas (
+                pessoa_id INTEGER NOT NULL,
+                versao INTEGER NOT NULL
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_pessoas_conhecidas_insercao
+            AFTER INSERT ON pessoas_conhecidas
+            BEGIN
+                UPDATE controle_versao SET valor = valor + 1 WHERE chave = 'galeria';
+                UPDATE pessoas_conhecidas
+                SET versao = (SELECT valor FROM controle_versao WHERE chave = 'galeria')
+                WHERE id = NEW.id;
+            END
+        ''')
+        
+        # A coluna versao fica fora da lista para o próprio trigger não disparar de novo
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_pessoas_conhecidas_alteracao
+            AFTER UPDATE OF nome, idade, sexo, etnia, telefone, encoding, ativo ON pessoas_conhecidas
+            BEGIN
+                UPDATE controle_versao SET valor = valor + 1 WHERE chave = 'galeria';
+                UPDATE pessoas_conhecidas
+                SET versao = (SELECT valor FROM controle_versao WHERE chave = 'galeria')
+                WHERE id = NEW.id;
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_pessoas_conhecidas_remocao
+            AFTER DELETE ON pessoas_conhecidas
+            BEGIN
+                UPDATE controle_versao SET valor = valor + 1 WHERE chave = 'galeria';
+                INSERT INTO pessoas_conhecidas_removidas (pessoa_id, versao)
+                SELECT OLD.id, valor FROM controle_versao WHERE chave = 'galeria';
+            END
+        ''')
+    
+    def _migrar_encodings_binarios(self, conn):
+        """Converte encodings gravados com pickle para o formato binário float32"""
+        cursor = conn.cursor()
+        convertidos = 0
+        
+        for tabela in ('pessoas_conhecidas', 'pessoas_desconhecidas'):
+            cursor.execute(f'SELECT id, encoding FROM {tabela}')
+            
+            atualizacoes = []
+            for registro_id, encoding in cursor.fetchall():
+                if encoding is None or formato_binario(encoding):
+                    continue
+                try:
+                    atualizacoes.append((serializar_encoding(carregar_encoding_legado(encoding)), registro_id))
+                except Exception as e:
+                    print(f"Erro ao converter encoding {tabela}.{registro_id}: {e}")
+            
+            cursor.executemany(f'UPDATE {tabela} SET encoding = ? WHERE id = ?', atualizacoes)
+            convertidos += len(atualizacoes)
+        
+        if convertidos:
+            print(f"{convertidos} encodings convertidos para o formato binário")
+    
+    def adicionar_pessoa_conhecida(self, nome, idade, sexo, etnia, telefone, encoding, modelos=None):
+        """Adiciona uma nova pessoa conhecida ao banco de dados
+        
+        `modelos` são encodings adicionais da pessoa, como (encoding, qualidade),
+        gravados na mesma transação.
+        """
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('''
+                INSERT INTO pessoas_conhecidas (nome, idade, sexo, etnia, telefone, encoding)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (nome, idade, sexo, etnia, telefone, encoding))
+            
+            pessoa_id = cursor.lastrowid
+            if modelos:
+                cursor.executemany('''
+                    INSERT INTO modelos_faciais (pessoa_id, encoding, qualidade) VALUES (?, ?, ?)
+                ''', [(pessoa_id, modelo, qualidade) for modelo, qualidade in modelos])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         return pessoa_id
     
+    def adicionar_modelos_faciais(self, pessoa_id, modelos):
+        """Acrescenta encodings (encoding, qualidade) a uma pessoa já cadastrada"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany('''
+                INSERT INTO modelos_faciais (pessoa_id, encoding, qualidade) VALUES (?, ?, ?)
+            ''', [(pessoa_id, modelo, qualidade) for modelo, qualidade in modelos])
+            
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def adicionar_pessoas_conhecidas(self, pessoas, lote=None):
+        """Cadastra várias pessoas em uma única transação (importação em lote)
+        
+        pessoas: (nome, idade, sexo, etnia, telefone, encoding). Retorna o
+        número de pessoas inseridas; se algo falhar, nenhuma é inserida.
+        Com `lote`, o identificador é gravado na mesma transação e um lote já
+        gravado não é inserido de novo (retorna 0).
+        """
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            if lote is not None:
+                cursor.execute('SELECT 1 FROM lotes_importacao WHERE lote = ?', (lote,))
+                if cursor.fetchone():
+                    conn.rollback()
+                    return 0
+                cursor.execute('INSERT INTO lotes_importacao (lote, pessoas) VALUES (?, ?)', (lote, len(pessoas)))
+            
+            cursor.executemany('''
+                INSERT INTO pessoas_conhecidas (nome, idade, sexo, etnia, telefone, encoding)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', pessoas)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        return len(pessoas)
+    
     def adicionar_pessoa_desconhecida(self, encoding):
         """Adiciona uma nova pessoa desconhecida ao banco de dados"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
-        codigo_temp = f"TEMP_{uuid.uuid4().hex[:8].upper()}"
-        
-        cursor.execute('''
-            INSERT INTO pessoas_desconhecidas (codigo_temp, encoding)
-            VALUES (?, ?)
-        ''', (codigo_temp, encoding))
+        codigo_temp = gerar_codigo_temp()
         
-        pessoa_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        try:
+            cursor.execute('''
+                INSERT INTO pessoas_desconhecidas (codigo_temp, encoding)
+                VALUES (?, ?)
+            ''', (codigo_temp, encoding))
+            
+            pessoa_id = cursor.lastrowid
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         return pessoa_id, codigo_temp
     
     def registrar_presenca(self, pessoa_id, tipo_pessoa, confianca):
         """Registra a presença de uma pessoa"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO registros_presenca (pessoa_id, tipo_pessoa, confianca)
-            VALUES (?, ?, ?)
-        ''', (pessoa_id, tipo_pessoa, confianca))
+        try:
+            cursor.execute('''
+                INSERT INTO registros_presenca (pessoa_id, tipo_pessoa, confianca)
+                VALUES (?, ?, ?)
+            ''', (pessoa_id, tipo_pessoa, confianca))
+            
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def gravar_lote(self, desconhecidas_novas, atualizacoes_desconhecidas, presencas):
+        """Grava um lote de operações em uma única transação
         
-        conn.commit()
-        conn.close()
+        desconhecidas_novas: (codigo_temp, encoding, data)
+        atualizacoes_desconhecidas: (codigo_temp, data)
+        presencas: (pessoa_id, codigo_temp, tipo_pessoa, confianca, data); pessoas
+        desconhecidas são referenciadas pelo codigo_temp, pois o id só existe após a inserção
+        """
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.executemany('''
+                INSERT INTO pessoas_desconhecidas (codigo_temp, encoding, primeira_deteccao, ultima_deteccao)
+                VALUES (?, ?, ?, ?)
+            ''', [(codigo, encoding, data, data) for codigo, encoding, data in desconhecidas_novas])
+            
+            cursor.executemany('''
+                UPDATE pessoas_desconhecidas 
+                SET ultima_deteccao = ?, 
+                    total_deteccoes = total_deteccoes + 1
+                WHERE codigo_temp = ?
+            ''', [(data, codigo) for codigo, data in atualizacoes_desconhecidas])
+            
+            cursor.executemany('''
+                INSERT INTO registros_presenca (pessoa_id, tipo_pessoa, confianca, data_presenca)
+                VALUES (?, ?, ?, ?)
+            ''', [(pessoa_id, tipo, confianca, data)
+                  for pessoa_id, codigo, tipo, confianca, data in presencas if codigo is None])
+            
+            cursor.executemany('''
+                INSERT INTO registros_presenca (pessoa_id, tipo_pessoa, confianca, data_presenca)
+                SELECT id, ?, ?, ? FROM pessoas_desconhecidas WHERE codigo_temp = ?
+            ''', [(tipo, confianca, data, codigo)
+                  for pessoa_id, codigo, tipo, confianca, data in presencas if codigo is not None])
+            
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
     
     def obter_pessoas_conhecidas(self):
         """Retorna todas as pessoas conhecidas ativas"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -135,12 +742,80 @@ class DatabaseManager:
         ''')
         
         pessoas = cursor.fetchall()
-        conn.close()
         return pessoas
     
+    def obter_pessoa_conhecida(self, pessoa_id):
+        """Retorna os dados (sem encoding) de uma pessoa conhecida ativa, ou None"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id, nome, idade, sexo, etnia, telefone
+            FROM pessoas_conhecidas 
+            WHERE id = ? AND ativo = 1
+        ''', (pessoa_id,))
+        
+        return cursor.fetchone()
+        
+    def obter_versao_galeria(self):
+        """Retorna o contador de alterações da galeria de pessoas conhecidas"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT valor FROM controle_versao WHERE chave = 'galeria'")
+        resultado = cursor.fetchone()
+        
+        return resultado[0] if resultado else 0
+    
+    def obter_alteracoes_pessoas(self, desde_versao, com_modelos=False):
+        """Retorna (versão atual, pessoas alteradas, ids removidos) desde a versão informada
+        
+        As pessoas alteradas incluem as desativadas (ativo = 0), que devem sair da galeria.
+        Tudo é lido no mesmo snapshot para que a versão retornada seja consistente.
+        Com `com_modelos`, retorna também os modelos faciais adicionais das pessoas
+        alteradas e ativas, como (pessoa_id, encoding).
+        """
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        cursor.execute('BEGIN')
+        try:
+            cursor.execute("SELECT valor FROM controle_versao WHERE chave = 'galeria'")
+            resultado = cursor.fetchone()
+            versao_atual = resultado[0] if resultado else 0
+            
+            cursor.execute('''
+                SELECT id, nome, idade, sexo, etnia, telefone, encoding, ativo
+                FROM pessoas_conhecidas
+                WHERE versao > ? AND versao <= ?
+            ''', (desde_versao, versao_atual))
+            alteradas = cursor.fetchall()
+            
+            cursor.execute('''
+                SELECT pessoa_id FROM pessoas_conhecidas_removidas
+                WHERE versao > ? AND versao <= ?
+            ''', (desde_versao, versao_atual))
+            removidas = [linha[0] for linha in cursor.fetchall()]
+            
+            if com_modelos:
+                cursor.execute('''
+                    SELECT m.pessoa_id, m.encoding
+                    FROM modelos_faciais m
+                    JOIN pessoas_conhecidas pc ON pc.id = m.pessoa_id
+                    WHERE pc.versao > ? AND pc.versao <= ? AND pc.ativo = 1
+                    ORDER BY m.pessoa_id, m.id
+                ''', (desde_versao, versao_atual))
+                modelos = cursor.fetchall()
+        finally:
+            conn.commit()
+        
+        if com_modelos:
+            return versao_atual, alteradas, removidas, modelos
+        return versao_atual, alteradas, removidas
+    
     def obter_pessoas_desconhecidas(self):
         """Retorna todas as pessoas desconhecidas não processadas"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -151,78 +826,257 @@ class DatabaseManager:
         ''')
         
         pessoas = cursor.fetchall()
-        conn.close()
         return pessoas
     
     def atualizar_deteccao_desconhecida(self, pessoa_id):
         """Atualiza a última detecção de uma pessoa desconhecida"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            UPDATE pessoas_desconhecidas 
-            SET ultima_deteccao = CURRENT_TIMESTAMP, 
-                total_deteccoes = total_deteccoes + 1
-            WHERE id = ?
-        ''', (pessoa_id,))
-        
-        conn.commit()
-        conn.close()
+        try:
+            cursor.execute('''
+                UPDATE pessoas_desconhecidas 
+                SET ultima_deteccao = CURRENT_TIMESTAMP, 
+                    total_deteccoes = total_deteccoes + 1
+                WHERE id = ?
+            ''', (pessoa_id,))
+            
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
     
     def marcar_desconhecida_processada(self, pessoa_id):
         """Marca uma pessoa desconhecida como processada"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            UPDATE pessoas_desconhecidas 
-            SET processado = 1
-            WHERE id = ?
-        ''', (pessoa_id,))
-        
-        conn.commit()
-        conn.close()
+        try:
+            cursor.execute('''
+                UPDATE pessoas_desconhecidas 
+                SET processado = 1
+                WHERE id = ?
+            ''', (pessoa_id,))
+            
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
     
     def obter_configuracao(self, chave):
         """Obtém uma configuração do sistema"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conectar()
         cursor = conn.cursor()
         
         cursor.execute('SELECT valor FROM configuracoes WHERE chave = ?', (chave,))
         resultado = cursor.fetchone()
-        conn.close()
         
         return resultado[0] if resultado else None
     
     def obter_relatorio_presencas(self, data_inicio=None, data_fim=None):
         """Gera relatório de presenças"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = '''
-            SELECT 
-                rp.data_presenca,
-                CASE 
-                    WHEN rp.tipo_pessoa = 'conhecida' THEN pc.nome
-                    ELSE pd.codigo_temp
-                END as identificacao,
-                rp.tipo_pessoa,
-                rp.confianca
-            FROM registros_presenca rp
-            LEFT JOIN pessoas_conhecidas pc ON rp.pessoa_id = pc.id AND rp.tipo_pessoa = 'conhecida'
-            LEFT JOIN pessoas_desconhecidas pd ON rp.pessoa_id = pd.id AND rp.tipo_pessoa = 'desconhecida'
-        '''
+        conn = self._conectar()
+        cursor = conn.cursor()
         
+        filtro, params = filtro_periodo(data_inicio, data_fim)
+        cursor.execute(CONSULTA_PRESENCAS + filtro + ' ORDER BY rp.data_presenca DESC', params)
+        resultados = cursor.fetchall()
+        
+        return resultados
+    
+    def iterar_relatorio_presencas(self, data_inicio=None, data_fim=None, tamanho_bloco=1000):
+        """Percorre o relatório de presenças em blocos, sem carregar o período inteiro"""
+        cursor = self._conectar().cursor()
+        
+        filtro, params = filtro_periodo(data_inicio, data_fim)
+        cursor.execute(CONSULTA_PRESENCAS + filtro + ' ORDER BY rp.data_presenca DESC', params)
+        try:
+            while True:
+                bloco = cursor.fetchmany(tamanho_bloco)
+                if not bloco:
+                    break
+                yield from bloco
+        finally:
+            cursor.close()
+    
+    def obter_pagina_presencas(self, data_inicio=None, data_fim=None, tamanho=50, apos=None):
+        """Uma página do relatório de presenças, da mais recente para a mais antiga
+        
+        Paginação por chave: `apos` é o (data_presenca, id) do último registro da
+        página anterior, então cada página custa o mesmo que a primeira, ao
+        contrário de OFFSET. Retorna (registros, chave da próxima página ou None).
+        """
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        filtro, params = filtro_periodo(data_inicio, data_fim)
+        if apos is not None:
+            filtro += (' AND' if filtro else ' WHERE') + \
+                ' (rp.data_presenca < ? OR (rp.data_presenca = ? AND rp.id < ?))'
+            params += [apos[0], apos[0], apos[1]]
+        
+        cursor.execute(
+            CONSULTA_PRESENCAS.replace('SELECT', 'SELECT rp.id,', 1) + filtro +
+            ' ORDER BY rp.data_presenca DESC, rp.id DESC LIMIT ?',
+            params + [tamanho]
+        )
+        linhas = cursor.fetchall()
+        
+        proxima = (linhas[-1][1], linhas[-1][0]) if len(linhas) == tamanho else None
+        return [linha[1:] for linha in linhas], proxima
+    
+    def resumo_presencas(self, data_inicio=None, data_fim=None):
+        """Totais do período calculados no banco: (total, conhecidas, desconhecidas)"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        if not (data_inicio and data_fim):
+            # Sem período, os totais já estão somados por dia
+            cursor.execute('''
+                SELECT COALESCE(SUM(deteccoes), 0),
+                       COALESCE(SUM(deteccoes_conhecidas), 0),
+                       COALESCE(SUM(deteccoes_desconhecidas), 0)
+                FROM presencas_diarias
+            ''')
+            return cursor.fetchone()
+        
+        filtro, params = filtro_periodo(data_inicio, data_fim)
+        cursor.execute(f'''
+            SELECT COUNT(*),
+                   COALESCE(SUM(rp.tipo_pessoa = 'conhecida'), 0),
+                   COALESCE(SUM(rp.tipo_pessoa = 'desconhecida'), 0)
+            FROM registros_presenca rp{filtro}
+        ''', params)
+        
+        return cursor.fetchone()
+    
+    def recalcular_resumos_presenca(self):
+        """Refaz os resumos de presença a partir dos registros; retorna o número de dias"""
+        conn = self._conectar()
+        
+        conn.execute('BEGIN')
+        try:
+            self._recalcular_resumos_presenca(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        return conn.execute('SELECT COUNT(*) FROM presencas_diarias').fetchone()[0]
+    
+    def obter_presencas_diarias(self, data_inicio=None, data_fim=None, limite=None):
+        """Presenças por dia de culto, do mais recente para o mais antigo
+        
+        Retorna (dia, deteccoes, conhecidas presentes, desconhecidas presentes);
+        as datas são dias locais 'AAAA-MM-DD'. Com `limite`, só os últimos dias.
+        """
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        query = 'SELECT dia, deteccoes, presentes_conhecidas, presentes_desconhecidas FROM presencas_diarias'
         params = []
         if data_inicio and data_fim:
-            query += ' WHERE DATE(rp.data_presenca) BETWEEN ? AND ?'
-            params = [data_inicio, data_fim]
-        
-        query += ' ORDER BY rp.data_presenca DESC'
+            query += ' WHERE dia BETWEEN ? AND ?'
+            params = [str(data_inicio)[:10], str(data_fim)[:10]]
+        query += ' ORDER BY dia DESC'
+        if limite:
+            query += ' LIMIT ?'
+            params.append(int(limite))
         
         cursor.execute(query, params)
-        resultados = cursor.fetchall()
-        conn.close()
+        return cursor.fetchall()
+    
+    def contar_visitantes_unicos(self, data_inicio=None, data_fim=None):
+        """Pessoas distintas presentes no período: (conhecidas, desconhecidas)"""
+        conn = self._conectar()
+        cursor = conn.cursor()
         
-        return resultados
-
+        if data_inicio and data_fim:
+            cursor.execute('''
+                SELECT COALESCE(SUM(tipo_pessoa = 'conhecida'), 0), COALESCE(SUM(tipo_pessoa = 'desconhecida'), 0)
+                FROM (SELECT DISTINCT tipo_pessoa, pessoa_id FROM presencas_pessoa_dia WHERE dia BETWEEN ? AND ?)
+            ''', (str(data_inicio)[:10], str(data_fim)[:10]))
+        else:
+            cursor.execute('''
+                SELECT COALESCE(SUM(tipo_pessoa = 'conhecida'), 0), COALESCE(SUM(tipo_pessoa = 'desconhecida'), 0)
+                FROM presencas_pessoa
+            ''')
+        
+        return cursor.fetchone()
+    
+    def obter_frequencia_pessoa(self, pessoa_id, tipo_pessoa='conhecida'):
+        """Frequência de uma pessoa, ou None se nunca foi detectada
+        
+        Retorna (primeira presença, última presença, dias presentes, detecções,
+        sequência atual, maior sequência). Sequências contam dias de culto
+        seguidos, considerando como dia de culto qualquer dia com presenças.
+        """
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT primeira_presenca, ultima_presenca, dias_presentes, deteccoes
+            FROM presencas_pessoa WHERE tipo_pessoa = ? AND pessoa_id = ?
+        ''', (tipo_pessoa, pessoa_id))
+        resumo = cursor.fetchone()
+        if resumo is None:
+            return None
+        
+        cursor.execute('''
+            SELECT dia FROM presencas_pessoa_dia WHERE tipo_pessoa = ? AND pessoa_id = ?
+        ''', (tipo_pessoa, pessoa_id))
+        dias_pessoa = {dia for dia, in cursor.fetchall()}
+        
+        cursor.execute('SELECT dia FROM presencas_diarias WHERE dia >= ? ORDER BY dia', (min(dias_pessoa),))
+        atual = maior = 0
+        for dia, in cursor.fetchall():
+            atual = atual + 1 if dia in dias_pessoa else 0
+            maior = max(maior, atual)
+        
+        return tuple(resumo) + (atual, maior)
+    
+    def obter_mais_frequentes(self, limite=10):
+        """Pessoas conhecidas com mais dias de presença: (id, nome, dias, última presença)"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT pp.pessoa_id, pc.nome, pp.dias_presentes, pp.ultima_presenca
+            FROM presencas_pessoa pp
+            JOIN pessoas_conhecidas pc ON pc.id = pp.pessoa_id
+            WHERE pp.tipo_pessoa = 'conhecida' AND pc.ativo = 1
+            ORDER BY pp.dias_presentes DESC, pp.ultima_presenca DESC
+            LIMIT ?
+        ''', (limite,))
+        
+        return cursor.fetchall()
+    
+    def obter_estatisticas_gerais(self):
+        """Totais gerais lidos dos resumos (um registro por dia, não por detecção)"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT COUNT(*) FROM pessoas_conhecidas WHERE ativo = 1')
+        pessoas_conhecidas = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM pessoas_desconhecidas WHERE processado = 0')
+        desconhecidas_pendentes = cursor.fetchone()[0]
+        
+        cursor.execute('''
+            SELECT COUNT(*), COALESCE(SUM(deteccoes), 0),
+                   COALESCE(AVG(presentes_conhecidas + presentes_desconhecidas), 0),
+                   MAX(presentes_conhecidas + presentes_desconhecidas)
+            FROM presencas_diarias
+        ''')
+        dias_culto, total_registros, media_presentes, maximo_presentes = cursor.fetchone()
+        visitantes_conhecidas, visitantes_desconhecidas = self.contar_visitantes_unicos()
+        
+        return {
+            'pessoas_conhecidas': pessoas_conhecidas,
+            'desconhecidas_pendentes': desconhecidas_pendentes,
+            'total_registros': total_registros,
+            'dias_culto': dias_culto,
+            'media_presentes': media_presentes,
+            'maximo_presentes': maximo_presentes or 0,
+            'visitantes_conhecidas': visitantes_conhecidas,
+            'visitantes_desconhecidas': visitantes_desconhecidas,
+        }
@@ -36,8 +36,8 @@ def demonstracao_basica():
     # Verificar registros de presença
     print("\n4. Verificando registros de presença...")
     hoje = datetime.now().strftime('%Y-%m-%d')
-    registros = db.obter_relatorio_presencas(hoje, hoje)
-    print(f"✓ {len(registros)} registros de presença hoje")
+    total_hoje, _, _ = db.resumo_presencas(hoje, hoje)
+    print(f"✓ {total_hoje} registros de presença hoje")
     
     # Mostrar configurações
     print("\n5. Configurações atuais:")
@@ -58,7 +58,7 @@ def demonstracao_reconhecimento():
         sistema = FaceRecognitionSystem()
         print("✓ Sistema inicializado com sucesso")
         
-        print(f"✓ {len(sistema.pessoas_conhecidas)} pessoas carregadas")
+        print(f"✓ {sistema.galeria.total_pessoas} pessoas carregadas")
         print(f"✓ Tolerância configurada: {sistema.tolerancia}")
         
         # Verificar se há webcam disponível
@@ -90,24 +90,24 @@ def demonstracao_relatorios():
     inicio = inicio_semana.strftime('%Y-%m-%d')
     fim = hoje.strftime('%Y-%m-%d')
     
-    registros = db.obter_relatorio_presencas(inicio, fim)
-    print(f"✓ {len(registros)} registros na semana")
+    total_semana, _, _ = db.resumo_presencas(inicio, fim)
+    print(f"✓ {total_semana} registros na semana")
     
-    if registros:
+    if total_semana:
+        registros, _ = db.obter_pagina_presencas(inicio, fim, tamanho=5)
         print("\nÚltimos 5 registros:")
-        for i, registro in enumerate(registros[:5]):
+        for i, registro in enumerate(registros):
             data, nome, tipo, confianca = registro
             print(f"  {i+1}. {data[:16]} - {nome} ({tipo})")
     
     # Estatísticas gerais
     print("\n2. Estatísticas gerais...")
-    pessoas_conhecidas = len(db.obter_pessoas_conhecidas())
-    pessoas_desconhecidas = len(db.obter_pessoas_desconhecidas())
-    total_registros = len(db.obter_relatorio_presencas())
+    estatisticas = db.obter_estatisticas_gerais()
     
-    print(f"✓ Pessoas conhecidas: {pessoas_conhecidas}")
-    print(f"✓ Pessoas desconhecidas: {pessoas_desconhecidas}")
-    print(f"✓ Total de registros: {total_registros}")
+    print(f"✓ Pessoas conhecidas: {estatisticas['pessoas_conhecidas']}")
+    print(f"✓ Pessoas desconhecidas: {estatisticas['desconhecidas_pendentes']}")
+    print(f"✓ Total de registros: {estatisticas['total_registros']}")
+    print(f"✓ Dias de culto: {estatisticas['dias_culto']} (média de {estatisticas['media_presentes']:.1f} presentes)")
     
     return True
 
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class ExtratorEmbedding:
+    """Extrai embeddings geométricos a partir dos landmarks do MediaPipe Face Mesh
+
+    Os pares de pontos são calculados uma única vez na construção; cada
+    extração lê apenas os landmarks usados e calcula todas as distâncias com
+    uma só indexação vetorizada. O resultado é idêntico, bit a bit, ao do
+    laço original, então encodings já cadastrados continuam válidos.
+    """
+
+    # Pontos importantes do rosto (índices aproximados do face mesh)
+    PONTOS_CHAVE = [
+        10, 151, 9, 8, 168, 6, 197, 195, 5, 4, 1, 19, 94, 125,
+        142, 36, 205, 206, 207, 213, 192, 147, 187, 207, 206, 205,
+        36, 142, 126, 142, 36, 205, 206, 207
+    ]
+
+    # Cada ponto é comparado com os 9 pontos seguintes da lista
+    JANELA = 10
+
+    def __init__(self, pontos_chave=None):
+        pontos_chave = list(pontos_chave or self.PONTOS_CHAVE)
+
+        pares_a = []
+        pares_b = []
+        for i in range(len(pontos_chave)):
+            for j in range(i + 1, min(i + self.JANELA, len(pontos_chave))):
+                pares_a.append(pontos_chave[i])
+                pares_b.append(pontos_chave[j])
+
+        # Landmarks realmente usados e a posição de cada par dentro deles
+        self.indices_usados = np.unique(pares_a + pares_b)
+        posicoes = {indice: posicao for posicao, indice in enumerate(self.indices_usados)}
+        self.pares_landmark_a = np.array(pares_a, dtype=np.int64)
+        self.pares_landmark_b = np.array(pares_b, dtype=np.int64)
+        self.pares_a = np.array([posicoes[indice] for indice in pares_a], dtype=np.int64)
+        self.pares_b = np.array([posicoes[indice] for indice in pares_b], dtype=np.int64)
+        self.dimensao = len(pares_a)
+
+        # Pares válidos para malhas com menos landmarks, calculados sob demanda
+        self._mascaras = {}
+
+    def _mascara_pares(self, total_landmarks):
+        """Pares cujos dois pontos existem em uma malha com `total_landmarks` pontos"""
+        if total_landmarks > self.indices_usados[-1]:
+            return None
+        if total_landmarks not in self._mascaras:
+            self._mascaras[total_landmarks] = (
+                (self.pares_landmark_a < total_landmarks) & (self.pares_landmark_b < total_landmarks)
+            )
+        return self._mascaras[total_landmarks]
+
+    def _pontos(self, landmarks, largura, altura):
+        """Coordenadas em pixels (truncadas, como int()) dos landmarks usados: array (N, 2)"""
+        pontos = landmarks.landmark
+        total = len(pontos)
+        coordenadas = np.array(
+            [(pontos[i].x, pontos[i].y) if i < total else (0.0, 0.0) for i in self.indices_usados],
+            dtype=np.float64
+        )
+        return (coordenadas * (largura, altura)).astype(np.int64), total
+
+    def _distancias(self, pontos):
+        """Distâncias de todos os pares em uma só indexação: (..., D)"""
+        diferencas = (pontos[..., self.pares_a, :] - pontos[..., self.pares_b, :]).astype(np.float64)
+        return np.sqrt(np.sum(diferencas * diferencas, axis=-1))
+
+    def extrair(self, imagem, landmarks):
+        """Extrai o embedding normalizado de uma face"""
+        h, w = imagem.shape[:2]
+        pontos, total = self._pontos(landmarks, w, h)
+
+        caracteristicas = self._distancias(pontos)
+        mascara = self._mascara_pares(total)
+        if mascara is not None:
+            caracteristicas = caracteristicas[mascara]
+
+        # Normalizar características
+        if len(caracteristicas) > 0:
+            caracteristicas = caracteristicas / np.linalg.norm(caracteristicas)
+
+        return caracteristicas
+
+    def extrair_lote(self, imagem, lista_landmarks):
+        """Extrai os embeddings de todas as faces de um frame: matriz (F, D)
+
+        Com malhas incompletas, D é o número de pares presentes em todas as
+        faces do frame; cada linha continua idêntica à extração individual
+        quando as malhas do frame têm o mesmo número de pontos.
+        """
+        if not lista_landmarks:
+            return np.empty((0, self.dimensao), dtype=np.float64)
+
+        h, w = imagem.shape[:2]
+        extraidos = [self._pontos(landmarks, w, h) for landmarks in lista_landmarks]
+        caracteristicas = self._distancias(np.stack([pontos for pontos, _ in extraidos]))
+
+        # Pontos ausentes valem (0, 0); os pares que os usam saem de todas as linhas
+        mascara = self._mascara_pares(min(total for _, total in extraidos))
+        if mascara is not None:
+            caracteristicas = caracteristicas[:, mascara]
+
+        # A norma de cada linha usa o mesmo np.linalg.norm da extração individual,
+        # garantindo resultado idêntico bit a bit
+        normas = np.array([np.linalg.norm(linha) for linha in caracteristicas])
+        return caracteristicas / normas[:, np.newaxis]
@@ -0,0 +1,165 @@
+import atexit
+import queue
+import threading
+import time
+
+from database import gerar_codigo_temp, timestamp_utc
+from pipeline_video import EstatisticasEstagio
+
+
+class EscritorPresencas:
+    """Buffer de escrita assíncrona para presenças e pessoas desconhecidas
+
+    As operações entram em uma fila em memória e uma thread própria as grava
+    em lote, em uma única transação, a cada `max_lote` operações ou
+    `intervalo_ms` milissegundos. Quem registra nunca espera pelo disco.
+    """
+
+    def __init__(self, db, max_lote=200, intervalo_ms=500):
+        self.db = db
+        self.max_lote = max_lote
+        self.intervalo = intervalo_ms / 1000.0
+
+        self.gravados = 0
+        self.lotes = 0
+        self.descartados = 0
+        # Latência das presenças: do instante da captura até o commit do lote
+        self.estatisticas = EstatisticasEstagio("Captura até gravação")
+
+        self.fila = queue.Queue()
+        self.thread = threading.Thread(target=self._executar, daemon=True)
+        self.thread.start()
+
+        # Garantir que nada fique no buffer ao encerrar o programa
+        atexit.register(self.parar)
+
+    def registrar_presenca(self, pessoa_id, tipo_pessoa, confianca, data=None, instante_captura=None):
+        """Agenda o registro de presença de uma pessoa com id conhecido
+
+        `instante_captura` (perf_counter do quadro), quando informado, entra na
+        latência de captura até gravação.
+        """
+        self.fila.put(('presenca', (pessoa_id, None, tipo_pessoa, confianca, data or timestamp_utc()),
+                       instante_captura))
+
+    def registrar_presenca_desconhecida(self, codigo_temp, confianca, data=None, instante_captura=None):
+        """Agenda o registro de presença de uma pessoa desconhecida pelo código temporário"""
+        self.fila.put(('presenca', (None, codigo_temp, 'desconhecida', confianca, data or timestamp_utc()),
+                       instante_captura))
+
+    def adicionar_pessoa_desconhecida(self, encoding, data=None):
+        """Agenda a inserção de uma pessoa desconhecida e retorna o código temporário"""
+        codigo_temp = gerar_codigo_temp()
+        self.fila.put(('desconhecida', (codigo_temp, encoding, data or timestamp_utc())))
+        return codigo_temp
+
+    def atualizar_deteccao_desconhecida(self, codigo_temp, data=None):
+        """Agenda a atualização da última detecção de uma pessoa desconhecida"""
+        self.fila.put(('atualizacao', (codigo_temp, data or timestamp_utc())))
+
+    def descarregar(self, timeout=10):
+        """Grava imediatamente tudo o que está no buffer e aguarda a conclusão"""
+        if not self.thread.is_alive():
+            return
+        concluido = threading.Event()
+        self.fila.put(('descarregar', concluido))
+        concluido.wait(timeout)
+
+    def parar(self, timeout=10):
+        """Grava o que estiver pendente e encerra a thread de escrita"""
+        if self.thread.is_alive():
+            self.fila.put(None)
+            self.thread.join(timeout)
+
+    def resumo(self):
+        return (f"{self.estatisticas.resumo()}; {self.gravados} operações em {self.lotes} lotes, "
+                f"{self.fila.qsize()} pendentes, {self.descartados} perdidas")
+
+    def _executar(self):
+        """Loop da thread de escrita: acumula operações e grava em lote"""
+        pendentes = []
+        prazo = None
+
+        while True:
+            espera = None if not pendentes else max(0.0, prazo - time.monotonic())
+            try:
+                item = self.fila.get(timeout=espera)
+            except queue.Empty:
+                item = ('prazo', None)
+
+            if item is None:
+                self._gravar(pendentes)
+                break
+
+            tipo, dados = item[:2]
+            if tipo == 'descarregar':
+                self._gravar(pendentes)
+                pendentes = []
+                dados.set()
+                continue
+
+            if tipo != 'prazo':
+                if not pendentes:
+                    prazo = time.monotonic() + self.intervalo
+                pendentes.append(item)
+
+            if pendentes and (len(pendentes) >= self.max_lote or time.monotonic() >= prazo):
+                self._gravar(pendentes)
+                pendentes = []
+
+    def _gravar(self, pendentes):
+        """Grava as operações pendentes em uma única transação
+
+        Se o lote falhar, as operações são gravadas uma a uma: só as que
+        falharem de novo se perdem.
+        """
+        if not pendentes:
+            return
+
+        try:
+            self.db.gravar_lote(*self._separar(pendentes))
+        except Exception as e:
+            print(f"Erro ao gravar lote de {len(pendentes)} operações, gravando uma a uma: {e}")
+            self._gravar_uma_a_uma(pendentes)
+            return
+
+        self.gravados += len(pendentes)
+        self.lotes += 1
+        self._registrar_latencias(pendentes)
+
+    def _gravar_uma_a_uma(self, pendentes):
+        """Grava cada operação em sua própria transação, na ordem em que chegaram"""
+        # Desconhecidas não inseridas: suas presenças e atualizações iriam para
+        # outra pessoa (colisão de codigo_temp) ou para lugar nenhum
+        codigos_perdidos = set()
+        for item in pendentes:
+            tipo, dados = item[:2]
+            codigo_temp = dados[1] if tipo == 'presenca' else dados[0]
+            try:
+                if codigo_temp is not None and codigo_temp in codigos_perdidos:
+                    raise ValueError(f"pessoa desconhecida {codigo_temp} não foi gravada")
+                self.db.gravar_lote(*self._separar([item]))
+            except Exception as e:
+                if tipo == 'desconhecida':
+                    codigos_perdidos.add(codigo_temp)
+                self.descartados += 1
+                print(f"Erro ao gravar operação {tipo} ({codigo_temp or dados[0]}): {e}")
+                continue
+
+            self.gravados += 1
+            self._registrar_latencias([item])
+        self.lotes += 1
+
+    @staticmethod
+    def _separar(pendentes):
+        """(desconhecidas novas, atualizações, presenças) no formato de gravar_lote"""
+        desconhecidas_novas = [item[1] for item in pendentes if item[0] == 'desconhecida']
+        atualizacoes = [item[1] for item in pendentes if item[0] == 'atualizacao']
+        presencas = [item[1] for item in pendentes if item[0] == 'presenca']
+        return desconhecidas_novas, atualizacoes, presencas
+
+    def _registrar_latencias(self, itens):
+        agora = time.perf_counter()
+        for item in itens:
+            if item[0] == 'presenca' and item[2] is not None:
+                self.estatisticas.registrar(agora - item[2])
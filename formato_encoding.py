@@ -0,0 +1,110 @@
+import io
+import pickle
+import struct
+
+import numpy as np
+
+# Cabeçalho de 8 bytes: assinatura, versão, tipo dos dados, (reservado), dimensão
+ASSINATURA = b'RFE'
+VERSAO = 1
+CABECALHO = struct.Struct('<3sBBxH')
+TAMANHO_CABECALHO = CABECALHO.size
+
+# Códigos de tipo suportados; os dados são sempre little-endian
+TIPOS = {1: np.dtype('<f4')}
+CODIGO_FLOAT32 = 1
+
+# Únicas classes aceitas ao ler encodings antigos gravados com pickle
+CLASSES_PICKLE_PERMITIDAS = {
+    ('numpy', 'ndarray'),
+    ('numpy', 'dtype'),
+    ('numpy.core.multiarray', '_reconstruct'),
+    ('numpy.core.multiarray', 'scalar'),
+    ('numpy._core.multiarray', '_reconstruct'),
+    ('numpy._core.multiarray', 'scalar'),
+}
+
+
+class _UnpicklerRestrito(pickle.Unpickler):
+    """Unpickler que só reconstrói arrays NumPy (backups restaurados podem ter blobs arbitrários)"""
+
+    def find_class(self, module, name):
+        if (module, name) not in CLASSES_PICKLE_PERMITIDAS:
+            raise pickle.UnpicklingError(f"Classe não permitida em encoding: {module}.{name}")
+        return super().find_class(module, name)
+
+
+def serializar_encoding(encoding):
+    """Converte um encoding para o formato binário: cabeçalho + float32 brutos"""
+    dados = np.ascontiguousarray(np.asarray(encoding).ravel(), dtype='<f4')
+    return CABECALHO.pack(ASSINATURA, VERSAO, CODIGO_FLOAT32, len(dados)) + dados.tobytes()
+
+
+def formato_binario(blob):
+    """Indica se o blob está no formato binário (e não no pickle antigo)"""
+    return blob is not None and bytes(blob[:len(ASSINATURA)]) == ASSINATURA
+
+
+def _ler_cabecalho(blob):
+    assinatura, versao, codigo_tipo, dimensao = CABECALHO.unpack_from(blob)
+    if assinatura != ASSINATURA or versao != VERSAO or codigo_tipo not in TIPOS:
+        raise ValueError(f"Cabeçalho de encoding inválido (versão {versao}, tipo {codigo_tipo})")
+    return TIPOS[codigo_tipo], dimensao
+
+
+def carregar_encoding_legado(blob):
+    """Lê um encoding gravado com pickle, aceitando apenas arrays NumPy"""
+    return np.asarray(_UnpicklerRestrito(io.BytesIO(blob)).load())
+
+
+def desserializar_encoding(blob):
+    """Converte um blob (binário ou pickle antigo) em array NumPy"""
+    if not formato_binario(blob):
+        return carregar_encoding_legado(blob)
+
+    tipo, dimensao = _ler_cabecalho(blob)
+    if len(blob) != TAMANHO_CABECALHO + dimensao * tipo.itemsize:
+        raise ValueError("Tamanho do encoding não confere com o cabeçalho")
+    return np.frombuffer(blob, dtype=tipo, count=dimensao, offset=TAMANHO_CABECALHO)
+
+
+def desserializar_matriz(blobs):
+    """Decodifica uma coluna inteira de blobs em uma matriz (N, D) float32
+
+    Quando todos os blobs têm o mesmo cabeçalho (o caso normal), a coluna é
+    concatenada e lida com um único np.frombuffer, sem objetos por linha.
+    Retorna (matriz, linhas_validas), onde linhas_validas indica quais blobs
+    entraram na matriz.
+    """
+    if not blobs:
+        return np.empty((0, 0), dtype=np.float32), np.zeros(0, dtype=bool)
+
+    tamanho = len(blobs[0])
+    if formato_binario(blobs[0]) and all(len(blob) == tamanho for blob in blobs):
+        tipo, dimensao = _ler_cabecalho(blobs[0])
+        brutos = np.frombuffer(b''.join(blobs), dtype=np.uint8).reshape(len(blobs), tamanho)
+        cabecalhos = brutos[:, :TAMANHO_CABECALHO]
+        if tamanho == TAMANHO_CABECALHO + dimensao * tipo.itemsize and (cabecalhos == cabecalhos[0]).all():
+            matriz = np.ascontiguousarray(brutos[:, TAMANHO_CABECALHO:]).view(tipo)
+            return matriz.astype(np.float32, copy=False), np.ones(len(blobs), dtype=bool)
+
+    # Blobs mistos (pickle antigo ou dimensões diferentes): decodificar um a um
+    encodings = []
+    for blob in blobs:
+        try:
+            encodings.append(np.asarray(desserializar_encoding(blob), dtype=np.float32).ravel())
+        except Exception as e:
+            print(f"Erro ao decodificar encoding: {e}")
+            encodings.append(None)
+
+    dimensoes = [len(encoding) for encoding in encodings if encoding is not None]
+    if not dimensoes:
+        return np.empty((0, 0), dtype=np.float32), np.zeros(len(blobs), dtype=bool)
+
+    # Mantém a dimensão mais comum, a única comparável entre si
+    dimensao = max(set(dimensoes), key=dimensoes.count)
+    validas = np.array([encoding is not None and len(encoding) == dimensao for encoding in encodings])
+    if not validas.all():
+        print(f"Aviso: {int((~validas).sum())} encodings ignorados (inválidos ou com dimensão diferente de {dimensao})")
+    matriz = np.stack([encoding for encoding, valida in zip(encodings, validas) if valida])
+    return matriz, validas
@@ -0,0 +1,260 @@
+import copy
+
+import numpy as np
+
+from formato_encoding import desserializar_matriz
+from indice_galeria import IndiceExato, carregar_indice, salvar_indice
+
+
+def linhas_galeria(pessoas, modelos=()):
+    """Linhas da galeria para pessoas de pessoas_conhecidas e seus modelos adicionais
+
+    Cada pessoa ativa entra com o encoding principal e um encoding por modelo
+    (pessoa_id, encoding); o array de ids repete o id da pessoa, então a linha
+    mais parecida já dá o máximo sobre os modelos dela. Retorna (ids, matriz,
+    pessoas com ao menos uma linha válida).
+    """
+    ativas = [pessoa for pessoa in pessoas if pessoa[7] and pessoa[6]]
+    ids_ativos = {pessoa[0] for pessoa in ativas}
+    modelos = [modelo for modelo in modelos if modelo[0] in ids_ativos and modelo[1]]
+
+    ids = [pessoa[0] for pessoa in ativas] + [modelo[0] for modelo in modelos]
+    matriz, validas = desserializar_matriz([pessoa[6] for pessoa in ativas] + [modelo[1] for modelo in modelos])
+    ids = np.array([pessoa_id for pessoa_id, valida in zip(ids, validas) if valida], dtype=np.int64)
+
+    com_linhas = set(ids.tolist())
+    return ids, matriz, [pessoa for pessoa in ativas if pessoa[0] in com_linhas]
+
+
+class GaleriaFacial:
+    """Galeria de encodings conhecidos em uma matriz float32 contígua e pré-normalizada
+
+    Com `caminho_indice` e `versao` (a versão da galeria no banco), índices
+    persistíveis são salvos em disco e reaproveitados na próxima carga.
+    """
+
+    def __init__(self, ids=None, encodings=None, indice=None, caminho_indice=None, versao=None):
+        # encodings pode ser uma lista de vetores ou uma matriz (N, D)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matriz = np.empty((0, 0), dtype=np.float32)
+        self.indice = indice if indice is not None else IndiceExato()
+        self.caminho_indice = caminho_indice
+        self.versao = versao
+        # Índice alterado e ainda não salvo (ver persistir_indice)
+        self.indice_pendente = False
+        self._total_pessoas = (None, 0)
+        # Arrays com folga usados por adicionar(): (ids, matriz, vista de ids atual)
+        self._reserva = None
+
+        if ids is not None and encodings is not None:
+            self.construir(ids, encodings)
+
+    @classmethod
+    def sobre_arrays(cls, ids, matriz, indice=None, caminho_indice=None, versao=None):
+        """Galeria sobre ids e matriz já normalizados, sem cópia (ex.: memória compartilhada)"""
+        galeria = cls(indice=indice, caminho_indice=caminho_indice, versao=versao)
+        galeria.ids = ids
+        galeria.matriz = matriz
+        galeria._preparar_indice()
+        return galeria
+
+    @staticmethod
+    def normalizar(matriz):
+        """Normaliza as linhas da matriz (linhas nulas continuam nulas, como no sklearn)"""
+        matriz = np.asarray(matriz, dtype=np.float32)
+        normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+        normas[normas == 0.0] = 1.0
+        return matriz / normas
+
+    def construir(self, ids, encodings):
+        """Monta a matriz da galeria a partir de ids e encodings paralelos"""
+        if isinstance(encodings, np.ndarray) and encodings.ndim == 2:
+            return self.construir_de_matriz(ids, encodings)
+        
+        ids = list(ids)
+        encodings = [np.asarray(encoding, dtype=np.float32).ravel() for encoding in encodings]
+
+        if not encodings:
+            self.ids = np.empty(0, dtype=np.int64)
+            self.matriz = np.empty((0, 0), dtype=np.float32)
+            self.indice.construir(self.matriz)
+            return
+
+        # Todos os encodings gerados pelo extrator têm a mesma dimensão;
+        # encodings com dimensão diferente nunca seriam comparados
+        dimensao = len(encodings[0])
+        validos = [i for i, encoding in enumerate(encodings) if len(encoding) == dimensao]
+        if len(validos) != len(encodings):
+            print(f"Aviso: {len(encodings) - len(validos)} encodings com dimensão diferente de {dimensao} ignorados")
+
+        self.construir_de_matriz([ids[i] for i in validos], np.stack([encodings[i] for i in validos]))
+
+    def construir_de_matriz(self, ids, matriz):
+        """Monta a galeria a partir de uma matriz (N, D) já decodificada"""
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.matriz = np.ascontiguousarray(self.normalizar(matriz))
+        self._preparar_indice()
+
+    @property
+    def persiste_indice(self):
+        return bool(self.caminho_indice) and self.indice.persistivel and self.versao is not None
+
+    def _preparar_indice(self):
+        """Restaura o índice salvo em disco ou o reconstrói (e salva) a partir da matriz"""
+        if self.persiste_indice:
+            try:
+                if carregar_indice(self.caminho_indice, self.indice, self.matriz, self.ids, self.versao):
+                    return
+            except Exception as e:
+                print(f"Erro ao carregar índice salvo, reconstruindo: {e}")
+
+        self.indice.construir(self.matriz)
+        self.indice_pendente = self.persiste_indice
+        self.persistir_indice()
+
+    def persistir_indice(self):
+        """Salva o índice em disco se ele foi alterado desde o último salvamento"""
+        if not self.indice_pendente:
+            return False
+        try:
+            salvar_indice(self.caminho_indice, self.indice, self.ids, self.versao)
+            self.indice_pendente = False
+            return True
+        except Exception as e:
+            print(f"Erro ao salvar índice: {e}")
+            return False
+
+    def com_alteracoes(self, ids_alterados, novos_ids, novas_linhas, versao=None):
+        """Retorna uma nova galeria sem as linhas de `ids_alterados` e com as novas linhas
+
+        A galeria atual não é modificada: quem estiver lendo continua usando um
+        snapshot consistente até a referência ser trocada. O índice da nova
+        galeria não é salvo aqui: fica pendente até `persistir_indice`, para
+        que alterações seguidas não regravem o arquivo a cada vez.
+        """
+        manter = ~np.isin(self.ids, np.asarray(list(ids_alterados), dtype=np.int64))
+        ids = self.ids[manter]
+        matriz = self.matriz[manter]
+
+        if len(novos_ids):
+            linhas = self.normalizar(novas_linhas)
+            if len(ids) and linhas.shape[1] != matriz.shape[1]:
+                print(f"Aviso: {len(novos_ids)} encodings com dimensão {linhas.shape[1]} ignorados (galeria usa {matriz.shape[1]})")
+            else:
+                ids = np.concatenate([ids, np.asarray(novos_ids, dtype=np.int64)])
+                matriz = np.concatenate([matriz, linhas]) if len(matriz) else linhas
+
+        nova = GaleriaFacial(indice=copy.copy(self.indice), caminho_indice=self.caminho_indice, versao=versao)
+        nova.ids = ids
+        nova.matriz = np.ascontiguousarray(matriz, dtype=np.float32)
+        nova.indice.atualizar(nova.matriz)
+        nova.indice_pendente = nova.persiste_indice
+        return nova
+
+    def adicionar(self, pessoa_id, encoding):
+        """Acrescenta um encoding à galeria (para galerias pequenas, como a de desconhecidos)
+
+        As linhas são gravadas em arrays com folga que dobram de tamanho quando
+        enchem, então cada inclusão custa O(D) amortizado; ids e matriz passam a
+        ser vistas do trecho ocupado e o índice só é atualizado para a nova vista.
+        """
+        linha = self.normalizar(np.asarray(encoding).ravel())
+        total = len(self.ids)
+        if total and len(linha) != self.dimensao:
+            print(f"Aviso: encoding com dimensão {len(linha)} ignorado (galeria usa {self.dimensao})")
+            return
+
+        ids, matriz = self._reservar(total + 1, len(linha))
+        ids[total] = pessoa_id
+        matriz[total] = linha
+        self.ids = ids[:total + 1]
+        self.matriz = matriz[:total + 1]
+        self._reserva = (ids, matriz, self.ids)
+        self.indice.atualizar(self.matriz)
+
+    def _reservar(self, necessario, dimensao):
+        """Arrays com espaço para `necessario` linhas, reaproveitando a reserva atual"""
+        if self._reserva is not None:
+            ids, matriz, vista = self._reserva
+            # A reserva só vale enquanto ids não foi trocado por outro caminho
+            if vista is self.ids and len(ids) >= necessario:
+                return ids, matriz
+
+        capacidade = max(16, 2 * necessario)
+        ids = np.empty(capacidade, dtype=np.int64)
+        matriz = np.empty((capacidade, dimensao), dtype=np.float32)
+        total = len(self.ids)
+        if total:
+            ids[:total] = self.ids
+            matriz[:total] = self.matriz
+        return ids, matriz
+
+    def remover(self, ids_removidos):
+        """Retira da galeria as linhas de `ids_removidos`
+
+        Gera arrays novos: quem ainda tem as vistas anteriores não as vê mudar.
+        """
+        manter = ~np.isin(self.ids, np.asarray(list(ids_removidos), dtype=np.int64))
+        if manter.all():
+            return
+        self.ids = self.ids[manter]
+        self.matriz = self.matriz[manter]
+        self._reserva = None
+        self.indice.atualizar(self.matriz)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def total_pessoas(self):
+        """Pessoas distintas na galeria (cada uma pode ter vários modelos)"""
+        # Contagem guardada junto do array de ids: só refeita quando ele é trocado
+        ids, total = self._total_pessoas
+        if ids is not self.ids:
+            ids, total = self.ids, len(np.unique(self.ids))
+            self._total_pessoas = (ids, total)
+        return total
+
+    @property
+    def dimensao(self):
+        return self.matriz.shape[1] if len(self.ids) else 0
+
+    def reconhecer(self, encoding, tolerancia):
+        """Retorna (id, confiança) do melhor match acima da tolerância, ou (None, 0.0)"""
+        if encoding is None or len(self.ids) == 0 or len(encoding) != self.dimensao:
+            return None, 0.0
+
+        consulta = self.normalizar(np.asarray(encoding).ravel())
+        linhas, similaridades = self.indice.buscar(consulta[np.newaxis, :])
+
+        confianca = float(similaridades[0])
+        if confianca > tolerancia:
+            return int(self.ids[linhas[0]]), confianca
+        return None, 0.0
+
+    def reconhecer_lote(self, encodings, tolerancia):
+        """Reconhece todas as faces de um frame com um único produto matriz-matriz"""
+        if len(encodings) == 0:
+            return []
+        if len(self.ids) == 0:
+            return [(None, 0.0)] * len(encodings)
+
+        try:
+            consultas = np.asarray(encodings, dtype=np.float32)
+        except (ValueError, TypeError):
+            consultas = None
+
+        # Encodings de dimensões variadas caem na comparação individual
+        if consultas is None or consultas.ndim != 2 or consultas.shape[1] != self.dimensao:
+            return [self.reconhecer(encoding, tolerancia) for encoding in encodings]
+
+        consultas = self.normalizar(consultas)
+        melhores, confiancas = self.indice.buscar(consultas)
+
+        resultados = []
+        for melhor, confianca in zip(melhores, confiancas):
+            if confianca > tolerancia:
+                resultados.append((int(self.ids[melhor]), float(confianca)))
+            else:
+                resultados.append((None, 0.0))
+        return resultados
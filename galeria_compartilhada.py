@@ -0,0 +1,182 @@
+import itertools
+import multiprocessing
+import os
+import struct
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from galeria import GaleriaFacial
+
+# Segmento de controle: assinatura, versão do formato e geração publicada.
+# Só a geração muda depois da criação, com uma escrita alinhada de 8 bytes
+ASSINATURA_CONTROLE = b'RFGC'
+CABECALHO_CONTROLE = struct.Struct('<4sIQ')
+OFFSET_GERACAO = 8
+
+# Segmento de dados (um por geração): assinatura, versão do formato, geração,
+# versão da galeria no banco, linhas e dimensão; depois ids int64 e matriz float32
+ASSINATURA_DADOS = b'RFGD'
+CABECALHO_DADOS = struct.Struct('<4sIQqQQ')
+VERSAO_FORMATO = 1
+
+# Sufixo dos nomes padrão: vários publicadores podem existir no mesmo processo
+_publicadores = itertools.count(1)
+
+
+def _nome_segmento(nome, geracao):
+    return f"{nome}_{geracao}"
+
+
+def _anexar(nome):
+    """Abre um segmento existente sem que o resource_tracker o apague ao sair"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=nome, track=False)
+
+    segmento = shared_memory.SharedMemory(name=nome)
+    # Antes do 3.13, anexar registra o segmento no resource_tracker. Processos
+    # filhos do multiprocessing usam o mesmo tracker do publicador, que cancela o
+    # registro ao apagar o segmento; já um processo independente tem o próprio
+    # tracker, que apagaria o segmento quando o leitor terminasse
+    if multiprocessing.parent_process() is None:
+        try:
+            resource_tracker.unregister(segmento._name, 'shared_memory')
+        except Exception:
+            pass
+    return segmento
+
+
+class PublicadorGaleria:
+    """Publica a matriz da galeria em memória compartilhada para outros processos
+
+    Cada publicação cria um segmento novo e só então troca a geração no
+    segmento de controle, então os leitores nunca veem uma galeria pela
+    metade. A geração anterior é mantida até a próxima publicação para quem
+    ainda estiver anexando a ela.
+    """
+
+    def __init__(self, nome=None):
+        self.nome = nome or f"rfg_{os.getpid()}_{next(_publicadores)}"
+        self.geracao = 0
+        self._segmentos = {}
+
+        self._controle = shared_memory.SharedMemory(
+            name=self.nome, create=True, size=CABECALHO_CONTROLE.size
+        )
+        CABECALHO_CONTROLE.pack_into(self._controle.buf, 0, ASSINATURA_CONTROLE, VERSAO_FORMATO, 0)
+
+    def publicar(self, galeria, versao_galeria=0):
+        """Copia ids e matriz da galeria para um segmento novo e o torna a geração atual"""
+        ids = np.ascontiguousarray(galeria.ids, dtype=np.int64)
+        matriz = np.ascontiguousarray(galeria.matriz, dtype=np.float32)
+        linhas = len(ids)
+        dimensao = matriz.shape[1] if matriz.ndim == 2 else 0
+
+        geracao = self.geracao + 1
+        tamanho = CABECALHO_DADOS.size + ids.nbytes + matriz.nbytes
+        segmento = shared_memory.SharedMemory(
+            name=_nome_segmento(self.nome, geracao), create=True, size=max(tamanho, 1)
+        )
+        CABECALHO_DADOS.pack_into(
+            segmento.buf, 0, ASSINATURA_DADOS, VERSAO_FORMATO, geracao, versao_galeria, linhas, dimensao
+        )
+        if linhas:
+            destino_ids = np.ndarray(linhas, dtype=np.int64, buffer=segmento.buf, offset=CABECALHO_DADOS.size)
+            destino_ids[:] = ids
+            destino_matriz = np.ndarray((linhas, dimensao), dtype=np.float32, buffer=segmento.buf,
+                                        offset=CABECALHO_DADOS.size + ids.nbytes)
+            destino_matriz[:] = matriz
+            del destino_ids, destino_matriz
+
+        # Troca atômica: a nova geração só fica visível depois de completa
+        np.ndarray(1, dtype=np.uint64, buffer=self._controle.buf, offset=OFFSET_GERACAO)[0] = geracao
+        self._segmentos[geracao] = segmento
+        self.geracao = geracao
+
+        # Gerações anteriores à anterior já não são anexadas por ninguém; quem
+        # ainda usa uma delas continua com o mapeamento válido até fechá-lo
+        for antiga in [g for g in self._segmentos if g < geracao - 1]:
+            self._remover(antiga)
+        return geracao
+
+    def _remover(self, geracao):
+        segmento = self._segmentos.pop(geracao)
+        segmento.close()
+        segmento.unlink()
+
+    def fechar(self):
+        """Remove todos os segmentos publicados"""
+        for geracao in list(self._segmentos):
+            self._remover(geracao)
+        self._controle.close()
+        self._controle.unlink()
+
+
+class LeitorGaleria:
+    """Anexa à galeria publicada como views NumPy somente leitura, sem cópia"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self._controle = _anexar(nome)
+        assinatura, versao, _ = CABECALHO_CONTROLE.unpack_from(self._controle.buf)
+        if assinatura != ASSINATURA_CONTROLE or versao != VERSAO_FORMATO:
+            raise ValueError(f"Segmento {nome} não contém uma galeria compartilhada")
+
+        self.geracao = 0
+        self.versao_galeria = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matriz = np.empty((0, 0), dtype=np.float32)
+        self._segmento = None
+        self._antigos = []
+
+    def geracao_publicada(self):
+        return int(np.ndarray(1, dtype=np.uint64, buffer=self._controle.buf, offset=OFFSET_GERACAO)[0])
+
+    def atualizar(self):
+        """Anexa à geração publicada mais recente; retorna True se ela mudou"""
+        geracao = self.geracao_publicada()
+        if geracao == self.geracao or geracao == 0:
+            return False
+
+        try:
+            segmento = _anexar(_nome_segmento(self.nome, geracao))
+        except FileNotFoundError:
+            # Outra geração foi publicada entre a leitura e a anexação; fica para a próxima
+            return False
+
+        assinatura, _, geracao_segmento, versao_galeria, linhas, dimensao = CABECALHO_DADOS.unpack_from(segmento.buf)
+        if assinatura != ASSINATURA_DADOS or geracao_segmento != geracao:
+            segmento.close()
+            raise ValueError(f"Segmento da geração {geracao} inválido")
+
+        ids = np.ndarray(linhas, dtype=np.int64, buffer=segmento.buf, offset=CABECALHO_DADOS.size)
+        matriz = np.ndarray((linhas, dimensao), dtype=np.float32, buffer=segmento.buf,
+                            offset=CABECALHO_DADOS.size + ids.nbytes)
+        ids.flags.writeable = False
+        matriz.flags.writeable = False
+
+        if self._segmento is not None:
+            self._antigos.append(self._segmento)
+        self._segmento = segmento
+        self.ids = ids
+        self.matriz = matriz
+        self.versao_galeria = versao_galeria
+        self.geracao = geracao
+        self._fechar_antigos()
+        return True
+
+    def _fechar_antigos(self):
+        """Fecha os segmentos antigos que não têm mais views em uso"""
+        pendentes = []
+        for segmento in self._antigos:
+            try:
+                segmento.close()
+            except BufferError:
+                pendentes.append(segmento)
+        self._antigos = pendentes
+
+    def galeria(self, indice=None, caminho_indice=None):
+        """GaleriaFacial sobre as views da geração atual"""
+        return GaleriaFacial.sobre_arrays(self.ids, self.matriz, indice=indice, caminho_indice=caminho_indice,
+                                          versao=self.versao_galeria)
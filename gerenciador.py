@@ -303,6 +303,7 @@ class GerenciadorSistema:
             print("3. Relatório do Mês")
             print("4. Relatório Personalizado")
             print("5. Estatísticas Gerais")
+            print("6. Recalcular Estatísticas")
             print("0. Voltar")
             print("-"*40)
             
@@ -318,6 +319,8 @@ class GerenciadorSistema:
                 self.relatorio_personalizado()
             elif opcao == "5":
                 self.estatisticas_gerais()
+            elif opcao == "6":
+                self.recalcular_estatisticas()
             elif opcao == "0":
                 break
             else:
@@ -343,40 +346,43 @@ class GerenciadorSistema:
         fim = hoje.strftime('%Y-%m-%d')
         self.gerar_relatorio(inicio, fim, "MÊS ATUAL")
     
-    def gerar_relatorio(self, data_inicio, data_fim, titulo):
-        """Gera relatório de presenças"""
+    def gerar_relatorio(self, data_inicio, data_fim, titulo, tamanho_pagina=50):
+        """Gera relatório de presenças, uma página por vez"""
         try:
-            registros = self.db.obter_relatorio_presencas(data_inicio, data_fim)
+            total, conhecidas, desconhecidas = self.db.resumo_presencas(data_inicio, data_fim)
             
             print(f"\n{'='*60}")
             print(f"    RELATÓRIO DE PRESENÇAS - {titulo}")
             print(f"    Período: {data_inicio} a {data_fim}")
             print(f"{'='*60}")
             
-            if not registros:
+            if not total:
                 print("Nenhum registro encontrado no período.")
                 return
             
             print(f"{'Data/Hora':<20} {'Nome/Código':<25} {'Tipo':<12} {'Confiança':<10}")
             print("-"*70)
             
-            conhecidas = 0
-            desconhecidas = 0
-            
-            for registro in registros:
-                data_presenca, identificacao, tipo_pessoa, confianca = registro
-                data_formatada = data_presenca[:16]  # YYYY-MM-DD HH:MM
-                confianca_str = f"{confianca:.2f}" if confianca else "N/A"
+            exibidos = 0
+            apos = None
+            while True:
+                registros, apos = self.db.obter_pagina_presencas(data_inicio, data_fim, tamanho_pagina, apos)
                 
-                print(f"{data_formatada:<20} {identificacao:<25} {tipo_pessoa:<12} {confianca_str:<10}")
+                for registro in registros:
+                    data_presenca, identificacao, tipo_pessoa, confianca = registro
+                    data_formatada = data_presenca[:16]  # YYYY-MM-DD HH:MM
+                    confianca_str = f"{confianca:.2f}" if confianca else "N/A"
+                    
+                    print(f"{data_formatada:<20} {str(identificacao):<25} {tipo_pessoa:<12} {confianca_str:<10}")
+                exibidos += len(registros)
                 
-                if tipo_pessoa == 'conhecida':
-                    conhecidas += 1
-                else:
-                    desconhecidas += 1
+                if apos is None or exibidos >= total:
+                    break
+                if input(f"-- {exibidos} de {total} -- Enter para continuar, 's' para parar: ").strip().lower() == 's':
+                    break
             
             print("-"*70)
-            print(f"Total: {len(registros)} registros")
+            print(f"Total: {total} registros")
             print(f"Pessoas conhecidas: {conhecidas}")
             print(f"Pessoas desconhecidas: {desconhecidas}")
             
@@ -385,6 +391,59 @@ class GerenciadorSistema:
         
         input("\nPressione Enter para continuar...")
     
+    def estatisticas_gerais(self):
+        """Mostra estatísticas de frequência a partir dos resumos diários"""
+        try:
+            estatisticas = self.db.obter_estatisticas_gerais()
+            
+            print(f"\n{'='*60}")
+            print("    ESTATÍSTICAS GERAIS")
+            print(f"{'='*60}")
+            print(f"Pessoas cadastradas: {estatisticas['pessoas_conhecidas']}")
+            print(f"Desconhecidas pendentes: {estatisticas['desconhecidas_pendentes']}")
+            print(f"Registros de presença: {estatisticas['total_registros']}")
+            print(f"Dias de culto: {estatisticas['dias_culto']}")
+            print(f"Média de presentes por culto: {estatisticas['media_presentes']:.1f}")
+            print(f"Maior público: {estatisticas['maximo_presentes']}")
+            print(f"Visitantes únicos: {estatisticas['visitantes_conhecidas']} conhecidos, "
+                  f"{estatisticas['visitantes_desconhecidas']} desconhecidos")
+            
+            hoje = datetime.now()
+            conhecidas, desconhecidas = self.db.contar_visitantes_unicos(
+                hoje.replace(day=1).strftime('%Y-%m-%d'), hoje.strftime('%Y-%m-%d')
+            )
+            print(f"Visitantes únicos no mês: {conhecidas} conhecidos, {desconhecidas} desconhecidos")
+            
+            dias = self.db.obter_presencas_diarias(limite=8)
+            if dias:
+                print(f"\n{'Dia':<12} {'Conhecidos':<12} {'Desconhecidos':<15} {'Detecções':<10}")
+                print("-"*50)
+                for dia, deteccoes, presentes_conhecidas, presentes_desconhecidas in dias:
+                    print(f"{dia:<12} {presentes_conhecidas:<12} {presentes_desconhecidas:<15} {deteccoes:<10}")
+            
+            frequentes = self.db.obter_mais_frequentes(10)
+            if frequentes:
+                print(f"\n{'Nome':<25} {'Dias':<6} {'Sequência':<10} {'Última presença':<20}")
+                print("-"*63)
+                for pessoa_id, nome, dias_presentes, ultima in frequentes:
+                    frequencia = self.db.obter_frequencia_pessoa(pessoa_id)
+                    print(f"{nome:<25} {dias_presentes:<6} {frequencia[4]:<10} {ultima[:16]:<20}")
+            
+        except Exception as e:
+            print(f"Erro ao obter estatísticas: {e}")
+        
+        input("\nPressione Enter para continuar...")
+    
+    def recalcular_estatisticas(self):
+        """Refaz os resumos de presença a partir de todos os registros"""
+        try:
+            dias = self.db.recalcular_resumos_presenca()
+            print(f"Estatísticas recalculadas: {dias} dias de culto")
+        except Exception as e:
+            print(f"Erro ao recalcular estatísticas: {e}")
+        
+        input("Pressione Enter para continuar...")
+    
     def menu_configuracoes(self):
         """Menu de configurações"""
         while True:
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Importação de Pessoas a partir de Fotos
+Cadastra em lote as pessoas de um diretório de fotos, com os dados (nome,
+idade, telefone, ...) lidos de um arquivo CSV
+"""
+
+import argparse
+import base64
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from formato_encoding import serializar_encoding
+
+# Fotos maiores que isso são reduzidas antes da malha (o MediaPipe trabalha
+# em baixa resolução de qualquer forma; a redução só economiza tempo)
+LADO_MAXIMO = 1600
+
+# Componentes do processo trabalhador (um MediaPipe por processo)
+_face_mesh = None
+_extrator = None
+_avaliador = None
+_indices_contorno = None
+
+
+def ler_cadastros(caminho_csv):
+    """Lê o CSV de cadastro: uma linha por foto, com as colunas arquivo e nome
+    (obrigatórias) e idade, sexo, etnia e telefone (opcionais)
+
+    Retorna (cadastros, rejeitadas); as linhas com dados inválidos vão direto
+    para as rejeitadas, como (arquivo, nome, motivo).
+    """
+    cadastros = []
+    rejeitadas = []
+    vistos = set()
+
+    with open(caminho_csv, newline='', encoding='utf-8-sig') as arquivo:
+        leitor = csv.DictReader(arquivo)
+        colunas = {coluna.strip().lower() for coluna in leitor.fieldnames or []}
+        faltando = {'arquivo', 'nome'} - colunas
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(sorted(faltando))}")
+
+        for linha in leitor:
+            linha = {(chave or '').strip().lower(): (valor or '').strip() for chave, valor in linha.items()}
+            arquivo_foto, nome = linha.get('arquivo', ''), linha.get('nome', '')
+
+            if not arquivo_foto or not nome:
+                rejeitadas.append((arquivo_foto, nome, "arquivo ou nome em branco"))
+                continue
+            if arquivo_foto in vistos:
+                rejeitadas.append((arquivo_foto, nome, "arquivo repetido no CSV"))
+                continue
+
+            idade = linha.get('idade') or None
+            if idade is not None:
+                try:
+                    idade = int(idade)
+                except ValueError:
+                    rejeitadas.append((arquivo_foto, nome, f"idade inválida: {idade}"))
+                    continue
+
+            vistos.add(arquivo_foto)
+            cadastros.append({
+                'arquivo': arquivo_foto,
+                'nome': nome,
+                'idade': idade,
+                'sexo': linha.get('sexo') or None,
+                'etnia': linha.get('etnia') or None,
+                'telefone': linha.get('telefone') or None,
+            })
+
+    return cadastros, rejeitadas
+
+
+class DiarioImportacao:
+    """Registro em disco do resultado de cada foto, para retomar a importação
+
+    Um JSON por linha: o identificador do lote, o encoding (ou o motivo da
+    recusa) de cada foto processada e, depois da gravação no banco, uma linha
+    final de conclusão. Cada linha é gravada assim que a foto termina, então
+    uma importação interrompida recomeça só das fotos que faltam; uma linha
+    cortada pela interrupção é ignorada. O banco registra o lote junto com as
+    pessoas, então uma interrupção entre a gravação e a conclusão não
+    duplica ninguém na execução seguinte.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.resultados = {}
+        self.concluido = False
+        self.lote = None
+        self._arquivo = None
+
+        if os.path.exists(caminho):
+            with open(caminho, encoding='utf-8') as arquivo:
+                for linha in arquivo:
+                    try:
+                        registro = json.loads(linha)
+                    except json.JSONDecodeError:
+                        continue
+                    if registro.get('concluido'):
+                        self.concluido = True
+                    elif 'lote' in registro:
+                        self.lote = registro['lote']
+                    else:
+                        self.resultados[registro['arquivo']] = registro
+
+        # O lote precisa estar em disco antes de ser gravado no banco
+        if self.lote is None and not self.concluido:
+            self.lote = uuid.uuid4().hex
+            self._escrever({'lote': self.lote})
+            os.fsync(self._arquivo.fileno())
+
+    def registrar(self, arquivo_foto, encoding=None, qualidade=None, motivo=None):
+        if encoding is not None:
+            registro = {
+                'arquivo': arquivo_foto,
+                'encoding': base64.b64encode(serializar_encoding(encoding)).decode('ascii'),
+                'qualidade': qualidade,
+            }
+        else:
+            registro = {'arquivo': arquivo_foto, 'motivo': motivo}
+        self._escrever(registro)
+        self.resultados[arquivo_foto] = registro
+
+    def concluir(self, pessoas):
+        self._escrever({'concluido': True, 'pessoas': pessoas})
+        os.fsync(self._arquivo.fileno())
+        self.concluido = True
+
+    def _escrever(self, registro):
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        self._arquivo.flush()
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+def _inicializar_trabalhador(tamanho_minimo, nitidez_minima):
+    """Cria a malha em modo de imagem estática e o extrator (uma vez por processo)"""
+    global _face_mesh, _extrator, _avaliador, _indices_contorno
+    import mediapipe as mp
+    from embedding import ExtratorEmbedding
+    from qualidade_face import AvaliadorQualidade
+
+    # Mesmos landmarks (refinados) da câmera, para que os encodings sejam comparáveis
+    _face_mesh = mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True,
+        max_num_faces=2,
+        refine_landmarks=True,
+        min_detection_confidence=0.5
+    )
+    _extrator = ExtratorEmbedding()
+    _avaliador = AvaliadorQualidade(tamanho_minimo=tamanho_minimo, nitidez_minima=nitidez_minima)
+    _indices_contorno = np.array(
+        sorted({indice for par in mp.solutions.face_mesh.FACEMESH_FACE_OVAL for indice in par})
+    )
+
+
+def ler_imagem(caminho_foto):
+    """Lê a foto em RGB (aceita nomes com acentos), reduzida a LADO_MAXIMO; None se ilegível"""
+    dados = np.fromfile(caminho_foto, dtype=np.uint8)
+    imagem = cv2.imdecode(dados, cv2.IMREAD_COLOR) if dados.size else None
+    if imagem is None:
+        return None
+
+    maior_lado = max(imagem.shape[:2])
+    if maior_lado > LADO_MAXIMO:
+        escala = LADO_MAXIMO / maior_lado
+        imagem = cv2.resize(imagem, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(imagem, cv2.COLOR_BGR2RGB)
+
+
+def processar_foto(tarefa):
+    """Extrai o encoding de uma foto: (arquivo, encoding, qualidade, motivo da recusa)"""
+    from qualidade_face import caixa_dos_landmarks
+
+    arquivo_foto, caminho_foto = tarefa
+    try:
+        if not os.path.isfile(caminho_foto):
+            return arquivo_foto, None, None, "arquivo não encontrado"
+
+        imagem = ler_imagem(caminho_foto)
+        if imagem is None:
+            return arquivo_foto, None, None, "imagem ilegível"
+
+        resultados = _face_mesh.process(imagem)
+        if not resultados.multi_face_landmarks:
+            return arquivo_foto, None, None, "nenhum rosto encontrado"
+        if len(resultados.multi_face_landmarks) > 1:
+            return arquivo_foto, None, None, "mais de um rosto"
+
+        landmarks = resultados.multi_face_landmarks[0]
+        altura, largura = imagem.shape[:2]
+        caixa = caixa_dos_landmarks(landmarks, _indices_contorno, largura, altura)
+        aceita, motivo, qualidade = _avaliador.avaliar(imagem, landmarks, caixa)
+        if not aceita:
+            return arquivo_foto, None, None, motivo
+
+        encoding = _extrator.extrair(imagem, landmarks)
+        if encoding is None or len(encoding) == 0:
+            return arquivo_foto, None, None, "falha ao extrair encoding"
+        return arquivo_foto, np.asarray(encoding, dtype=np.float32), qualidade, None
+
+    except Exception as e:
+        return arquivo_foto, None, None, f"erro: {e}"
+
+
+def salvar_rejeitadas(caminho, rejeitadas):
+    with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(['arquivo', 'nome', 'motivo'])
+        escritor.writerows(rejeitadas)
+
+
+def importar_fotos(caminho_csv, diretorio_fotos=None, db_path="igreja_reconhecimento.db",
+                   processos=None, reiniciar=False):
+    """Importa as pessoas do CSV e grava todas no banco em uma única transação
+
+    As fotos são processadas em paralelo e o resultado de cada uma vai para
+    o diário (`<csv>.importacao`); executar de novo depois de uma interrupção
+    continua de onde parou. A gravação no banco só acontece quando todas as
+    fotos foram processadas.
+    """
+    from database import DatabaseManager
+
+    diretorio_fotos = diretorio_fotos or os.path.dirname(os.path.abspath(caminho_csv))
+    caminho_diario = caminho_csv + '.importacao'
+    caminho_rejeitadas = os.path.splitext(caminho_csv)[0] + '_rejeitadas.csv'
+
+    if reiniciar and os.path.exists(caminho_diario):
+        os.remove(caminho_diario)
+
+    diario = DiarioImportacao(caminho_diario)
+    if diario.concluido:
+        print(f"Esta importação já foi gravada no banco ({caminho_diario}).")
+        print("Use --reiniciar para importar o CSV novamente.")
+        return None
+
+    cadastros, rejeitadas_csv = ler_cadastros(caminho_csv)
+    pendentes = [
+        (cadastro['arquivo'], os.path.join(diretorio_fotos, cadastro['arquivo']))
+        for cadastro in cadastros if cadastro['arquivo'] not in diario.resultados
+    ]
+
+    db = DatabaseManager(db_path)
+    processos = processos or os.cpu_count() or 1
+
+    print(f"{len(cadastros)} fotos no CSV, {len(cadastros) - len(pendentes)} já processadas, "
+          f"{len(pendentes)} pendentes")
+
+    decorrido = 0.0
+    try:
+        if pendentes:
+            print(f"\nProcessando {len(pendentes)} fotos em {processos} processos...")
+            inicio = time.perf_counter()
+            iniciargs = (
+                int(db.obter_configuracao('tamanho_minimo_face') or 120),
+                float(db.obter_configuracao('nitidez_minima') or 60),
+            )
+            with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_trabalhador,
+                                     initargs=iniciargs,
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                # Fotos em pequenos blocos por processo: menos idas e voltas entre processos
+                resultados = executor.map(processar_foto, pendentes, chunksize=8)
+                for processadas, (arquivo_foto, encoding, qualidade, motivo) in enumerate(resultados, 1):
+                    diario.registrar(arquivo_foto, encoding, qualidade, motivo)
+                    if processadas % 100 == 0 or processadas == len(pendentes):
+                        taxa = processadas / max(time.perf_counter() - inicio, 1e-9)
+                        print(f"  {processadas}/{len(pendentes)} fotos ({taxa:.1f} fotos/s)")
+            decorrido = time.perf_counter() - inicio
+
+        # Todas as pessoas aceitas em uma única transação, na ordem do CSV
+        pessoas = []
+        rejeitadas = list(rejeitadas_csv)
+        for cadastro in cadastros:
+            resultado = diario.resultados[cadastro['arquivo']]
+            if 'encoding' in resultado:
+                pessoas.append((
+                    cadastro['nome'], cadastro['idade'], cadastro['sexo'], cadastro['etnia'],
+                    cadastro['telefone'], base64.b64decode(resultado['encoding'])
+                ))
+            else:
+                rejeitadas.append((cadastro['arquivo'], cadastro['nome'], resultado['motivo']))
+
+        if pessoas and not db.adicionar_pessoas_conhecidas(pessoas, lote=diario.lote):
+            print(f"O lote {diario.lote} já estava gravado no banco; nenhuma pessoa inserida de novo.")
+        diario.concluir(len(pessoas))
+    finally:
+        diario.fechar()
+        db.fechar()
+
+    if rejeitadas:
+        salvar_rejeitadas(caminho_rejeitadas, rejeitadas)
+
+    fotos_por_segundo = len(pendentes) / decorrido if decorrido > 0 else 0.0
+    print("\n=== IMPORTAÇÃO CONCLUÍDA ===")
+    print(f"Pessoas cadastradas: {len(pessoas)}")
+    print(f"Fotos rejeitadas: {len(rejeitadas)}")
+    for motivo, total in Counter(motivo for _, _, motivo in rejeitadas).most_common():
+        print(f"  {motivo}: {total}")
+    if rejeitadas:
+        print(f"Lista das rejeitadas: {caminho_rejeitadas}")
+    if pendentes:
+        print(f"Tempo: {decorrido:.1f} s")
+        print(f"Throughput: {fotos_por_segundo:.1f} fotos/s "
+              f"({fotos_por_segundo / processos:.1f} por núcleo, {processos} processos)")
+
+    return {
+        'pessoas': len(pessoas),
+        'rejeitadas': len(rejeitadas),
+        'segundos': decorrido,
+        'fotos_por_segundo': fotos_por_segundo,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cadastra em lote as pessoas de um diretório de fotos")
+    parser.add_argument('csv', help="CSV com as colunas arquivo e nome (e, opcionalmente, idade, sexo, etnia e telefone)")
+    parser.add_argument('--fotos', default=None, help="Diretório das fotos (padrão: o diretório do CSV)")
+    parser.add_argument('--banco', default="igreja_reconhecimento.db", help="Arquivo do banco de dados")
+    parser.add_argument('--processos', type=int, default=None, help="Processos trabalhadores (padrão: núcleos da CPU)")
+    parser.add_argument('--reiniciar', action='store_true',
+                        help="Descarta o diário de uma importação anterior e processa todas as fotos")
+    args = parser.parse_args()
+
+    try:
+        importar_fotos(args.csv, args.fotos, args.banco, args.processos, args.reiniciar)
+    except KeyboardInterrupt:
+        print("\nImportação interrompida. Execute o mesmo comando para continuar de onde parou.")
+
+
+if __name__ == "__main__":
+    main()
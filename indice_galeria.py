@@ -0,0 +1,214 @@
+import hashlib
+import os
+
+import numpy as np
+
+
+class IndiceExato:
+    """Busca exata (força bruta) sobre toda a matriz da galeria"""
+
+    tipo = 'exato'
+    # Construir a busca exata é instantâneo, não vale a pena salvar em disco
+    persistivel = False
+
+    def __init__(self):
+        self.matriz = np.empty((0, 0), dtype=np.float32)
+
+    def construir(self, matriz):
+        """Prepara o índice para a matriz normalizada da galeria"""
+        self.matriz = matriz
+
+    def buscar(self, consultas):
+        """Retorna (linhas, similaridades) do melhor vizinho de cada consulta"""
+        similaridades = consultas @ self.matriz.T
+        melhores = np.argmax(similaridades, axis=1)
+        return melhores, similaridades[np.arange(len(melhores)), melhores]
+
+    def atualizar(self, matriz):
+        """Ajusta o índice a uma matriz alterada incrementalmente"""
+        self.construir(matriz)
+
+    def estado(self):
+        """Arrays necessários para persistir o índice"""
+        return {}
+
+    def restaurar(self, matriz, estado):
+        """Restaura o índice a partir de um estado salvo"""
+        self.construir(matriz)
+
+
+class IndiceIVF:
+    """Índice aproximado por listas invertidas (k-means esférico em NumPy puro)
+
+    Cada encoding é atribuído ao centróide mais próximo. A busca compara a
+    consulta apenas com as `n_sondas` listas mais próximas: mais sondas dão
+    mais recall e mais latência; `n_sondas == n_listas` equivale à busca exata.
+    """
+
+    tipo = 'ivf'
+    persistivel = True
+
+    def __init__(self, n_listas=None, n_sondas=8, iteracoes=10, amostra_treino=50000, semente=0):
+        self.n_listas = n_listas
+        self.n_sondas = n_sondas
+        self.iteracoes = iteracoes
+        self.amostra_treino = amostra_treino
+        self.semente = semente
+
+        self.matriz = np.empty((0, 0), dtype=np.float32)
+        self.centroides = np.empty((0, 0), dtype=np.float32)
+        # Listas invertidas em formato CSR: linhas ordenadas por lista + início de cada lista
+        self.ordem = np.empty(0, dtype=np.int64)
+        self.inicios = np.zeros(1, dtype=np.int64)
+
+    @staticmethod
+    def _normalizar(matriz):
+        normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+        normas[normas == 0.0] = 1.0
+        return matriz / normas
+
+    def _atribuir(self, matriz, centroides, bloco=16384):
+        """Índice do centróide mais próximo de cada linha, em blocos para limitar memória"""
+        atribuicoes = np.empty(len(matriz), dtype=np.int64)
+        for inicio in range(0, len(matriz), bloco):
+            parte = matriz[inicio:inicio + bloco]
+            atribuicoes[inicio:inicio + bloco] = np.argmax(parte @ centroides.T, axis=1)
+        return atribuicoes
+
+    def _treinar(self, matriz, n_listas):
+        """K-means esférico sobre uma amostra da galeria"""
+        rng = np.random.default_rng(self.semente)
+        if len(matriz) > self.amostra_treino:
+            amostra = matriz[rng.choice(len(matriz), self.amostra_treino, replace=False)]
+        else:
+            amostra = matriz
+
+        centroides = amostra[rng.choice(len(amostra), n_listas, replace=False)].copy()
+        for _ in range(self.iteracoes):
+            atribuicoes = self._atribuir(amostra, centroides)
+            somas = np.zeros_like(centroides)
+            np.add.at(somas, atribuicoes, amostra)
+            contagens = np.bincount(atribuicoes, minlength=n_listas)
+
+            # Listas vazias recebem um ponto aleatório da amostra
+            vazias = np.flatnonzero(contagens == 0)
+            if len(vazias):
+                somas[vazias] = amostra[rng.choice(len(amostra), len(vazias), replace=False)]
+
+            centroides = self._normalizar(somas).astype(np.float32)
+        return centroides
+
+    def _montar_listas(self, atribuicoes):
+        self.ordem = np.argsort(atribuicoes, kind='stable').astype(np.int64)
+        contagens = np.bincount(atribuicoes, minlength=len(self.centroides))
+        self.inicios = np.concatenate(([0], np.cumsum(contagens))).astype(np.int64)
+
+    def construir(self, matriz, centroides=None):
+        """Treina os centróides (ou reaproveita os informados) e monta as listas"""
+        self.matriz = matriz
+        if len(matriz) == 0:
+            self.centroides = np.empty((0, matriz.shape[1] if matriz.ndim == 2 else 0), dtype=np.float32)
+            self.ordem = np.empty(0, dtype=np.int64)
+            self.inicios = np.zeros(1, dtype=np.int64)
+            return
+
+        if centroides is None:
+            n_listas = self.n_listas or max(1, int(np.sqrt(len(matriz))))
+            centroides = self._treinar(matriz, min(n_listas, len(matriz)))
+        self.centroides = centroides
+        self._montar_listas(self._atribuir(matriz, centroides))
+
+    def buscar(self, consultas):
+        """Retorna (linhas, similaridades) do melhor vizinho aproximado de cada consulta"""
+        n_sondas = min(self.n_sondas, len(self.centroides))
+        proximidade = consultas @ self.centroides.T
+        if n_sondas < len(self.centroides):
+            sondas = np.argpartition(-proximidade, n_sondas - 1, axis=1)[:, :n_sondas]
+        else:
+            sondas = np.broadcast_to(np.arange(len(self.centroides)), proximidade.shape)
+
+        linhas = np.zeros(len(consultas), dtype=np.int64)
+        similaridades = np.full(len(consultas), -np.inf, dtype=np.float32)
+        for i, consulta in enumerate(consultas):
+            candidatos = np.concatenate([
+                self.ordem[self.inicios[lista]:self.inicios[lista + 1]] for lista in sondas[i]
+            ])
+            if len(candidatos) == 0:
+                continue
+            pontuacoes = self.matriz[candidatos] @ consulta
+            melhor = int(np.argmax(pontuacoes))
+            linhas[i] = candidatos[melhor]
+            similaridades[i] = pontuacoes[melhor]
+        return linhas, similaridades
+
+    def atualizar(self, matriz):
+        """Reatribui as linhas aos centróides atuais, sem treinar o k-means de novo"""
+        self.construir(matriz, centroides=self.centroides if len(self.centroides) else None)
+
+    def estado(self):
+        return {'centroides': self.centroides, 'ordem': self.ordem, 'inicios': self.inicios}
+
+    def restaurar(self, matriz, estado):
+        self.matriz = matriz
+        self.centroides = estado['centroides']
+        self.ordem = estado['ordem']
+        self.inicios = estado['inicios']
+
+
+TIPOS_INDICE = {
+    IndiceExato.tipo: IndiceExato,
+    IndiceIVF.tipo: IndiceIVF,
+}
+
+
+def criar_indice(tipo='exato', **parametros):
+    """Cria um índice vazio do tipo informado ('exato' ou 'ivf')"""
+    if tipo not in TIPOS_INDICE:
+        raise ValueError(f"Tipo de índice desconhecido: {tipo}")
+    return TIPOS_INDICE[tipo](**parametros)
+
+
+def caminho_indice(db_path):
+    """Arquivo do índice, salvo ao lado do banco de dados"""
+    return os.path.splitext(db_path)[0] + '.indice.npz'
+
+
+def impressao_digital(ids, versao):
+    """Identifica a galeria para detectar índices salvos desatualizados
+
+    A versão da galeria no banco determina os encodings de cada pessoa; o
+    hash dos ids (8 bytes por linha, sem ler a matriz) garante que as linhas
+    estão na mesma ordem, já que o estado do índice guarda posições.
+    """
+    hash_ids = hashlib.sha1(np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+    return f"{versao}:{len(ids)}:{hash_ids.hexdigest()}"
+
+
+def salvar_indice(caminho, indice, ids, versao):
+    """Persiste o índice em disco junto com a impressão digital da galeria"""
+    arrays = {'estado_' + nome: valor for nome, valor in indice.estado().items()}
+    # Arquivo temporário por processo: vários processos podem salvar ao mesmo tempo
+    temporario = f"{caminho}.{os.getpid()}.tmp.npz"
+    np.savez(
+        temporario,
+        tipo=np.array(indice.tipo),
+        impressao=np.array(impressao_digital(ids, versao)),
+        **arrays
+    )
+    os.replace(temporario, caminho)
+
+
+def carregar_indice(caminho, indice, matriz, ids, versao):
+    """Restaura o índice salvo se ele corresponder à galeria atual; retorna True se restaurou"""
+    if not os.path.exists(caminho):
+        return False
+
+    with np.load(caminho, allow_pickle=False) as dados:
+        if str(dados['tipo']) != indice.tipo:
+            return False
+        if str(dados['impressao']) != impressao_digital(ids, versao):
+            return False
+        estado = {nome[len('estado_'):]: dados[nome] for nome in dados.files if nome.startswith('estado_')}
+
+    indice.restaurar(matriz, estado)
+    return True
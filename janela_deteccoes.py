@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class JanelaDeteccoes:
+    """Controle de detecções recentes com expiração e limite de memória
+
+    Guarda o instante da última presença registrada de cada identidade
+    (conhecida ou desconhecida) e só permite um novo registro depois de
+    `intervalo` segundos. As entradas ficam em ordem de registro, então as
+    vencidas saem pelo início em O(1) amortizado a cada chamada; acima de
+    `capacidade`, a mais antiga é descartada mesmo sem ter vencido.
+
+    Os instantes são segundos de um relógio monotônico (perf_counter, o
+    mesmo da captura). No processamento de gravações, quem chama passa o
+    horário do quadro, e a janela segue o tempo do vídeo.
+    """
+
+    def __init__(self, intervalo, capacidade=10000, relogio=time.perf_counter):
+        self.intervalo = float(intervalo)
+        self.capacidade = max(1, int(capacidade))
+        self.relogio = relogio
+        self.expiradas = 0
+        self.descartadas = 0
+
+        self._ultimos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def registrar(self, chave, agora=None):
+        """Marca a identidade e retorna True se ela não foi vista dentro do intervalo"""
+        agora = self.relogio() if agora is None else agora
+        with self._lock:
+            self._expirar(agora)
+            ultimo = self._ultimos.get(chave)
+            # Com várias câmeras os quadros chegam fora de ordem: a diferença pode ser negativa
+            if ultimo is not None and abs(agora - ultimo) < self.intervalo:
+                return False
+            self._marcar(chave, agora)
+            return True
+
+    def marcar(self, chave, agora=None):
+        """Marca a identidade como registrada agora, sem verificar o intervalo"""
+        agora = self.relogio() if agora is None else agora
+        with self._lock:
+            self._expirar(agora)
+            self._marcar(chave, agora)
+
+    def contem(self, chave, agora=None):
+        """True se a identidade teve presença registrada dentro do intervalo"""
+        agora = self.relogio() if agora is None else agora
+        with self._lock:
+            ultimo = self._ultimos.get(chave)
+            return ultimo is not None and abs(agora - ultimo) < self.intervalo
+
+    def _marcar(self, chave, agora):
+        self._ultimos[chave] = agora
+        self._ultimos.move_to_end(chave)
+        while len(self._ultimos) > self.capacidade:
+            self._ultimos.popitem(last=False)
+            self.descartadas += 1
+
+    def _expirar(self, agora):
+        limite = agora - self.intervalo
+        while self._ultimos:
+            chave, ultimo = next(iter(self._ultimos.items()))
+            if ultimo > limite:
+                break
+            del self._ultimos[chave]
+            self.expiradas += 1
+
+    def __len__(self):
+        return len(self._ultimos)
+
+    def resumo(self):
+        return (f"Detecções recentes: {len(self)} identidades (limite {self.capacidade}), "
+                f"expiradas {self.expiradas}, descartadas {self.descartadas}")
@@ -0,0 +1,263 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class EstatisticasEstagio:
+    """Contadores de latência e descarte de um estágio do pipeline"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.processados = 0
+        self.descartados = 0
+        self.latencia_media = 0.0
+        self.latencia_maxima = 0.0
+        self._inicio = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def registrar(self, latencia):
+        """Registra um item processado com a latência informada (segundos)"""
+        with self._lock:
+            self.processados += 1
+            # Média móvel exponencial para refletir o comportamento recente
+            if self.processados == 1:
+                self.latencia_media = latencia
+            else:
+                self.latencia_media += 0.05 * (latencia - self.latencia_media)
+            self.latencia_maxima = max(self.latencia_maxima, latencia)
+
+    def descartar(self, quantidade=1):
+        with self._lock:
+            self.descartados += quantidade
+
+    @property
+    def fps(self):
+        decorrido = time.perf_counter() - self._inicio
+        return self.processados / decorrido if decorrido > 0 else 0.0
+
+    def resumo(self):
+        with self._lock:
+            return (f"{self.nome}: {self.fps:.1f} FPS, latência média {self.latencia_media * 1000:.1f} ms "
+                    f"(máx {self.latencia_maxima * 1000:.1f} ms), descartados {self.descartados}")
+
+
+class BufferLimitado:
+    """Buffer de passagem entre estágios que mantém só os itens mais novos
+
+    Quando cheio, o item mais antigo é descartado (e contado) para que o
+    estágio seguinte sempre receba o quadro mais recente.
+    """
+
+    def __init__(self, capacidade=1, estatisticas=None):
+        self._itens = deque(maxlen=capacidade)
+        self._condicao = threading.Condition()
+        self.estatisticas = estatisticas
+
+    def colocar(self, item):
+        with self._condicao:
+            if len(self._itens) == self._itens.maxlen and self.estatisticas:
+                self.estatisticas.descartar()
+            self._itens.append(item)
+            self._condicao.notify()
+
+    def obter(self, timeout=None):
+        """Retorna o item mais antigo disponível, ou None após o timeout"""
+        with self._condicao:
+            if not self._itens:
+                self._condicao.wait(timeout)
+            if not self._itens:
+                return None
+            return self._itens.popleft()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class FilaProcessamento:
+    """Fila limitada de faces entre a inferência e o reconhecimento
+
+    Cada item é (encoding, momento, rastro_id, instante_captura). Quando a
+    fila está cheia, a política decide o que acontece:
+
+    - 'descartar_antigos': a face mais antiga é descartada (o atraso não cresce)
+    - 'agrupar_rastro': cada rastro tem no máximo uma face pendente; a nova
+      substitui a anterior no mesmo lugar da fila e, se ainda faltar espaço,
+      a mais antiga é descartada
+    - 'bloquear': quem coloca espera por espaço; a inferência desacelera e a
+      captura passa a descartar quadros no lugar da fila
+    """
+
+    POLITICAS = ('descartar_antigos', 'agrupar_rastro', 'bloquear')
+
+    def __init__(self, capacidade=256, politica='descartar_antigos', estatisticas=None):
+        if politica not in self.POLITICAS:
+            raise ValueError(f"Política de fila inválida: {politica}")
+        self.capacidade = max(1, int(capacidade))
+        self.politica = politica
+        # Latência registrada por quem consome: da captura até o reconhecimento
+        self.estatisticas = estatisticas or EstatisticasEstagio("Fila de reconhecimento")
+        self.agrupados = 0
+        self.profundidade_maxima = 0
+
+        self._itens = OrderedDict()
+        self._sequencia = 0
+        self._fechada = False
+        self._condicao = threading.Condition()
+
+    def colocar(self, item):
+        """Enfileira uma face; retorna False se a fila já foi fechada"""
+        with self._condicao:
+            if self._fechada:
+                return False
+
+            if self.politica == 'agrupar_rastro':
+                chave = ('rastro', item[2])
+                if chave in self._itens:
+                    self._itens[chave] = item
+                    self.agrupados += 1
+                    return True
+            else:
+                chave = self._sequencia
+                self._sequencia += 1
+
+            if self.politica == 'bloquear':
+                while len(self._itens) >= self.capacidade and not self._fechada:
+                    self._condicao.wait()
+                if self._fechada:
+                    return False
+            elif len(self._itens) >= self.capacidade:
+                self._itens.popitem(last=False)
+                self.estatisticas.descartar()
+
+            self._itens[chave] = item
+            self.profundidade_maxima = max(self.profundidade_maxima, len(self._itens))
+            self._condicao.notify_all()
+            return True
+
+    def obter_lote(self, maximo, timeout=None):
+        """Retira até `maximo` faces, as mais antigas primeiro
+
+        Retorna uma lista vazia após o timeout e None quando a fila foi
+        fechada e não há mais nada pendente.
+        """
+        with self._condicao:
+            if not self._itens and not self._fechada:
+                self._condicao.wait(timeout)
+            if not self._itens:
+                return None if self._fechada else []
+
+            lote = [self._itens.popitem(last=False)[1] for _ in range(min(maximo, len(self._itens)))]
+            self._condicao.notify_all()
+            return lote
+
+    def fechar(self):
+        """Não aceita mais faces; o consumidor esvazia o que restou e recebe None"""
+        with self._condicao:
+            self._fechada = True
+            self._condicao.notify_all()
+
+    def reabrir(self):
+        """Volta a aceitar faces depois de `fechar` (nova sessão de reconhecimento)"""
+        with self._condicao:
+            self._fechada = False
+
+    def __len__(self):
+        return len(self._itens)
+
+    def resumo(self):
+        return (f"{self.estatisticas.resumo()}, profundidade {len(self)}/{self.capacidade} "
+                f"(máx {self.profundidade_maxima}), agrupados {self.agrupados}")
+
+
+class PipelineVideo:
+    """Pipeline em três estágios: captura, inferência e renderização
+
+    A captura e a inferência rodam em threads próprias; a renderização fica
+    com quem chama `obter_quadro` (o cv2.imshow precisa rodar na thread
+    principal). Os estágios se comunicam por buffers de capacidade 1.
+    `processar` recebe o quadro e o instante (perf_counter) da captura.
+    """
+
+    def __init__(self, cap, processar, capacidade=1):
+        self.cap = cap
+        self.processar = processar
+
+        self.estatisticas_captura = EstatisticasEstagio("Captura")
+        self.estatisticas_inferencia = EstatisticasEstagio("Inferência")
+        self.estatisticas_renderizacao = EstatisticasEstagio("Renderização")
+        self.estatisticas_total = EstatisticasEstagio("Ponta a ponta")
+
+        # Quadros capturados que a inferência não consumiu a tempo contam como
+        # descarte da captura; quadros anotados não exibidos, da inferência
+        self.buffer_captura = BufferLimitado(capacidade, self.estatisticas_captura)
+        self.buffer_renderizacao = BufferLimitado(capacidade, self.estatisticas_inferencia)
+
+        self.ativo = threading.Event()
+        self._threads = []
+
+    def iniciar(self):
+        self.ativo.set()
+        self._threads = [
+            threading.Thread(target=self._capturar, daemon=True),
+            threading.Thread(target=self._inferir, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def parar(self):
+        self.ativo.clear()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+    def _capturar(self):
+        """Lê quadros continuamente; só o mais novo fica no buffer"""
+        while self.ativo.is_set():
+            inicio = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                print("Erro ao capturar frame")
+                self.ativo.clear()
+                break
+
+            instante_captura = time.perf_counter()
+            self.estatisticas_captura.registrar(instante_captura - inicio)
+            self.buffer_captura.colocar((frame, instante_captura))
+
+    def _inferir(self):
+        """Processa o quadro mais recente e entrega o resultado anotado"""
+        while self.ativo.is_set():
+            item = self.buffer_captura.obter(timeout=0.1)
+            if item is None:
+                continue
+
+            frame, instante_captura = item
+            inicio = time.perf_counter()
+            try:
+                frame_processado = self.processar(frame, instante_captura)
+            except Exception as e:
+                print(f"Erro na inferência: {e}")
+                continue
+
+            self.estatisticas_inferencia.registrar(time.perf_counter() - inicio)
+            self.buffer_renderizacao.colocar((frame_processado, instante_captura))
+
+    def obter_quadro(self, timeout=0.1):
+        """Último quadro anotado e o instante (perf_counter) em que foi capturado"""
+        item = self.buffer_renderizacao.obter(timeout=timeout)
+        if item is None:
+            return None, None
+        return item
+
+    def registrar_renderizacao(self, inicio_renderizacao, instante_captura):
+        """Registra o tempo de renderização e a latência ponta a ponta (captura até exibição)"""
+        agora = time.perf_counter()
+        self.estatisticas_renderizacao.registrar(agora - inicio_renderizacao)
+        self.estatisticas_total.registrar(agora - instante_captura)
+
+    def resumo(self):
+        return [
+            self.estatisticas_captura.resumo(),
+            self.estatisticas_inferencia.resumo(),
+            self.estatisticas_renderizacao.resumo(),
+            self.estatisticas_total.resumo(),
+        ]
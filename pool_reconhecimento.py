@@ -0,0 +1,134 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from galeria_compartilhada import LeitorGaleria, PublicadorGaleria
+from indice_galeria import criar_indice
+
+TIPOS_TRABALHADORES = ('threads', 'processos')
+
+# Galeria do processo trabalhador, anexada à memória compartilhada do processo principal
+_leitor_galeria = None
+_galeria = None
+_parametros_indice = None
+
+
+class PoolReconhecimento:
+    """Trabalhadores que retiram lotes da fila de faces, comparam e registram
+
+    A comparação com a galeria roda em paralelo nos trabalhadores (o produto
+    de matrizes do NumPy libera o GIL; com ReconhecedorProcessos ela roda em
+    outros processos). O registro roda sob um único lock: o controle de
+    detecções recentes, a galeria de desconhecidos e o escritor continuam
+    vendo uma face por vez, como com um só trabalhador.
+
+    `reconhecer(encodings)` retorna [(pessoa_id, confianca)];
+    `registrar(item, resultado)` é chamado para cada face do lote.
+
+    O pool pode ser parado e iniciado de novo: `parar` fecha a fila e espera
+    os trabalhadores esvaziarem o que restou; `iniciar` reabre a fila e cria
+    trabalhadores novos.
+    """
+
+    def __init__(self, fila, reconhecer, registrar, trabalhadores=1, tamanho_lote=32):
+        self.fila = fila
+        self.reconhecer = reconhecer
+        self.registrar = registrar
+        self.trabalhadores = max(1, int(trabalhadores))
+        self.tamanho_lote = max(1, int(tamanho_lote))
+
+        self._lock_registro = threading.Lock()
+        self._threads = []
+
+    @property
+    def ativo(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def iniciar(self):
+        """Inicia os trabalhadores (não faz nada se já estiverem rodando)"""
+        if self.ativo:
+            return
+        self.fila.reabrir()
+        self._threads = [
+            threading.Thread(target=self._executar, name=f"reconhecimento-{i}", daemon=True)
+            for i in range(self.trabalhadores)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def parar(self, timeout=5):
+        """Fecha a fila; os trabalhadores terminam o que restou nela e saem"""
+        self.fila.fechar()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+
+    def _executar(self):
+        while True:
+            lote = self.fila.obter_lote(self.tamanho_lote, timeout=1)
+            if lote is None:
+                break
+            if not lote:
+                continue
+
+            try:
+                resultados = self.reconhecer([item[0] for item in lote])
+                with self._lock_registro:
+                    for item, resultado in zip(lote, resultados):
+                        self.registrar(item, resultado)
+            except Exception as e:
+                print(f"Erro no processamento: {e}")
+
+
+def _inicializar_processo(nome_galeria, tipo_indice, sondas_indice, caminho_indice):
+    """Anexa o processo trabalhador à galeria compartilhada (uma vez por processo)"""
+    global _leitor_galeria, _parametros_indice
+    _leitor_galeria = LeitorGaleria(nome_galeria)
+    _parametros_indice = (tipo_indice, sondas_indice, caminho_indice)
+    _atualizar_galeria()
+
+
+def _atualizar_galeria():
+    """Troca a galeria do processo se uma geração nova foi publicada"""
+    global _galeria
+    if _leitor_galeria.atualizar() or _galeria is None:
+        tipo_indice, sondas_indice, caminho_indice = _parametros_indice
+        indice = criar_indice('ivf', n_sondas=sondas_indice) if tipo_indice == 'ivf' else criar_indice('exato')
+        _galeria = _leitor_galeria.galeria(indice=indice, caminho_indice=caminho_indice)
+
+
+def _reconhecer_no_processo(encodings, tolerancia):
+    _atualizar_galeria()
+    return _galeria.reconhecer_lote(encodings, tolerancia)
+
+
+class ReconhecedorProcessos:
+    """Compara lotes de faces com a galeria em processos trabalhadores
+
+    A galeria é publicada em memória compartilhada (sem cópia por processo);
+    chame `publicar` sempre que a galeria do processo principal mudar.
+    """
+
+    def __init__(self, processos, galeria, versao_galeria=0, tipo_indice='exato', sondas_indice=8,
+                 caminho_indice=None):
+        self.processos = max(1, int(processos))
+        self.publicador = PublicadorGaleria()
+        self.publicador.publicar(galeria, versao_galeria)
+
+        # spawn: os trabalhadores não herdam as threads nem o MediaPipe do processo principal
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processos,
+            initializer=_inicializar_processo,
+            initargs=(self.publicador.nome, tipo_indice, sondas_indice, caminho_indice),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def publicar(self, galeria, versao_galeria=0):
+        self.publicador.publicar(galeria, versao_galeria)
+
+    def reconhecer_lote(self, encodings, tolerancia):
+        return self.executor.submit(_reconhecer_no_processo, encodings, tolerancia).result()
+
+    def encerrar(self):
+        self.executor.shutdown(wait=True)
+        self.publicador.fechar()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Processamento em Lote de Gravações
+Reprocessa vídeos gravados dos cultos (sem câmera e sem janela) e registra as
+presenças com o horário original da gravação
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+EXTENSOES_VIDEO = ('.mp4', '.avi', '.mkv', '.mov', '.wmv', '.m4v')
+
+# Sistema de reconhecimento do processo trabalhador (um por processo, com o
+# próprio MediaPipe; instâncias do MediaPipe não podem ser compartilhadas).
+# A galeria não é carregada do banco: vem da memória compartilhada do processo principal
+_sistema = None
+_leitor_galeria = None
+
+
+def listar_videos(caminho):
+    """Retorna o arquivo informado ou os vídeos de um diretório, em ordem de nome"""
+    if os.path.isfile(caminho):
+        return [caminho]
+    return sorted(
+        os.path.join(caminho, nome) for nome in os.listdir(caminho)
+        if nome.lower().endswith(EXTENSOES_VIDEO)
+    )
+
+
+def informacoes_video(caminho_video):
+    """Retorna (total de quadros, quadros por segundo) do vídeo"""
+    cap = cv2.VideoCapture(caminho_video)
+    try:
+        if not cap.isOpened():
+            return 0, 0.0
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        cap.release()
+
+
+def inicio_gravacao(caminho_video, total_quadros, fps, inicio=None):
+    """Data/hora local do primeiro quadro
+
+    Sem `inicio` informado, usa a data de modificação do arquivo (o fim da
+    gravação, na maioria das câmeras) menos a duração do vídeo.
+    """
+    if inicio is not None:
+        return inicio
+    fim = datetime.fromtimestamp(os.path.getmtime(caminho_video))
+    return fim - timedelta(seconds=total_quadros / fps)
+
+
+def dividir_em_segmentos(caminho_video, total_quadros, fps, duracao_segmento):
+    """Divide o vídeo em trechos de `duracao_segmento` segundos: [(video, inicio, fim, fps)]"""
+    quadros_segmento = max(1, int(duracao_segmento * fps))
+    return [
+        (caminho_video, inicio, min(inicio + quadros_segmento, total_quadros), fps)
+        for inicio in range(0, total_quadros, quadros_segmento)
+    ]
+
+
+def _inicializar_trabalhador(db_path, nome_galeria):
+    """Cria o sistema de reconhecimento do processo (chamado uma vez por processo)"""
+    global _sistema, _leitor_galeria
+    from galeria_compartilhada import LeitorGaleria
+    from reconhecimento_facial import FaceRecognitionSystem
+
+    _sistema = FaceRecognitionSystem(db_path=db_path, somente_deteccao=True)
+    _leitor_galeria = LeitorGaleria(nome_galeria)
+    _atualizar_galeria()
+
+
+def _atualizar_galeria():
+    """Anexa à geração mais recente da galeria compartilhada, se ela mudou"""
+    from indice_galeria import caminho_indice
+
+    if _leitor_galeria.atualizar():
+        _sistema.galeria = _leitor_galeria.galeria(
+            indice=_sistema._criar_indice(), caminho_indice=caminho_indice(_sistema.db.db_path)
+        )
+
+
+def processar_segmento(segmento):
+    """Detecta e reconhece as faces de um trecho do vídeo
+
+    Não grava nada no banco: retorna as detecções com o tempo (segundos desde
+    o início do vídeo) para o processo principal registrar em ordem.
+    """
+    from rastreador import RastreadorFaces
+
+    caminho_video, quadro_inicial, quadro_final, fps = segmento
+    _atualizar_galeria()
+    sistema = _sistema
+
+    # Rastros não atravessam segmentos; o relógio do rastreador é o tempo do vídeo
+    sistema.rastreador = RastreadorFaces(
+        intervalo_atualizacao=sistema.rastreador.intervalo_atualizacao,
+        confianca_minima=sistema.rastreador.confianca_minima
+    )
+
+    cap = cv2.VideoCapture(caminho_video)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, quadro_inicial)
+
+    deteccoes = []
+    quadros = 0
+    inicio = time.perf_counter()
+    try:
+        for numero_quadro in range(quadro_inicial, quadro_final):
+            tempo_video = numero_quadro / fps
+
+            # Rostos parados e já identificados: avançar sem decodificar o quadro
+            if sistema.quadros_estavel > 1 and numero_quadro % sistema.quadros_estavel != 0 \
+                    and sistema.rastreador.estavel(tempo_video):
+                if not cap.grab():
+                    break
+                quadros += 1
+                continue
+
+            ret, frame = cap.read()
+            if not ret:
+                break
+            quadros += 1
+
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            results_mesh = sistema.face_mesh.process(rgb_frame)
+            _, rastros, selecionados, encodings = sistema.analisar_quadro(rgb_frame, results_mesh, tempo_video)
+            if not selecionados:
+                continue
+
+            resultados = sistema.reconhecer_pessoas(encodings)
+            for i, encoding, (pessoa_id, confianca) in zip(selecionados, encodings, resultados):
+                sistema.rastreador.definir_identidade(rastros[i].id, pessoa_id, confianca, tempo_video)
+                deteccoes.append((tempo_video, np.asarray(encoding, dtype=np.float32), pessoa_id, confianca))
+    finally:
+        cap.release()
+
+    return {
+        'video': caminho_video,
+        'quadro_inicial': quadro_inicial,
+        'quadros': quadros,
+        'segundos': time.perf_counter() - inicio,
+        'deteccoes': deteccoes,
+    }
+
+
+def processar_gravacoes(caminho, db_path="igreja_reconhecimento.db", processos=None,
+                        duracao_segmento=60, inicio=None):
+    """Processa um vídeo ou diretório de vídeos e registra as presenças encontradas
+
+    `inicio` só vale para um único arquivo: em um diretório, todos os vídeos
+    receberiam os mesmos horários e o intervalo entre detecções juntaria as
+    presenças de gravações diferentes.
+    """
+    from galeria_compartilhada import PublicadorGaleria
+    from reconhecimento_facial import FaceRecognitionSystem
+
+    if inicio is not None and os.path.isdir(caminho):
+        raise ValueError("O início da gravação só pode ser informado para um único vídeo")
+
+    videos = listar_videos(caminho)
+    if not videos:
+        print(f"Nenhum vídeo encontrado em {caminho}")
+        return None
+
+    processos = processos or os.cpu_count() or 1
+
+    segmentos = []
+    inicios = {}
+    for caminho_video in videos:
+        total_quadros, fps = informacoes_video(caminho_video)
+        if total_quadros <= 0:
+            print(f"Não foi possível ler {caminho_video}")
+            continue
+        inicios[caminho_video] = inicio_gravacao(caminho_video, total_quadros, fps, inicio)
+        segmentos.extend(dividir_em_segmentos(caminho_video, total_quadros, fps, duracao_segmento))
+        print(f"{os.path.basename(caminho_video)}: {total_quadros} quadros a {fps:.1f} FPS, "
+              f"início {inicios[caminho_video]:%d/%m/%Y %H:%M:%S}")
+
+    if not segmentos:
+        return None
+
+    # A galeria é carregada uma única vez e publicada em memória compartilhada;
+    # os trabalhadores anexam a ela sem copiar. O registro também fica neste
+    # processo: uma galeria de desconhecidos, um escritor e o intervalo entre
+    # detecções aplicados na ordem da gravação. Quem reconhece são os
+    # trabalhadores dos segmentos: aqui não há pool de reconhecimento
+    sistema = FaceRecognitionSystem(db_path=db_path, sem_trabalhadores=True)
+    publicador = PublicadorGaleria()
+    publicador.publicar(sistema.galeria, sistema.versao_galeria)
+
+    print(f"\nProcessando {len(segmentos)} segmentos em {processos} processos...")
+    resultados = {caminho_video: [] for caminho_video in inicios}
+    total_quadros = 0
+    total_deteccoes = 0
+    try:
+        inicio_processamento = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_trabalhador,
+                                 initargs=(db_path, publicador.nome),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            futuros = [executor.submit(processar_segmento, segmento) for segmento in segmentos]
+            for concluidos, futuro in enumerate(as_completed(futuros), 1):
+                try:
+                    resultado = futuro.result()
+                except Exception as e:
+                    print(f"Erro ao processar segmento: {e}")
+                    continue
+                resultados[resultado['video']].append(resultado)
+                print(f"  {concluidos}/{len(segmentos)} segmentos "
+                      f"({resultado['quadros'] / max(resultado['segundos'], 1e-9):.1f} FPS no segmento)")
+
+                # Cadastros feitos durante o processamento chegam aos próximos segmentos
+                if sistema.atualizar_pessoas_conhecidas():
+                    # Os processos restauram o índice salvo em vez de treiná-lo de novo
+                    sistema.salvar_indice_pendente(forcar=True)
+                    publicador.publicar(sistema.galeria, sistema.versao_galeria)
+
+        decorrido = time.perf_counter() - inicio_processamento
+
+        for caminho_video, partes in resultados.items():
+            deteccoes = sorted(
+                (deteccao for parte in partes for deteccao in parte['deteccoes']),
+                key=lambda deteccao: deteccao[0]
+            )
+            for tempo_video, encoding, pessoa_id, confianca in deteccoes:
+                momento = inicios[caminho_video] + timedelta(seconds=tempo_video)
+                sistema._registrar_deteccao(encoding, pessoa_id, confianca, momento)
+            total_quadros += sum(parte['quadros'] for parte in partes)
+            total_deteccoes += len(deteccoes)
+    finally:
+        sistema.encerrar()
+        publicador.fechar()
+
+    fps_total = total_quadros / decorrido if decorrido > 0 else 0.0
+    print("\n=== PROCESSAMENTO CONCLUÍDO ===")
+    print(f"Vídeos: {len(resultados)}")
+    print(f"Quadros: {total_quadros}")
+    print(f"Detecções: {total_deteccoes}")
+    print(f"Tempo: {decorrido:.1f} s")
+    print(f"Throughput: {fps_total:.1f} FPS ({fps_total / processos:.1f} FPS por núcleo, {processos} processos)")
+
+    return {
+        'quadros': total_quadros,
+        'deteccoes': total_deteccoes,
+        'segundos': decorrido,
+        'fps': fps_total,
+        'fps_por_nucleo': fps_total / processos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocessa gravações dos cultos e registra as presenças")
+    parser.add_argument('caminho', help="Arquivo de vídeo ou diretório com vídeos")
+    parser.add_argument('--banco', default="igreja_reconhecimento.db", help="Arquivo do banco de dados")
+    parser.add_argument('--processos', type=int, default=None, help="Processos trabalhadores (padrão: núcleos da CPU)")
+    parser.add_argument('--segmento', type=float, default=60, help="Duração de cada segmento, em segundos")
+    parser.add_argument('--inicio', default=None,
+                        help="Data/hora local do início da gravação (AAAA-MM-DD HH:MM:SS), só para um "
+                             "único vídeo; padrão: data do arquivo menos a duração")
+    args = parser.parse_args()
+
+    if args.inicio and os.path.isdir(args.caminho):
+        parser.error("--inicio só pode ser usado com um único vídeo, não com um diretório")
+
+    inicio = datetime.strptime(args.inicio, '%Y-%m-%d %H:%M:%S') if args.inicio else None
+    processar_gravacoes(args.caminho, args.banco, args.processos, args.segmento, inicio)
+
+
+if __name__ == "__main__":
+    main()
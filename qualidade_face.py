@@ -0,0 +1,118 @@
+import math
+
+import cv2
+import numpy as np
+
+# Pontos da malha do MediaPipe usados para estimar a pose
+PONTA_NARIZ = 1
+CANTO_OLHO_DIREITO = 33
+CANTO_OLHO_ESQUERDO = 263
+TESTA = 10
+QUEIXO = 152
+
+# Altura relativa da ponta do nariz entre a testa e o queixo em um rosto de frente
+ALTURA_NARIZ_FRONTAL = 0.55
+
+
+def caixa_dos_landmarks(landmarks, indices_contorno, largura, altura):
+    """Caixa (x, y, w, h) em pixels que envolve os pontos do contorno do rosto"""
+    pontos = landmarks.landmark
+    coordenadas = np.array([(pontos[i].x, pontos[i].y) for i in indices_contorno])
+    x_min, y_min = coordenadas.min(axis=0)
+    x_max, y_max = coordenadas.max(axis=0)
+    return (int(x_min * largura), int(y_min * altura),
+            int((x_max - x_min) * largura), int((y_max - y_min) * altura))
+
+
+class AvaliadorQualidade:
+    """Decide se uma face serve como amostra de cadastro
+
+    Uma amostra precisa de um rosto grande o bastante, de frente (guinada,
+    inclinação e rolagem estimadas a partir dos landmarks da malha) e nítido
+    (variância do Laplaciano no recorte do rosto). `avaliar` retorna
+    (aceita, motivo, pontuação); a pontuação, entre 0 e 1, ordena as amostras
+    aceitas para escolher o encoding principal. INSTRUCOES traduz cada motivo
+    de recusa no que a pessoa deve ajustar diante da câmera.
+    """
+
+    INSTRUCOES = {
+        "rosto pequeno": "Aproxime-se da câmera",
+        "rosto de lado": "Olhe para a câmera",
+        "cabeça para cima ou para baixo": "Mantenha a cabeça reta (nem para cima nem para baixo)",
+        "cabeça inclinada": "Não incline a cabeça para o lado",
+        "imagem desfocada": "Imagem tremida ou desfocada, fique parado",
+    }
+
+    def __init__(self, tamanho_minimo=120, nitidez_minima=60.0, guinada_maxima=0.12,
+                 inclinacao_maxima=0.12, rolagem_maxima=12.0):
+        self.tamanho_minimo = tamanho_minimo
+        self.nitidez_minima = nitidez_minima
+        self.guinada_maxima = guinada_maxima
+        self.inclinacao_maxima = inclinacao_maxima
+        self.rolagem_maxima = rolagem_maxima
+
+    @staticmethod
+    def pose(landmarks, largura, altura):
+        """Retorna (guinada, inclinação, rolagem) do rosto; zero é de frente
+
+        Guinada e inclinação são deslocamentos relativos da ponta do nariz
+        (pela distância entre os olhos e pela altura do rosto); rolagem é o
+        ângulo, em graus, da linha dos olhos.
+        """
+        pontos = landmarks.landmark
+
+        def ponto(indice):
+            return np.array([pontos[indice].x * largura, pontos[indice].y * altura])
+
+        nariz = ponto(PONTA_NARIZ)
+        olho_direito, olho_esquerdo = ponto(CANTO_OLHO_DIREITO), ponto(CANTO_OLHO_ESQUERDO)
+        testa, queixo = ponto(TESTA), ponto(QUEIXO)
+
+        linha_olhos = olho_esquerdo - olho_direito
+        distancia_olhos = max(np.linalg.norm(linha_olhos), 1e-6)
+        altura_rosto = max(np.linalg.norm(queixo - testa), 1e-6)
+
+        guinada = (nariz[0] - (olho_direito[0] + olho_esquerdo[0]) / 2) / distancia_olhos
+        inclinacao = np.dot(nariz - testa, queixo - testa) / altura_rosto ** 2 - ALTURA_NARIZ_FRONTAL
+        rolagem = math.degrees(math.atan2(linha_olhos[1], linha_olhos[0]))
+        return float(guinada), float(inclinacao), rolagem
+
+    @staticmethod
+    def nitidez(imagem, caixa):
+        """Variância do Laplaciano no recorte do rosto (imagem RGB ou cinza)"""
+        x, y, w, h = caixa
+        recorte = imagem[max(0, y):max(0, y + h), max(0, x):max(0, x + w)]
+        if recorte.size == 0:
+            return 0.0
+        if recorte.ndim == 3:
+            recorte = cv2.cvtColor(recorte, cv2.COLOR_RGB2GRAY)
+        return float(cv2.Laplacian(recorte, cv2.CV_64F).var())
+
+    def avaliar(self, imagem, landmarks, caixa):
+        """Retorna (aceita, motivo, pontuação) da face na caixa (x, y, w, h) da malha"""
+        altura, largura = imagem.shape[:2]
+        tamanho = min(caixa[2], caixa[3])
+        if tamanho < self.tamanho_minimo:
+            return False, "rosto pequeno", 0.0
+
+        guinada, inclinacao, rolagem = self.pose(landmarks, largura, altura)
+        desvios = (
+            abs(guinada) / self.guinada_maxima,
+            abs(inclinacao) / self.inclinacao_maxima,
+            abs(rolagem) / self.rolagem_maxima,
+        )
+        if desvios[0] > 1:
+            return False, "rosto de lado", 0.0
+        if desvios[1] > 1:
+            return False, "cabeça para cima ou para baixo", 0.0
+        if desvios[2] > 1:
+            return False, "cabeça inclinada", 0.0
+
+        nitidez = self.nitidez(imagem, caixa)
+        if nitidez < self.nitidez_minima:
+            return False, "imagem desfocada", 0.0
+
+        pontuacao = (1 - max(desvios) / 2) \
+            * min(1.0, nitidez / (3 * self.nitidez_minima)) \
+            * min(1.0, tamanho / (2 * self.tamanho_minimo))
+        return True, "ok", pontuacao
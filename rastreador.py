@@ -0,0 +1,133 @@
+import threading
+import time
+
+import numpy as np
+
+
+class Rastro:
+    """Uma face acompanhada entre quadros"""
+
+    def __init__(self, rastro_id, caixa):
+        self.id = rastro_id
+        self.caixa = caixa
+        self.pessoa_id = None
+        self.confianca = 0.0
+        self.reconhecido = False
+        self.ultimo_envio = None
+        self.ultimo_reconhecimento = None
+        self.quadros_ausente = 0
+
+
+class RastreadorFaces:
+    """Associa caixas de faces entre quadros por IoU e decide quando reconhecer
+
+    O reconhecimento de um rastro só é pedido quando ele é novo, quando a
+    identidade tem mais de `intervalo_atualizacao` segundos ou quando a
+    confiança do último match ficou abaixo de `confianca_minima`. Entre uma
+    passagem e outra, a identidade é mantida pelo rastro.
+    """
+
+    def __init__(self, limiar_iou=0.3, max_ausencia=10, intervalo_atualizacao=3.0, confianca_minima=0.75):
+        self.limiar_iou = limiar_iou
+        self.max_ausencia = max_ausencia
+        self.intervalo_atualizacao = intervalo_atualizacao
+        self.confianca_minima = confianca_minima
+
+        self.rastros = {}
+        self._proximo_id = 1
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def calcular_iou(caixas_a, caixas_b):
+        """Matriz de IoU entre caixas (x, y, w, h): (len(a), len(b))"""
+        a = np.asarray(caixas_a, dtype=np.float64).reshape(-1, 4)
+        b = np.asarray(caixas_b, dtype=np.float64).reshape(-1, 4)
+
+        x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+        y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+        x2 = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2])
+        y2 = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3])
+
+        intersecao = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        uniao = (a[:, None, 2] * a[:, None, 3]) + (b[None, :, 2] * b[None, :, 3]) - intersecao
+        return np.where(uniao > 0, intersecao / np.maximum(uniao, 1e-9), 0.0)
+
+    def atualizar(self, caixas):
+        """Associa as caixas do quadro aos rastros existentes; retorna um rastro por caixa"""
+        with self._lock:
+            ids = list(self.rastros.keys())
+            resultado = [None] * len(caixas)
+
+            if ids and len(caixas):
+                iou = self.calcular_iou(caixas, [self.rastros[rastro_id].caixa for rastro_id in ids])
+
+                # Associação gulosa pelos maiores IoU
+                while True:
+                    i, j = np.unravel_index(np.argmax(iou), iou.shape)
+                    if iou[i, j] < self.limiar_iou:
+                        break
+                    rastro = self.rastros[ids[j]]
+                    rastro.caixa = caixas[i]
+                    rastro.quadros_ausente = 0
+                    resultado[i] = rastro
+                    iou[i, :] = -1.0
+                    iou[:, j] = -1.0
+
+            associados = {rastro.id for rastro in resultado if rastro is not None}
+            for rastro_id in ids:
+                if rastro_id not in associados:
+                    rastro = self.rastros[rastro_id]
+                    rastro.quadros_ausente += 1
+                    if rastro.quadros_ausente > self.max_ausencia:
+                        del self.rastros[rastro_id]
+
+            for i, caixa in enumerate(caixas):
+                if resultado[i] is None:
+                    rastro = Rastro(self._proximo_id, caixa)
+                    self._proximo_id += 1
+                    self.rastros[rastro.id] = rastro
+                    resultado[i] = rastro
+
+            return resultado
+
+    def precisa_reconhecer(self, rastro, agora=None):
+        """Indica se o rastro deve passar por uma nova extração e comparação"""
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            if rastro.ultimo_envio is not None and (
+                rastro.ultimo_reconhecimento is None or rastro.ultimo_reconhecimento < rastro.ultimo_envio
+            ):
+                # Aguardando resultado; reenviar apenas se ele se perdeu
+                return agora - rastro.ultimo_envio >= self.intervalo_atualizacao
+
+            if not rastro.reconhecido:
+                return True
+            if agora - rastro.ultimo_reconhecimento >= self.intervalo_atualizacao:
+                return True
+            return rastro.pessoa_id is not None and rastro.confianca < self.confianca_minima
+
+    def marcar_envio(self, rastro, agora=None):
+        """Registra que o rastro foi enviado para reconhecimento"""
+        with self._lock:
+            rastro.ultimo_envio = time.monotonic() if agora is None else agora
+
+    def definir_identidade(self, rastro_id, pessoa_id, confianca, agora=None):
+        """Guarda o resultado do reconhecimento no rastro (chamado pela thread de processamento)"""
+        with self._lock:
+            rastro = self.rastros.get(rastro_id)
+            if rastro is None:
+                return
+            rastro.pessoa_id = pessoa_id
+            rastro.confianca = confianca
+            rastro.reconhecido = True
+            rastro.ultimo_reconhecimento = time.monotonic() if agora is None else agora
+
+    def estavel(self, agora=None):
+        """Verdadeiro quando nenhum rastro visível precisa de reconhecimento"""
+        agora = time.monotonic() if agora is None else agora
+        visiveis = [rastro for rastro in list(self.rastros.values()) if rastro.quadros_ausente == 0]
+        return not any(self.precisa_reconhecer(rastro, agora) for rastro in visiveis)
+
+    def rastros_visiveis(self):
+        with self._lock:
+            return [rastro for rastro in self.rastros.values() if rastro.quadros_ausente == 0]
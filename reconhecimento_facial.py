@@ -1,25 +1,57 @@
 import cv2
 import mediapipe as mp
 import numpy as np
-import pickle
 import time
+import unicodedata
 from datetime import datetime, timedelta
-from sklearn.metrics.pairwise import cosine_similarity
-from database import DatabaseManager
+from database import DatabaseManager, timestamp_utc
+from embedding import ExtratorEmbedding
+from galeria import GaleriaFacial, linhas_galeria
+from armazem_encodings import ArmazemEncodings, caminho_armazem
+from indice_galeria import criar_indice, caminho_indice
+from pipeline_video import FilaProcessamento, PipelineVideo
+from pool_reconhecimento import TIPOS_TRABALHADORES, PoolReconhecimento, ReconhecedorProcessos
+from rastreador import RastreadorFaces
+from escritor_presencas import EscritorPresencas
+from janela_deteccoes import JanelaDeteccoes
+from qualidade_face import AvaliadorQualidade, caixa_dos_landmarks
+from formato_encoding import serializar_encoding, desserializar_matriz
 import threading
-import queue
+from collections import OrderedDict
 
 class FaceRecognitionSystem:
-    def __init__(self):
+    # Modos de pipeline: 'malha' roda só o FaceMesh e deriva as caixas dos landmarks;
+    # 'completo' roda FaceDetection (apenas para as caixas) e FaceMesh em todo frame
+    MODOS_DETECCAO = ('malha', 'completo')
+    # Alterações na galeria salvam o índice em disco no máximo uma vez neste intervalo (segundos)
+    INTERVALO_SALVAR_INDICE = 30
+    
+    def __init__(self, db_path="igreja_reconhecimento.db", modo_deteccao=None, somente_deteccao=False,
+                 sem_trabalhadores=False):
+        # Com somente_deteccao, o sistema só detecta, rastreia e extrai embeddings:
+        # não carrega galerias nem grava presenças (câmeras do modo multicâmera).
+        # Com sem_trabalhadores, carrega as galerias e registra presenças, mas não
+        # inicia o pool de reconhecimento (coordenador do processamento em lote)
+        self.somente_deteccao = somente_deteccao
+        
         # Inicializar MediaPipe
         self.mp_face_detection = mp.solutions.face_detection
         self.mp_face_mesh = mp.solutions.face_mesh
         self.mp_drawing = mp.solutions.drawing_utils
         
-        # Configurar detectores
-        self.face_detection = self.mp_face_detection.FaceDetection(
-            model_selection=0, min_detection_confidence=0.7
-        )
+        # Banco de dados
+        self.db = DatabaseManager(db_path)
+        
+        # Modo do pipeline de detecção
+        self.modo_deteccao = modo_deteccao or self.db.obter_configuracao('modo_deteccao') or 'malha'
+        if self.modo_deteccao not in self.MODOS_DETECCAO:
+            print(f"Modo de detecção inválido '{self.modo_deteccao}', usando 'malha'")
+            self.modo_deteccao = 'malha'
+        
+        # Configurar detectores (FaceDetection só é criado se for usado)
+        self.face_detection = None
+        if self.modo_deteccao == 'completo':
+            self.face_detection = self._criar_face_detection()
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
             max_num_faces=10,
@@ -28,305 +60,781 @@ class FaceRecognitionSystem:
             min_tracking_confidence=0.5
         )
         
-        # Banco de dados
-        self.db = DatabaseManager()
+        # Pontos do contorno do rosto, usados para derivar a caixa da malha
+        self.indices_contorno = np.array(
+            sorted({indice for par in self.mp_face_mesh.FACEMESH_FACE_OVAL for indice in par})
+        )
+        
+        # Extrator de características (pares de pontos pré-calculados)
+        self.extrator = ExtratorEmbedding()
+        
+        # Índice da galeria (exato ou aproximado)
+        self.tipo_indice = self.db.obter_configuracao('tipo_indice') or 'exato'
+        self.sondas_indice = int(self.db.obter_configuracao('sondas_indice') or 8)
+        
+        # Galeria em memória ou, para galerias muito grandes, mapeada de um arquivo em disco
+        self.armazenamento_galeria = self.db.obter_configuracao('armazenamento_galeria') or 'memoria'
         
-        # Cache de pessoas conhecidas
+        # Cache de pessoas conhecidas (no modo arquivo, preenchido sob demanda)
         self.pessoas_conhecidas = {}
-        self.carregar_pessoas_conhecidas()
+        self.galeria = GaleriaFacial()
+        self.versao_galeria = 0
+        self._lock_galeria = threading.Lock()
+        self._indice_pendente_desde = None
+        self.reconhecedor_processos = None
+        if not somente_deteccao:
+            self.carregar_pessoas_conhecidas()
         
-        # Controle de detecções recentes
-        self.deteccoes_recentes = {}
+        # Sincronização com alterações feitas por outros processos (ex.: gerenciador.py)
+        self.intervalo_sincronizacao = float(self.db.obter_configuracao('intervalo_sincronizacao') or 0.5)
+        self._parar_sincronizacao = threading.Event()
+        self.thread_sincronizacao = None
+        
+        # Escrita assíncrona e em lote de presenças e desconhecidos
+        self.escritor = None if somente_deteccao else EscritorPresencas(self.db)
+        
+        # Cache de pessoas desconhecidas recentes, para não inserir o mesmo
+        # visitante a cada quadro em que ele aparece. As chaves da galeria são
+        # locais (o id no banco só existe depois que o escritor grava a linha)
+        # e apontam para o codigo_temp. Em ordem da última detecção: acima de
+        # limite_desconhecidas, os vistos há mais tempo saem do cache
+        self.limite_desconhecidas = max(1, int(self.db.obter_configuracao('limite_desconhecidas') or 5000))
+        self.pessoas_desconhecidas = OrderedDict()
+        self.galeria_desconhecidas = GaleriaFacial()
+        self._proxima_chave_desconhecida = 0
+        if not somente_deteccao:
+            self.carregar_pessoas_desconhecidas()
+        
+        # Controle de detecções recentes (conhecidas e desconhecidas), com expiração
         self.intervalo_deteccao = float(self.db.obter_configuracao('intervalo_deteccao') or 5)
+        self.deteccoes_recentes = JanelaDeteccoes(self.intervalo_deteccao)
         self.tolerancia = float(self.db.obter_configuracao('tolerancia_reconhecimento') or 0.6)
+        # Juntar dois desconhecidos num só visitante pede bem mais semelhança
+        # que reconhecer um membro cadastrado: um engano aqui não tem volta
+        self.tolerancia_desconhecidas = max(
+            self.tolerancia, float(self.db.obter_configuracao('tolerancia_desconhecidas') or 0.998)
+        )
+        
+        # Rastreamento de faces entre quadros: o reconhecimento só roda para
+        # rastros novos, com identidade vencida ou de baixa confiança
+        self.rastreador = RastreadorFaces(
+            intervalo_atualizacao=float(self.db.obter_configuracao('intervalo_reconhecimento') or 3),
+            confianca_minima=self.tolerancia + 0.1
+        )
+        # Com todos os rastros estáveis, a malha roda só em 1 de cada N quadros
+        self.quadros_estavel = max(1, int(self.db.obter_configuracao('quadros_estavel') or 3))
+        self.contador_quadros = 0
         
-        # Fila para processamento assíncrono
-        self.fila_processamento = queue.Queue()
-        self.thread_processamento = threading.Thread(target=self._processar_deteccoes, daemon=True)
-        self.thread_processamento.start()
+        # Desenho de caixas, textos e malha nos quadros (desligado no modo sem interface)
+        self.desenhar = True
+        
+        # Fila limitada de faces para o reconhecimento assíncrono; cada trabalhador
+        # retira até lote_reconhecimento faces e as compara com a galeria de uma vez
+        politica_fila = self.db.obter_configuracao('politica_fila') or 'descartar_antigos'
+        if politica_fila not in FilaProcessamento.POLITICAS:
+            print(f"Política de fila inválida '{politica_fila}', usando 'descartar_antigos'")
+            politica_fila = 'descartar_antigos'
+        self.fila_processamento = FilaProcessamento(
+            capacidade=int(self.db.obter_configuracao('capacidade_fila') or 256),
+            politica=politica_fila
+        )
+        self.lote_reconhecimento = max(1, int(self.db.obter_configuracao('lote_reconhecimento') or 32))
+        
+        # Trabalhadores de reconhecimento: threads (o NumPy libera o GIL no produto
+        # de matrizes) ou processos com a galeria em memória compartilhada.
+        # O registro das presenças continua serializado no pool
+        self.trabalhadores_reconhecimento = max(1, int(self.db.obter_configuracao('trabalhadores_reconhecimento') or 1))
+        self.tipo_trabalhadores = self.db.obter_configuracao('tipo_trabalhadores') or 'threads'
+        if self.tipo_trabalhadores not in TIPOS_TRABALHADORES:
+            print(f"Tipo de trabalhadores inválido '{self.tipo_trabalhadores}', usando 'threads'")
+            self.tipo_trabalhadores = 'threads'
+        if self.tipo_trabalhadores == 'processos' and self.armazenamento_galeria == 'arquivo':
+            print("Trabalhadores em processos não suportam a galeria em arquivo, usando threads")
+            self.tipo_trabalhadores = 'threads'
+        
+        self.pool_reconhecimento = None
+        if not somente_deteccao and not sem_trabalhadores:
+            if self.tipo_trabalhadores == 'processos':
+                self.reconhecedor_processos = ReconhecedorProcessos(
+                    self.trabalhadores_reconhecimento, self.galeria, self.versao_galeria,
+                    tipo_indice=self.tipo_indice, sondas_indice=self.sondas_indice,
+                    caminho_indice=caminho_indice(self.db.db_path)
+                )
+            self.pool_reconhecimento = PoolReconhecimento(
+                self.fila_processamento, self.reconhecer_pessoas, self._registrar_item,
+                trabalhadores=self.trabalhadores_reconhecimento, tamanho_lote=self.lote_reconhecimento
+            )
+            self.pool_reconhecimento.iniciar()
         
         print("Sistema de reconhecimento facial inicializado!")
     
+    def encerrar(self):
+        """Para as threads de processamento e sincronização e grava o buffer pendente"""
+        self.parar_sincronizacao()
+        if self.pool_reconhecimento is not None:
+            self.pool_reconhecimento.parar()
+        if self.reconhecedor_processos is not None:
+            self.reconhecedor_processos.encerrar()
+            self.reconhecedor_processos = None
+        if self.escritor is not None:
+            self.escritor.parar()
+    
+    def _criar_face_detection(self):
+        """Cria o detector de faces do MediaPipe"""
+        return self.mp_face_detection.FaceDetection(
+            model_selection=0, min_detection_confidence=0.7
+        )
+    
+    def definir_modo_deteccao(self, modo):
+        """Alterna o pipeline entre 'malha' e 'completo'"""
+        if modo not in self.MODOS_DETECCAO:
+            raise ValueError(f"Modo de detecção inválido: {modo}")
+        if modo == 'completo' and self.face_detection is None:
+            self.face_detection = self._criar_face_detection()
+        self.modo_deteccao = modo
+    
+    def caixa_da_malha(self, landmarks, largura, altura):
+        """Caixa (x, y, w, h) em pixels que envolve o contorno do rosto"""
+        return caixa_dos_landmarks(landmarks, self.indices_contorno, largura, altura)
+    
     def extrair_embedding_facial(self, imagem, landmarks):
         """Extrai embedding facial usando landmarks do MediaPipe"""
         try:
-            # Converter landmarks para array numpy
-            pontos = []
-            h, w = imagem.shape[:2]
-            
-            for landmark in landmarks.landmark:
-                x = int(landmark.x * w)
-                y = int(landmark.y * h)
-                pontos.append([x, y])
-            
-            pontos = np.array(pontos)
-            
-            # Calcular características geométricas
-            # Distâncias entre pontos chave
-            caracteristicas = []
-            
-            # Pontos importantes do rosto (índices aproximados do face mesh)
-            pontos_chave = [
-                10, 151, 9, 8, 168, 6, 197, 195, 5, 4, 1, 19, 94, 125,
-                142, 36, 205, 206, 207, 213, 192, 147, 187, 207, 206, 205,
-                36, 142, 126, 142, 36, 205, 206, 207
-            ]
-            
-            # Calcular distâncias entre pontos chave
-            for i in range(len(pontos_chave)):
-                for j in range(i+1, min(i+10, len(pontos_chave))):
-                    if pontos_chave[i] < len(pontos) and pontos_chave[j] < len(pontos):
-                        dist = np.linalg.norm(pontos[pontos_chave[i]] - pontos[pontos_chave[j]])
-                        caracteristicas.append(dist)
-            
-            # Normalizar características
-            caracteristicas = np.array(caracteristicas)
-            if len(caracteristicas) > 0:
-                caracteristicas = caracteristicas / np.linalg.norm(caracteristicas)
-            
-            return caracteristicas
+            return self.extrator.extrair(imagem, landmarks)
             
         except Exception as e:
             print(f"Erro ao extrair embedding: {e}")
             return None
     
+    def extrair_embeddings_frame(self, imagem, lista_landmarks):
+        """Extrai os embeddings de todas as faces de um frame (matriz F x D)"""
+        try:
+            return self.extrator.extrair_lote(imagem, lista_landmarks)
+            
+        except Exception as e:
+            print(f"Erro ao extrair embeddings: {e}")
+            return np.empty((0, self.extrator.dimensao), dtype=np.float64)
+    
     def carregar_pessoas_conhecidas(self):
         """Carrega pessoas conhecidas do banco de dados"""
         try:
-            pessoas = self.db.obter_pessoas_conhecidas()
-            self.pessoas_conhecidas = {}
-            
-            for pessoa in pessoas:
-                pessoa_id, nome, idade, sexo, etnia, telefone, encoding_blob = pessoa
-                if encoding_blob:
-                    try:
-                        encoding = pickle.loads(encoding_blob)
-                        self.pessoas_conhecidas[pessoa_id] = {
-                            'nome': nome,
-                            'idade': idade,
-                            'sexo': sexo,
-                            'etnia': etnia,
-                            'telefone': telefone,
-                            'encoding': encoding
-                        }
-                    except Exception as e:
-                        print(f"Erro ao carregar encoding da pessoa {nome}: {e}")
+            with self._lock_galeria:
+                if self.armazenamento_galeria == 'arquivo':
+                    self._carregar_armazem()
+                    print(f"Galeria em arquivo com {self.galeria.total_pessoas} pessoas conhecidas")
+                    return
+                
+                # Versão, pessoas e modelos lidos no mesmo snapshot: é a base da atualização incremental
+                versao, pessoas, _, modelos = self.db.obter_alteracoes_pessoas(0, com_modelos=True)
+                
+                # Encodings principais e modelos adicionais viram uma única matriz
+                ids, matriz, pessoas = linhas_galeria(pessoas, modelos)
+                
+                self.galeria = GaleriaFacial(
+                    ids,
+                    matriz,
+                    indice=self._criar_indice(),
+                    caminho_indice=caminho_indice(self.db.db_path),
+                    versao=versao
+                )
+                self._indice_pendente_desde = None
+                self.pessoas_conhecidas = self._dados_pessoas(pessoas)
+                self.versao_galeria = versao
+                self._publicar_galeria()
             
             print(f"Carregadas {len(self.pessoas_conhecidas)} pessoas conhecidas")
             
         except Exception as e:
             print(f"Erro ao carregar pessoas conhecidas: {e}")
     
+    def _carregar_armazem(self):
+        """Mapeia o arquivo de encodings e aplica só o que mudou desde a última execução"""
+        if not isinstance(self.galeria, ArmazemEncodings):
+            self.galeria = ArmazemEncodings(caminho_armazem(self.db.db_path))
+        self.galeria.sincronizar(self.db)
+        self.pessoas_conhecidas = {}
+        self.versao_galeria = self.galeria.versao
+    
+    def dados_pessoa(self, pessoa_id):
+        """Dados (nome, idade, ...) de uma pessoa conhecida, ou None"""
+        dados = self.pessoas_conhecidas.get(pessoa_id)
+        if dados is None and self.armazenamento_galeria == 'arquivo' and pessoa_id is not None:
+            # No modo arquivo só as pessoas vistas são lidas do banco
+            pessoa = self.db.obter_pessoa_conhecida(pessoa_id)
+            if pessoa is not None:
+                dados = self._dados_pessoas([pessoa + (None, 1)])[pessoa_id]
+                self.pessoas_conhecidas[pessoa_id] = dados
+        return dados
+    
+    @staticmethod
+    def _dados_pessoas(pessoas, base=None):
+        """Metadados (sem encoding) das pessoas, indexados pelo id"""
+        pessoas_conhecidas = dict(base or {})
+        for pessoa_id, nome, idade, sexo, etnia, telefone, _, _ in pessoas:
+            pessoas_conhecidas[pessoa_id] = {
+                'nome': nome,
+                'idade': idade,
+                'sexo': sexo,
+                'etnia': etnia,
+                'telefone': telefone
+            }
+        return pessoas_conhecidas
+    
+    def atualizar_pessoas_conhecidas(self):
+        """Aplica à galeria só as pessoas alteradas desde a última carga
+        
+        A nova galeria e o novo dicionário são montados à parte e trocados no
+        final, então a thread de reconhecimento nunca vê um estado parcial.
+        Retorna o número de pessoas alteradas ou removidas.
+        """
+        try:
+            with self._lock_galeria:
+                return self._aplicar_alteracoes_pessoas()
+            
+        except Exception as e:
+            print(f"Erro ao atualizar pessoas conhecidas: {e}")
+            return 0
+    
+    def _aplicar_alteracoes_pessoas(self):
+        """Monta e troca a galeria com as alterações desde versao_galeria (com o lock adquirido)"""
+        if self.armazenamento_galeria == 'arquivo':
+            alteradas = self.galeria.sincronizar(self.db)
+            # Outro processo pode já ter gravado as alterações no arquivo: vale a versão
+            if alteradas or self.galeria.versao != self.versao_galeria:
+                # Os dados das pessoas voltam a ser lidos do banco quando forem vistas
+                self.pessoas_conhecidas = {}
+                self.versao_galeria = self.galeria.versao
+                print(f"Galeria atualizada: {alteradas} pessoas alteradas ({self.galeria.total_pessoas} conhecidas)")
+            return alteradas
+        
+        versao, alteradas, removidas, modelos = self.db.obter_alteracoes_pessoas(
+            self.versao_galeria, com_modelos=True
+        )
+        if versao == self.versao_galeria:
+            return 0
+        
+        ids_novos, matriz, ativas = linhas_galeria(alteradas, modelos)
+        
+        # Toda pessoa alterada sai da galeria (com todos os modelos); as que
+        # continuam ativas voltam com os dados e modelos novos
+        ids_alterados = set(removidas) | {pessoa[0] for pessoa in alteradas}
+        galeria = self.galeria.com_alteracoes(ids_alterados, ids_novos, matriz, versao)
+        
+        pessoas_conhecidas = {
+            pessoa_id: dados for pessoa_id, dados in self.pessoas_conhecidas.items()
+            if pessoa_id not in ids_alterados
+        }
+        pessoas_conhecidas = self._dados_pessoas(ativas, pessoas_conhecidas)
+        
+        self.galeria = galeria
+        self.pessoas_conhecidas = pessoas_conhecidas
+        self.versao_galeria = versao
+        if galeria.indice_pendente and self._indice_pendente_desde is None:
+            self._indice_pendente_desde = time.monotonic()
+        self._publicar_galeria()
+        
+        print(f"Galeria atualizada: {len(ids_alterados)} pessoas alteradas "
+              f"({len(self.pessoas_conhecidas)} conhecidas)")
+        return len(ids_alterados)
+    
+    def _publicar_galeria(self):
+        """Leva a galeria atual aos trabalhadores em processos, se houver"""
+        if self.reconhecedor_processos is not None:
+            # Os processos restauram o índice salvo em vez de treiná-lo de novo
+            if self.galeria.indice_pendente:
+                self.galeria.persistir_indice()
+                self._indice_pendente_desde = None
+            self.reconhecedor_processos.publicar(self.galeria, self.versao_galeria)
+    
+    def iniciar_sincronizacao(self):
+        """Inicia a thread que acompanha alterações na galeria feitas por outros processos"""
+        if self.thread_sincronizacao is not None and self.thread_sincronizacao.is_alive():
+            return
+        self._parar_sincronizacao.clear()
+        self.thread_sincronizacao = threading.Thread(target=self._sincronizar_galeria, daemon=True)
+        self.thread_sincronizacao.start()
+    
+    def parar_sincronizacao(self):
+        self._parar_sincronizacao.set()
+        if self.thread_sincronizacao is not None:
+            self.thread_sincronizacao.join(timeout=2)
+            self.thread_sincronizacao = None
+        self.salvar_indice_pendente(forcar=True)
+    
+    def salvar_indice_pendente(self, forcar=False):
+        """Salva o índice da galeria atual se houver alterações não salvas
+        
+        Sem `forcar`, só salva quando a alteração mais antiga não salva tem
+        INTERVALO_SALVAR_INDICE segundos: uma sequência de cadastros grava o
+        arquivo uma vez, com a galeria mais recente.
+        """
+        desde = self._indice_pendente_desde
+        if desde is None or (not forcar and time.monotonic() - desde < self.INTERVALO_SALVAR_INDICE):
+            return False
+        
+        with self._lock_galeria:
+            galeria = self.galeria
+            self._indice_pendente_desde = None
+        return galeria.persistir_indice()
+    
+    def _sincronizar_galeria(self):
+        """Consulta o contador de versão periodicamente e aplica as alterações novas
+        
+        A consulta é uma leitura de uma única linha; a galeria só é tocada
+        quando o contador mudou (cadastro, identificação ou desativação pelo
+        gerenciador, por exemplo). O índice alterado é salvo em disco com
+        atraso, por salvar_indice_pendente.
+        """
+        while not self._parar_sincronizacao.wait(self.intervalo_sincronizacao):
+            try:
+                if self.db.obter_versao_galeria() != self.versao_galeria:
+                    self.atualizar_pessoas_conhecidas()
+                self.salvar_indice_pendente()
+            except Exception as e:
+                print(f"Erro ao verificar alterações na galeria: {e}")
+    
+    def carregar_pessoas_desconhecidas(self):
+        """Carrega as pessoas desconhecidas pendentes para o cache de desduplicação"""
+        try:
+            # Só as detectadas mais recentemente, da mais antiga para a mais nova
+            pessoas = sorted(self.db.obter_pessoas_desconhecidas(), key=lambda pessoa: pessoa[4] or '')
+            pessoas = pessoas[-self.limite_desconhecidas:]
+            matriz, validas = desserializar_matriz([pessoa[2] for pessoa in pessoas])
+            codigos = [pessoa[1] for pessoa, valida in zip(pessoas, validas) if valida]
+            
+            self.pessoas_desconhecidas = OrderedDict(enumerate(codigos))
+            self.galeria_desconhecidas = GaleriaFacial(list(range(len(codigos))), matriz)
+            self._proxima_chave_desconhecida = len(codigos)
+            
+            print(f"Carregadas {len(self.pessoas_desconhecidas)} pessoas desconhecidas pendentes")
+            
+        except Exception as e:
+            print(f"Erro ao carregar pessoas desconhecidas: {e}")
+    
+    def _criar_indice(self):
+        """Cria o índice da galeria conforme as configurações"""
+        if self.tipo_indice == 'ivf':
+            return criar_indice('ivf', n_sondas=self.sondas_indice)
+        return criar_indice('exato')
+    
     def reconhecer_pessoa(self, encoding_face):
         """Reconhece uma pessoa comparando com o banco de dados"""
-        if encoding_face is None or len(self.pessoas_conhecidas) == 0:
+        if encoding_face is None or len(self.galeria) == 0:
             return None, 0.0
         
-        melhor_match = None
-        melhor_confianca = 0.0
-        
         try:
-            for pessoa_id, dados in self.pessoas_conhecidas.items():
-                encoding_conhecido = dados['encoding']
-                
-                # Calcular similaridade
-                if len(encoding_face) == len(encoding_conhecido):
-                    similaridade = cosine_similarity([encoding_face], [encoding_conhecido])[0][0]
-                    
-                    if similaridade > self.tolerancia and similaridade > melhor_confianca:
-                        melhor_confianca = similaridade
-                        melhor_match = pessoa_id
-            
-            return melhor_match, melhor_confianca
+            return self.galeria.reconhecer(encoding_face, self.tolerancia)
             
         except Exception as e:
             print(f"Erro no reconhecimento: {e}")
             return None, 0.0
     
-    def _processar_deteccoes(self):
-        """Thread para processar detecções de forma assíncrona"""
-        while True:
-            try:
-                item = self.fila_processamento.get(timeout=1)
-                if item is None:
-                    break
-                
-                encoding, timestamp = item
-                pessoa_id, confianca = self.reconhecer_pessoa(encoding)
-                
-                if pessoa_id:
-                    # Pessoa conhecida encontrada
-                    agora = datetime.now()
-                    chave_deteccao = f"conhecida_{pessoa_id}"
-                    
-                    # Verificar se já foi detectada recentemente
-                    if (chave_deteccao not in self.deteccoes_recentes or 
-                        (agora - self.deteccoes_recentes[chave_deteccao]).seconds >= self.intervalo_deteccao):
-                        
-                        self.db.registrar_presenca(pessoa_id, 'conhecida', confianca)
-                        self.deteccoes_recentes[chave_deteccao] = agora
-                        
-                        nome = self.pessoas_conhecidas[pessoa_id]['nome']
-                        print(f"✓ PRESENÇA REGISTRADA: {nome} (confiança: {confianca:.2f})")
-                else:
-                    # Pessoa desconhecida
-                    pessoa_id, codigo_temp = self.db.adicionar_pessoa_desconhecida(pickle.dumps(encoding))
-                    self.db.registrar_presenca(pessoa_id, 'desconhecida', 0.0)
-                    print(f"? PESSOA DESCONHECIDA: {codigo_temp}")
-                
-                self.fila_processamento.task_done()
+    def reconhecer_pessoas(self, encodings):
+        """Reconhece todas as faces de um frame de uma só vez"""
+        try:
+            if self.reconhecedor_processos is not None:
+                return self.reconhecedor_processos.reconhecer_lote(encodings, self.tolerancia)
+            return self.galeria.reconhecer_lote(encodings, self.tolerancia)
+            
+        except Exception as e:
+            print(f"Erro no reconhecimento: {e}")
+            return [(None, 0.0)] * len(encodings)
+    
+    def _registrar_item(self, item, resultado):
+        """Registra uma face da fila já comparada (chamado em série pelo pool de reconhecimento)"""
+        encoding, momento, rastro_id, instante_captura = item
+        pessoa_id, confianca = resultado
+        
+        # A identidade fica no rastro até a próxima passagem de reconhecimento
+        self.rastreador.definir_identidade(rastro_id, pessoa_id, confianca)
+        self.fila_processamento.estatisticas.registrar(time.perf_counter() - instante_captura)
+        self._registrar_deteccao(encoding, pessoa_id, confianca, momento, instante_captura)
+    
+    def _registrar_deteccao(self, encoding, pessoa_id, confianca, momento=None, instante_captura=None):
+        """Registra a presença de uma face já comparada com a galeria
+        
+        `momento` é a data/hora local em que a face foi vista (padrão: agora);
+        no processamento de gravações é o horário original do quadro.
+        `instante_captura` (perf_counter) alimenta a latência até a gravação.
+        """
+        agora = momento or datetime.now()
+        data = timestamp_utc(agora.astimezone())
+        
+        # Relógio do intervalo entre detecções: o instante monotônico da captura ao
+        # vivo; nas gravações, o horário do quadro (o processamento é mais rápido que o vídeo)
+        if instante_captura is not None:
+            instante = instante_captura
+        else:
+            instante = momento.timestamp() if momento is not None else None
+        
+        if pessoa_id:
+            # Pessoa conhecida encontrada; registrar só se não foi detectada recentemente
+            if self.deteccoes_recentes.registrar(('conhecida', pessoa_id), instante):
+                self.escritor.registrar_presenca(pessoa_id, 'conhecida', confianca, data, instante_captura)
                 
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"Erro no processamento: {e}")
+                # A pessoa pode ter saído da galeria entre o match e este ponto
+                dados = self.dados_pessoa(pessoa_id)
+                nome = dados['nome'] if dados else f"ID {pessoa_id}"
+                print(f"✓ PRESENÇA REGISTRADA: {nome} (confiança: {confianca:.2f})")
+            return
+        
+        # Pessoa desconhecida: comparar com os visitantes já registrados
+        chave, confianca = self.galeria_desconhecidas.reconhecer(encoding, self.tolerancia_desconhecidas)
+        
+        if chave is not None:
+            codigo_temp = self.pessoas_desconhecidas[chave]
+            self.pessoas_desconhecidas.move_to_end(chave)
+            if self.deteccoes_recentes.registrar(('desconhecida', codigo_temp), instante):
+                self.escritor.atualizar_deteccao_desconhecida(codigo_temp, data)
+                self.escritor.registrar_presenca_desconhecida(codigo_temp, confianca, data, instante_captura)
+                print(f"? PESSOA DESCONHECIDA: {codigo_temp} (novamente)")
+            return
+        
+        # Visitante novo
+        codigo_temp = self.escritor.adicionar_pessoa_desconhecida(serializar_encoding(encoding), data)
+        self.escritor.registrar_presenca_desconhecida(codigo_temp, 0.0, data, instante_captura)
+        self.deteccoes_recentes.marcar(('desconhecida', codigo_temp), instante)
+        
+        chave = self._proxima_chave_desconhecida
+        self._proxima_chave_desconhecida += 1
+        self.pessoas_desconhecidas[chave] = codigo_temp
+        self.galeria_desconhecidas.adicionar(chave, encoding)
+        self._podar_desconhecidas()
+        print(f"? PESSOA DESCONHECIDA: {codigo_temp}")
+    
+    def _podar_desconhecidas(self):
+        """Mantém o cache de desconhecidos dentro de limite_desconhecidas
+        
+        Acima do limite, saem de uma vez os visitantes vistos há mais tempo até
+        sobrar 90% do limite, para não recompactar a galeria a cada visitante novo.
+        Quem sair e voltar é cadastrado de novo como outro visitante.
+        """
+        if len(self.pessoas_desconhecidas) <= self.limite_desconhecidas:
+            return
+        
+        excedentes = len(self.pessoas_desconhecidas) - max(1, self.limite_desconhecidas * 9 // 10)
+        removidas = [self.pessoas_desconhecidas.popitem(last=False)[0] for _ in range(excedentes)]
+        self.galeria_desconhecidas.remover(removidas)
+    
+    def _desenhar_rastros(self, frame, rastros):
+        """Desenha a identidade atual de cada rastro visível"""
+        for rastro in rastros:
+            x, y, w, h = rastro.caixa
+            dados = self.dados_pessoa(rastro.pessoa_id)
+            if dados is not None:
+                texto = f"{dados['nome']} ({rastro.confianca:.2f})"
+                cor = (0, 255, 0)
+            elif rastro.reconhecido:
+                texto = "Desconhecido"
+                cor = (0, 165, 255)
+            else:
+                texto = "Reconhecendo..."
+                cor = (255, 255, 255)
+            
+            cv2.rectangle(frame, (x, y), (x + w, y + h), cor, 2)
+            cv2.putText(frame, texto, (x, y + h + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, cor, 1)
+    
+    def analisar_quadro(self, rgb_frame, results_mesh, agora):
+        """Associa as faces do quadro aos rastros e extrai os embeddings dos que precisam de reconhecimento
+        
+        Retorna (landmarks, rastros, índices selecionados, encodings dos selecionados).
+        `agora` é o relógio usado pelo rastreador (monotônico ao vivo, tempo do vídeo em lote).
+        """
+        ih, iw = rgb_frame.shape[:2]
+        
+        # Associar as faces da malha aos rastros (caixas derivadas dos landmarks)
+        lista_landmarks = results_mesh.multi_face_landmarks or []
+        caixas = [self.caixa_da_malha(face_landmarks, iw, ih) for face_landmarks in lista_landmarks]
+        rastros = self.rastreador.atualizar(caixas)
+        
+        # Processar landmarks para reconhecimento apenas dos rastros que precisam
+        selecionados = [i for i, rastro in enumerate(rastros) if self.rastreador.precisa_reconhecer(rastro, agora)]
+        if not selecionados:
+            return lista_landmarks, rastros, [], []
+        
+        # Extrair embeddings das faces selecionadas de uma vez
+        encodings_frame = self.extrair_embeddings_frame(
+            rgb_frame, [lista_landmarks[i] for i in selecionados]
+        )
+        if len(encodings_frame) == 0:
+            return lista_landmarks, rastros, [], []
+        
+        for i in selecionados:
+            self.rastreador.marcar_envio(rastros[i], agora)
+        return lista_landmarks, rastros, selecionados, encodings_frame
     
-    def processar_frame(self, frame):
+    def processar_frame(self, frame, instante_captura=None):
         """Processa um frame da webcam"""
+        instante_captura = instante_captura or time.perf_counter()
+        self.contador_quadros += 1
+        
+        # Rostos parados e já identificados: pular a inferência neste quadro
+        if self.quadros_estavel > 1 and self.contador_quadros % self.quadros_estavel != 0 \
+                and self.rastreador.estavel():
+            if self.desenhar:
+                self._desenhar_rastros(frame, self.rastreador.rastros_visiveis())
+            return frame
+        
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         
         # Detectar rostos
-        results_detection = self.face_detection.process(rgb_frame)
         results_mesh = self.face_mesh.process(rgb_frame)
+        ih, iw, _ = frame.shape
         
-        if results_detection.detections:
-            for detection in results_detection.detections:
-                # Desenhar caixa de detecção
-                bboxC = detection.location_data.relative_bounding_box
-                ih, iw, _ = frame.shape
-                x, y, w, h = int(bboxC.xmin * iw), int(bboxC.ymin * ih), \
-                           int(bboxC.width * iw), int(bboxC.height * ih)
-                
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-                cv2.putText(frame, f"Confiança: {detection.score[0]:.2f}", 
-                           (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-        
-        # Processar landmarks para reconhecimento
-        if results_mesh.multi_face_landmarks:
-            for face_landmarks in results_mesh.multi_face_landmarks:
-                # Extrair embedding
-                encoding = self.extrair_embedding_facial(rgb_frame, face_landmarks)
-                
-                if encoding is not None:
-                    # Adicionar à fila de processamento
-                    self.fila_processamento.put((encoding, datetime.now()))
-                
-                # Desenhar landmarks (opcional, pode ser removido para performance)
-                self.mp_drawing.draw_landmarks(
-                    frame, face_landmarks, self.mp_face_mesh.FACEMESH_CONTOURS,
-                    None, self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1)
-                )
+        # As caixas do FaceDetection só servem para desenho
+        if self.modo_deteccao == 'completo' and self.desenhar:
+            results_detection = self.face_detection.process(rgb_frame)
+            
+            if results_detection.detections:
+                for detection in results_detection.detections:
+                    # Desenhar caixa de detecção
+                    bboxC = detection.location_data.relative_bounding_box
+                    x, y, w, h = int(bboxC.xmin * iw), int(bboxC.ymin * ih), \
+                               int(bboxC.width * iw), int(bboxC.height * ih)
+                    
+                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                    cv2.putText(frame, f"Confiança: {detection.score[0]:.2f}", 
+                               (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        
+        lista_landmarks, rastros, selecionados, encodings_frame = self.analisar_quadro(
+            rgb_frame, results_mesh, time.monotonic()
+        )
+        if selecionados:
+            # Uma entrada por face; a fila limitada descarta ou agrupa se o reconhecimento atrasar
+            momento = datetime.now()
+            for i, encoding in zip(selecionados, encodings_frame):
+                self.fila_processamento.colocar((encoding, momento, rastros[i].id, instante_captura))
+        
+        if not self.desenhar:
+            return frame
+        
+        for face_landmarks in lista_landmarks:
+            # Desenhar landmarks (opcional, pode ser removido para performance)
+            self.mp_drawing.draw_landmarks(
+                frame, face_landmarks, self.mp_face_mesh.FACEMESH_CONTOURS,
+                None, self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=1, circle_radius=1)
+            )
+        
+        self._desenhar_rastros(frame, rastros)
         
         return frame
     
-    def iniciar_reconhecimento(self, camera_index=0):
-        """Inicia o sistema de reconhecimento em tempo real"""
+    def iniciar_reconhecimento(self, camera_index=0, sem_interface=False, intervalo_snapshot=0,
+                               caminho_snapshot="snapshot.jpg"):
+        """Inicia o sistema de reconhecimento em tempo real
+        
+        Com `sem_interface`, nada é desenhado nem exibido; se `intervalo_snapshot`
+        for maior que zero, um quadro anotado é salvo em `caminho_snapshot` a cada
+        `intervalo_snapshot` segundos para depuração.
+        """
+        if self.pool_reconhecimento is None:
+            # somente_deteccao ou sem_trabalhadores: não há quem reconheça nem registre
+            print("Erro: Sistema criado sem trabalhadores de reconhecimento; "
+                  "o reconhecimento em tempo real não está disponível")
+            return
+        
         cap = cv2.VideoCapture(camera_index)
         
         if not cap.isOpened():
             print("Erro: Não foi possível abrir a câmera")
             return
         
-        print("Sistema iniciado! Pressione 'q' para sair, 'r' para recarregar pessoas conhecidas")
+        if sem_interface:
+            print("Sistema iniciado sem interface! Pressione Ctrl+C para sair")
+        else:
+            print("Sistema iniciado! Pressione 'q' para sair, 'r' para recarregar pessoas conhecidas")
+        
+        # A sessão anterior parou os trabalhadores de reconhecimento; iniciar de novo
+        self.pool_reconhecimento.iniciar()
+        
+        # Captura e inferência em threads próprias; a renderização fica nesta thread
+        self.desenhar = not sem_interface
+        pipeline = PipelineVideo(cap, self.processar_frame)
+        pipeline.iniciar()
+        self.iniciar_sincronizacao()
         
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    print("Erro ao capturar frame")
-                    break
+            if sem_interface:
+                self._executar_sem_interface(pipeline, intervalo_snapshot, caminho_snapshot)
+            else:
+                self._executar_com_interface(pipeline)
                 
-                # Processar frame
-                frame_processado = self.processar_frame(frame)
+        except KeyboardInterrupt:
+            print("\nSistema interrompido pelo usuário")
+        finally:
+            self.parar_sincronizacao()
+            pipeline.parar()
+            cap.release()
+            if not sem_interface:
+                cv2.destroyAllWindows()
+            self.desenhar = True
+            # Esvaziar a fila e parar os trabalhadores até a próxima sessão; gravar o que ficou no buffer
+            self.pool_reconhecimento.parar()
+            self.escritor.descarregar()
+            
+            print("\nDesempenho do pipeline:")
+            for linha in self.resumo_desempenho(pipeline):
+                print(f"  {linha}")
+    
+    def resumo_desempenho(self, pipeline):
+        """Estágios do pipeline, fila de reconhecimento e gravação de presenças"""
+        linhas = pipeline.resumo() + [self.fila_processamento.resumo(), self.deteccoes_recentes.resumo()]
+        if self.escritor is not None:
+            linhas.append(self.escritor.resumo())
+        return linhas
+    
+    def _executar_com_interface(self, pipeline):
+        """Exibe os quadros anotados e trata o teclado"""
+        while pipeline.ativo.is_set():
+            frame_processado, instante_captura = pipeline.obter_quadro(timeout=0.03)
+            
+            if frame_processado is not None:
+                inicio_renderizacao = time.perf_counter()
                 
                 # Mostrar informações na tela
-                cv2.putText(frame_processado, f"Pessoas conhecidas: {len(self.pessoas_conhecidas)}", 
+                cv2.putText(frame_processado, f"Pessoas conhecidas: {self.galeria.total_pessoas}", 
                            (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
                 cv2.putText(frame_processado, f"Tolerancia: {self.tolerancia}", 
                            (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-                cv2.putText(frame_processado, "Pressione 'q' para sair, 'r' para recarregar", 
+                cv2.putText(frame_processado, f"Inferencia: {pipeline.estatisticas_inferencia.fps:.1f} FPS", 
+                           (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                cv2.putText(frame_processado, "Pressione 'q' para sair, 'r' para recarregar, 'e' para estatisticas", 
                            (10, frame_processado.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
                 
                 cv2.imshow('Sistema de Reconhecimento Facial - Igreja', frame_processado)
+                pipeline.registrar_renderizacao(inicio_renderizacao, instante_captura)
+            
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                break
+            elif key == ord('r'):
+                print("Atualizando pessoas conhecidas...")
+                self.atualizar_pessoas_conhecidas()
+            elif key == ord('e'):
+                for linha in self.resumo_desempenho(pipeline):
+                    print(linha)
+    
+    def _executar_sem_interface(self, pipeline, intervalo_snapshot, caminho_snapshot, intervalo_estatisticas=60):
+        """Consome os quadros sem desenhar nem exibir; salva snapshots e estatísticas periódicas"""
+        proximo_snapshot = time.monotonic() + intervalo_snapshot if intervalo_snapshot > 0 else None
+        proximas_estatisticas = time.monotonic() + intervalo_estatisticas
+        
+        while pipeline.ativo.is_set():
+            frame_processado, instante_captura = pipeline.obter_quadro(timeout=0.5)
+            agora = time.monotonic()
+            
+            if frame_processado is not None:
+                inicio_renderizacao = time.perf_counter()
                 
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
-                    break
-                elif key == ord('r'):
-                    print("Recarregando pessoas conhecidas...")
-                    self.carregar_pessoas_conhecidas()
+                # Só o snapshot ocasional paga a cópia e o desenho do quadro
+                if proximo_snapshot is not None and agora >= proximo_snapshot:
+                    snapshot = frame_processado.copy()
+                    self._desenhar_rastros(snapshot, self.rastreador.rastros_visiveis())
+                    cv2.imwrite(caminho_snapshot, snapshot)
+                    proximo_snapshot = agora + intervalo_snapshot
                 
-        except KeyboardInterrupt:
-            print("\nSistema interrompido pelo usuário")
-        finally:
-            cap.release()
-            cv2.destroyAllWindows()
-            # Parar thread de processamento
-            self.fila_processamento.put(None)
+                pipeline.registrar_renderizacao(inicio_renderizacao, instante_captura)
+            
+            if agora >= proximas_estatisticas:
+                for linha in self.resumo_desempenho(pipeline):
+                    print(linha)
+                proximas_estatisticas = agora + intervalo_estatisticas
     
     def adicionar_pessoa_do_video(self, nome, idade, sexo, etnia, telefone, camera_index=0):
-        """Adiciona uma nova pessoa capturando da webcam"""
+        """Adiciona uma nova pessoa capturando da webcam
+        
+        As amostras são capturadas automaticamente quando o rosto passa na
+        avaliação de qualidade (tamanho, pose frontal e nitidez). A de maior
+        pontuação vira o encoding principal; as demais são guardadas como
+        modelos adicionais, comparados junto com ele no reconhecimento.
+        """
         cap = cv2.VideoCapture(camera_index)
         
         if not cap.isOpened():
             print("Erro: Não foi possível abrir a câmera")
             return False
         
+        total_amostras = max(1, int(self.db.obter_configuracao('modelos_por_pessoa') or 5))
+        avaliador = AvaliadorQualidade(
+            tamanho_minimo=int(self.db.obter_configuracao('tamanho_minimo_face') or 120),
+            nitidez_minima=float(self.db.obter_configuracao('nitidez_minima') or 60)
+        )
+        # Intervalo entre capturas: dá tempo de o rosto mudar um pouco de posição
+        intervalo_captura = 0.5
+        
         print(f"Capturando rosto para {nome}...")
-        print("Posicione o rosto na tela e pressione ESPAÇO para capturar, 'q' para cancelar")
+        print("Olhe para a câmera e mova levemente a cabeça; as amostras são capturadas "
+              "automaticamente. Pressione 'q' para cancelar")
         
-        encodings_capturados = []
+        amostras = []  # (pontuação, encoding)
+        ultima_captura = 0.0
         
         try:
-            while len(encodings_capturados) < 5:  # Capturar 5 amostras
+            while len(amostras) < total_amostras:
                 ret, frame = cap.read()
                 if not ret:
                     break
                 
                 rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 results = self.face_mesh.process(rgb_frame)
+                altura, largura = frame.shape[:2]
+                
+                mensagem = "Nenhum rosto encontrado"
+                if results.multi_face_landmarks and len(results.multi_face_landmarks) > 1:
+                    mensagem = "Apenas uma pessoa na frente da câmera"
+                elif results.multi_face_landmarks:
+                    face_landmarks = results.multi_face_landmarks[0]
+                    caixa = self.caixa_da_malha(face_landmarks, largura, altura)
+                    aceita, motivo, pontuacao = avaliador.avaliar(rgb_frame, face_landmarks, caixa)
+                    mensagem = avaliador.INSTRUCOES.get(motivo, "Amostra aceita, mova levemente a cabeça")
+                    
+                    agora = time.perf_counter()
+                    if aceita and agora - ultima_captura >= intervalo_captura:
+                        encoding = self.extrair_embedding_facial(rgb_frame, face_landmarks)
+                        if encoding is not None and not any(
+                                np.array_equal(encoding, anterior) for _, anterior in amostras):
+                            amostras.append((pontuacao, encoding))
+                            ultima_captura = agora
+                            print(f"Amostra {len(amostras)} capturada! (qualidade {pontuacao:.2f})")
+                    
+                    # Desenhar landmarks e a caixa (verde quando a amostra é aceita)
+                    self.mp_drawing.draw_landmarks(
+                        frame, face_landmarks, self.mp_face_mesh.FACEMESH_CONTOURS
+                    )
+                    x, y, w, h = caixa
+                    cor = (0, 255, 0) if aceita else (0, 0, 255)
+                    cv2.rectangle(frame, (x, y), (x + w, y + h), cor, 2)
                 
-                if results.multi_face_landmarks:
-                    for face_landmarks in results.multi_face_landmarks:
-                        # Desenhar landmarks
-                        self.mp_drawing.draw_landmarks(
-                            frame, face_landmarks, self.mp_face_mesh.FACEMESH_CONTOURS
-                        )
-                        
-                        # Mostrar instruções
-                        cv2.putText(frame, f"Capturado: {len(encodings_capturados)}/5", 
-                                   (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                        cv2.putText(frame, "ESPACO: Capturar | Q: Cancelar", 
-                                   (10, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                # Mostrar progresso e instruções
+                cv2.putText(frame, f"Capturado: {len(amostras)}/{total_amostras}", 
+                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                cv2.putText(frame, self._sem_acentos(mensagem), 
+                           (10, 65), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                cv2.putText(frame, "Q: Cancelar", 
+                           (10, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
                 
                 cv2.imshow('Captura de Rosto', frame)
                 
                 key = cv2.waitKey(1) & 0xFF
-                if key == ord(' ') and results.multi_face_landmarks:
-                    # Capturar encoding
-                    for face_landmarks in results.multi_face_landmarks:
-                        encoding = self.extrair_embedding_facial(rgb_frame, face_landmarks)
-                        if encoding is not None:
-                            encodings_capturados.append(encoding)
-                            print(f"Amostra {len(encodings_capturados)} capturada!")
-                            break
-                elif key == ord('q'):
+                if key == ord('q'):
                     print("Captura cancelada")
                     return False
             
-            if len(encodings_capturados) >= 3:
-                # Calcular encoding médio
-                encoding_medio = np.mean(encodings_capturados, axis=0)
+            if len(amostras) >= min(3, total_amostras):
+                # Sem média: a melhor amostra é o encoding principal, as outras viram modelos
+                amostras.sort(key=lambda amostra: amostra[0], reverse=True)
+                (_, principal), adicionais = amostras[0], amostras[1:]
                 
-                # Salvar no banco de dados
+                # Salvar no banco de dados (pessoa e modelos na mesma transação)
                 pessoa_id = self.db.adicionar_pessoa_conhecida(
-                    nome, idade, sexo, etnia, telefone, pickle.dumps(encoding_medio)
+                    nome, idade, sexo, etnia, telefone, serializar_encoding(principal),
+                    modelos=[(serializar_encoding(encoding), pontuacao) for pontuacao, encoding in adicionais]
                 )
                 
-                print(f"Pessoa {nome} adicionada com sucesso! ID: {pessoa_id}")
+                print(f"Pessoa {nome} adicionada com sucesso! ID: {pessoa_id} ({len(amostras)} modelos)")
                 
-                # Recarregar cache
-                self.carregar_pessoas_conhecidas()
+                # Aplicar só a pessoa nova ao cache
+                self.atualizar_pessoas_conhecidas()
                 return True
             else:
                 print("Não foi possível capturar amostras suficientes")
@@ -335,8 +843,23 @@ class FaceRecognitionSystem:
         finally:
             cap.release()
             cv2.destroyAllWindows()
+    
+    @staticmethod
+    def _sem_acentos(texto):
+        """O putText do OpenCV não desenha acentos"""
+        return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Reconhecimento facial em tempo real")
+    parser.add_argument('--camera', type=int, default=0, help="Índice da câmera")
+    parser.add_argument('--sem-interface', action='store_true', help="Não desenha nem exibe os quadros")
+    parser.add_argument('--snapshot', type=float, default=0,
+                        help="Sem interface: salva um quadro anotado a cada N segundos (0 desliga)")
+    parser.add_argument('--arquivo-snapshot', default="snapshot.jpg", help="Arquivo do snapshot")
+    args = parser.parse_args()
+    
     sistema = FaceRecognitionSystem()
-    sistema.iniciar_reconhecimento()
+    sistema.iniciar_reconhecimento(args.camera, args.sem_interface, args.snapshot, args.arquivo_snapshot)
 
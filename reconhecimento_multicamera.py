@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Reconhecimento com Várias Câmeras
+Cada câmera (ou arquivo de vídeo) roda o próprio MediaPipe em um processo;
+o coordenador mantém uma única galeria, um único escritor de presenças e
+o controle de detecções recentes compartilhado entre as entradas
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+# Adicionar o diretório atual ao path para importar os módulos
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _FilaCamera:
+    """Substitui a fila de processamento da câmera: envia cada face ao coordenador"""
+
+    def __init__(self, indice, fila_deteccoes):
+        self.indice = indice
+        self.fila_deteccoes = fila_deteccoes
+
+    def colocar(self, item):
+        self.fila_deteccoes.put(('deteccao', self.indice, item))
+        return True
+
+
+def _abrir_fonte(fonte):
+    import cv2
+
+    return cv2.VideoCapture(int(fonte) if str(fonte).isdigit() else fonte)
+
+
+def _executar_camera(indice, fonte, db_path, fila_deteccoes, fila_identidades, parar, intervalo_estatisticas=60):
+    """Processo de uma câmera: captura, detecção, rastreamento e extração de embeddings"""
+    from pipeline_video import PipelineVideo
+    from reconhecimento_facial import FaceRecognitionSystem
+
+    cap = None
+    pipeline = None
+    try:
+        sistema = FaceRecognitionSystem(db_path=db_path, somente_deteccao=True)
+        sistema.desenhar = False
+        sistema.fila_processamento = _FilaCamera(indice, fila_deteccoes)
+
+        cap = _abrir_fonte(fonte)
+        if not cap.isOpened():
+            print(f"Câmera {indice}: não foi possível abrir {fonte}")
+            return
+
+        pipeline = PipelineVideo(cap, sistema.processar_frame)
+        pipeline.iniciar()
+        print(f"Câmera {indice} ({fonte}) iniciada")
+
+        proximas_estatisticas = time.monotonic() + intervalo_estatisticas
+        while pipeline.ativo.is_set() and not parar.is_set():
+            frame_processado, instante_captura = pipeline.obter_quadro(timeout=0.5)
+            if frame_processado is not None:
+                pipeline.registrar_renderizacao(time.perf_counter(), instante_captura)
+
+            # Identidades devolvidas pelo coordenador ficam nos rastros desta câmera
+            while True:
+                try:
+                    identidades = fila_identidades.get_nowait()
+                except queue.Empty:
+                    break
+                for rastro_id, pessoa_id, confianca in identidades:
+                    sistema.rastreador.definir_identidade(rastro_id, pessoa_id, confianca)
+
+            if time.monotonic() >= proximas_estatisticas:
+                for linha in pipeline.resumo():
+                    print(f"Câmera {indice}: {linha}")
+                proximas_estatisticas = time.monotonic() + intervalo_estatisticas
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Erro na câmera {indice}: {e}")
+    finally:
+        if pipeline is not None:
+            pipeline.parar()
+            print(f"\nDesempenho da câmera {indice}:")
+            for linha in pipeline.resumo():
+                print(f"  {linha}")
+        if cap is not None:
+            cap.release()
+        fila_deteccoes.put(('fim', indice, None))
+
+
+def executar_multicamera(fontes, db_path="igreja_reconhecimento.db"):
+    """Reconhece as faces de várias câmeras/vídeos ao mesmo tempo com uma única galeria"""
+    from reconhecimento_facial import FaceRecognitionSystem
+
+    # O coordenador guarda a galeria, o escritor e as detecções recentes;
+    # uma pessoa que passa por duas portas conta uma vez dentro de intervalo_deteccao
+    sistema = FaceRecognitionSystem(db_path=db_path)
+
+    # spawn: cada processo cria o próprio MediaPipe do zero, sem herdar threads
+    contexto = multiprocessing.get_context('spawn')
+    fila_deteccoes = contexto.Queue()
+    filas_identidades = [contexto.Queue() for _ in fontes]
+    parar = contexto.Event()
+
+    processos = [
+        contexto.Process(
+            target=_executar_camera,
+            args=(indice, fonte, db_path, fila_deteccoes, filas_identidades[indice], parar),
+            daemon=True
+        )
+        for indice, fonte in enumerate(fontes)
+    ]
+    for processo in processos:
+        processo.start()
+
+    sistema.iniciar_sincronizacao()
+    print(f"Reconhecimento iniciado com {len(fontes)} câmeras! Pressione Ctrl+C para sair")
+
+    ativos = len(processos)
+    faces = 0
+    try:
+        while ativos:
+            try:
+                mensagens = [fila_deteccoes.get(timeout=1)]
+            except queue.Empty:
+                if not any(processo.is_alive() for processo in processos):
+                    break
+                continue
+
+            # Faces já enfileiradas pelas câmeras vão juntas para a galeria
+            while len(mensagens) < sistema.lote_reconhecimento:
+                try:
+                    mensagens.append(fila_deteccoes.get_nowait())
+                except queue.Empty:
+                    break
+
+            ativos -= sum(1 for tipo, _, _ in mensagens if tipo == 'fim')
+            lote = [(indice, item) for tipo, indice, item in mensagens if tipo == 'deteccao']
+            if not lote:
+                continue
+
+            resultados = sistema.reconhecer_pessoas([item[0] for _, item in lote])
+
+            identidades = {}
+            for (indice, item), (pessoa_id, confianca) in zip(lote, resultados):
+                encoding, momento, rastro_id, instante_captura = item
+                identidades.setdefault(indice, []).append((rastro_id, pessoa_id, confianca))
+                sistema._registrar_deteccao(encoding, pessoa_id, confianca, momento, instante_captura)
+            for indice, lista in identidades.items():
+                filas_identidades[indice].put(lista)
+            faces += len(lote)
+
+    except KeyboardInterrupt:
+        print("\nSistema interrompido pelo usuário")
+    finally:
+        parar.set()
+        for processo in processos:
+            processo.join(timeout=5)
+        sistema.encerrar()
+        print(f"\n{faces} faces reconhecidas em {len(fontes)} câmeras")
+        print(sistema.escritor.resumo())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconhecimento facial com várias câmeras")
+    parser.add_argument('fontes', nargs='+', help="Índices de câmera ou arquivos de vídeo")
+    parser.add_argument('--banco', default="igreja_reconhecimento.db", help="Arquivo do banco de dados")
+    args = parser.parse_args()
+
+    executar_multicamera(args.fontes, args.banco)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from formato_encoding import serializar_encoding
+
+
+def criar_banco_original(caminho, pessoas=3, dimensao=16):
+    """Banco no esquema original (user_version 0, sem a coluna versao) com pessoas cadastradas"""
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(caminho)
+    conn.execute('''
+        CREATE TABLE pessoas_conhecidas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            idade INTEGER,
+            sexo TEXT,
+            etnia TEXT,
+            telefone TEXT,
+            encoding BLOB NOT NULL,
+            data_cadastro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ativo BOOLEAN DEFAULT 1
+        )
+    ''')
+    conn.executemany(
+        'INSERT INTO pessoas_conhecidas (nome, encoding) VALUES (?, ?)',
+        [(f"Pessoa {i}", serializar_encoding(rng.normal(size=dimensao).astype(np.float32)))
+         for i in range(pessoas)]
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def banco_original(tmp_path):
+    caminho = str(tmp_path / 'original.db')
+    criar_banco_original(caminho)
+    return caminho
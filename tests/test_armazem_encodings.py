@@ -0,0 +1,93 @@
+from armazem_encodings import ArmazemEncodings, caminho_armazem
+from database import DatabaseManager
+
+
+def test_armazem_em_banco_migrado(banco_original):
+    db = DatabaseManager(banco_original)
+    armazem = ArmazemEncodings(caminho_armazem(banco_original))
+
+    assert armazem.sincronizar(db) == 3
+    assert armazem.total_pessoas == 3
+    assert sorted(armazem.ids.tolist()) == [1, 2, 3]
+
+    # Reaberto, o arquivo já está em dia e mantém as pessoas
+    reaberto = ArmazemEncodings(caminho_armazem(banco_original))
+    assert reaberto.sincronizar(db) == 0
+    assert reaberto.total_pessoas == 3
+
+
+def _banco_com_alteracoes(banco_original):
+    db = DatabaseManager(banco_original)
+    armazem = ArmazemEncodings(caminho_armazem(banco_original))
+    armazem.sincronizar(db)
+    # Pessoa 1 recebe um modelo (linhas substituídas); pessoa 3 é removida
+    db.adicionar_modelos_faciais(1, [(db.obter_alteracoes_pessoas(0)[1][1][6], 0.5)])
+    conn = db._conectar()
+    conn.execute('DELETE FROM pessoas_conhecidas WHERE id = 3')
+    conn.commit()
+    armazem.sincronizar(db)
+    return db, armazem
+
+
+def test_totais_incrementais_batem_com_recontagem(banco_original):
+    _, armazem = _banco_com_alteracoes(banco_original)
+
+    ativos, pessoas = len(armazem), armazem.total_pessoas
+    armazem._contar()
+
+    assert (ativos, pessoas) == (len(armazem), armazem.total_pessoas) == (3, 2)
+
+
+def test_abertura_normal_nao_varre_a_tabela(banco_original, monkeypatch):
+    _banco_com_alteracoes(banco_original)
+
+    def falhar(self):
+        raise AssertionError("varredura completa na abertura")
+    monkeypatch.setattr(ArmazemEncodings, '_corrigir_duplicados', falhar)
+    monkeypatch.setattr(ArmazemEncodings, '_contar', falhar)
+
+    armazem = ArmazemEncodings(caminho_armazem(banco_original))
+    assert (len(armazem), armazem.total_pessoas) == (3, 2)
+
+
+def test_sincronizacao_interrompida_e_corrigida_na_abertura(banco_original):
+    _, armazem = _banco_com_alteracoes(banco_original)
+
+    # Interrupção depois da confirmação das linhas novas e antes de desativar as antigas
+    _, registros = armazem._estado
+    registros['ativo'][registros['pessoa_id'] != 3] = 1
+    registros.flush()
+    armazem._confirmar(len(registros), consistente=False)
+
+    reaberto = ArmazemEncodings(caminho_armazem(banco_original))
+    assert (len(reaberto), reaberto.total_pessoas) == (3, 2)
+    assert sorted(reaberto.ids.tolist()) == [1, 1, 2]
+
+
+def test_dois_processos_gravando_no_mesmo_arquivo(banco_original):
+    db = DatabaseManager(banco_original)
+    caminho = caminho_armazem(banco_original)
+    # Reconhecimento e gerenciador com o mesmo arquivo aberto
+    reconhecimento = ArmazemEncodings(caminho)
+    gerenciador = ArmazemEncodings(caminho)
+    reconhecimento.sincronizar(db)
+    encoding = db.obter_alteracoes_pessoas(0)[1][0][6]
+
+    # O gerenciador cadastra e reconstrói o arquivo (troca com os.replace)
+    db.adicionar_pessoa_conhecida("Nova 1", None, None, None, None, encoding)
+    gerenciador.sincronizar(db)
+    gerenciador.reconstruir(db)
+
+    # O reconhecimento grava o próximo cadastro no arquivo atual, não no antigo
+    db.adicionar_pessoa_conhecida("Nova 2", None, None, None, None, encoding)
+    assert reconhecimento.sincronizar(db) >= 1
+    assert sorted(reconhecimento.ids.tolist()) == [1, 2, 3, 4, 5]
+
+    reaberto = ArmazemEncodings(caminho)
+    assert reaberto.versao == db.obter_versao_galeria()
+    assert sorted(reaberto.ids.tolist()) == [1, 2, 3, 4, 5]
+
+    # E o gerenciador continua depois das linhas do reconhecimento
+    db.adicionar_pessoa_conhecida("Nova 3", None, None, None, None, encoding)
+    gerenciador.sincronizar(db)
+    assert sorted(ArmazemEncodings(caminho).ids.tolist()) == [1, 2, 3, 4, 5, 6]
@@ -0,0 +1,106 @@
+import sqlite3
+import time
+
+import pytest
+
+from database import DatabaseManager
+
+
+def test_migracao_carrega_pessoas_existentes(banco_original):
+    db = DatabaseManager(banco_original)
+
+    versao, pessoas, removidas = db.obter_alteracoes_pessoas(0)
+
+    assert versao > 0
+    assert sorted(pessoa[1] for pessoa in pessoas) == ["Pessoa 0", "Pessoa 1", "Pessoa 2"]
+    assert removidas == []
+    assert db.obter_alteracoes_pessoas(versao)[1] == []
+
+
+def test_lote_de_importacao_gravado_uma_unica_vez(banco_original):
+    db = DatabaseManager(banco_original)
+    pessoas = [(f"Importada {i}", None, None, None, None, b'\x00' * 64) for i in range(4)]
+
+    assert db.adicionar_pessoas_conhecidas(pessoas, lote='lote-1') == 4
+    assert db.adicionar_pessoas_conhecidas(pessoas, lote='lote-1') == 0
+    assert db.adicionar_pessoas_conhecidas(pessoas[:1], lote='lote-2') == 1
+
+    nomes = [pessoa[1] for pessoa in db.obter_alteracoes_pessoas(0)[1]]
+    assert sum(nome.startswith("Importada") for nome in nomes) == 5
+
+
+@pytest.fixture
+def fuso_sao_paulo(monkeypatch):
+    """Fuso local UTC-3: a virada do dia local fica às 03:00 UTC"""
+    if not hasattr(time, 'tzset'):
+        pytest.skip("time.tzset indisponível")
+    monkeypatch.setenv('TZ', 'America/Sao_Paulo')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _registrar(db, registros):
+    conn = db._conectar()
+    conn.executemany(
+        'INSERT INTO registros_presenca (pessoa_id, tipo_pessoa, confianca, data_presenca) VALUES (?, ?, ?, ?)',
+        registros
+    )
+    conn.commit()
+
+
+def test_resumos_e_consultas_por_periodo_concordam_na_virada_do_dia(tmp_path, fuso_sao_paulo):
+    db = DatabaseManager(str(tmp_path / 'presencas.db'))
+    _registrar(db, [
+        (1, 'conhecida', 0.9, '2026-03-01 02:30:00'),     # 28/02 23:30 local
+        (2, 'desconhecida', 0.0, '2026-03-01 02:59:59'),  # 28/02 23:59 local
+        (1, 'conhecida', 0.9, '2026-03-01 03:00:00'),     # 01/03 00:00 local
+        (None, 'desconhecida', 0.0, '2026-03-01 03:30:00'),
+        (1, 'conhecida', 0.8, '2026-03-01 14:00:00'),
+    ])
+
+    dias = {dia: deteccoes for dia, deteccoes, _, _ in db.obter_presencas_diarias()}
+    assert dias == {'2026-02-28': 2, '2026-03-01': 3}
+
+    for dia, deteccoes in dias.items():
+        assert db.resumo_presencas(dia, dia)[0] == deteccoes
+    assert db.resumo_presencas() == db.resumo_presencas('2026-02-01', '2026-03-31') == (5, 3, 2)
+
+    # O trigger e a reconstrução completa chegam aos mesmos resumos
+    antes = db.obter_presencas_diarias()
+    db.recalcular_resumos_presenca()
+    assert db.obter_presencas_diarias() == antes
+
+
+def test_presencas_diarias_com_limite(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'presencas.db'))
+    _registrar(db, [(1, 'conhecida', 0.9, f'2026-03-{dia:02d} 15:00:00') for dia in range(1, 11)])
+
+    dias = db.obter_presencas_diarias(limite=3)
+
+    assert [dia for dia, _, _, _ in dias] == ['2026-03-10', '2026-03-09', '2026-03-08']
+
+
+def test_falha_na_gravacao_desfaz_so_a_propria_transacao(banco_original):
+    db = DatabaseManager(banco_original)
+    db.gravar_lote([("TEMP_A", b'\x00' * 64, '2024-01-01 10:00:00')], [], [])
+
+    # codigo_temp repetido: o lote inteiro é desfeito e a conexão fica livre
+    with pytest.raises(sqlite3.IntegrityError):
+        db.gravar_lote([("TEMP_A", b'\x00' * 64, '2024-01-01 11:00:00')], [],
+                       [(1, None, 'conhecida', 0.9, '2024-01-01 11:00:00')])
+    assert not db._conectar().in_transaction
+
+    # Trabalho pendente de quem chama não é descartado por outra chamada
+    conn = db._conectar()
+    conn.execute("UPDATE configuracoes SET valor = '0.7' WHERE chave = 'tolerancia_reconhecimento'")
+    assert db.obter_configuracao('tolerancia_reconhecimento') == '0.7'
+    conn.commit()
+
+    externa = sqlite3.connect(banco_original)
+    assert externa.execute(
+        "SELECT valor FROM configuracoes WHERE chave = 'tolerancia_reconhecimento'"
+    ).fetchone()[0] == '0.7'
+    assert externa.execute('SELECT COUNT(*) FROM registros_presenca').fetchone()[0] == 0
+    externa.close()
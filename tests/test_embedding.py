@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from embedding import ExtratorEmbedding
+
+
+def _malha(total, semente):
+    rng = np.random.default_rng(semente)
+    return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y) for x, y in rng.uniform(0.2, 0.8, (total, 2))])
+
+
+def test_extrair_lote_sempre_devolve_matriz():
+    extrator = ExtratorEmbedding()
+    imagem = np.zeros((480, 640, 3), dtype=np.uint8)
+    incompleta = int(extrator.indices_usados[-2]) + 1
+
+    for totais in ((468, 468), (incompleta, incompleta), (468, incompleta)):
+        malhas = [_malha(total, semente) for semente, total in enumerate(totais)]
+        lote = extrator.extrair_lote(imagem, malhas)
+
+        assert isinstance(lote, np.ndarray) and lote.ndim == 2
+        assert lote.shape[0] == len(malhas) and 0 < lote.shape[1] <= extrator.dimensao
+        np.testing.assert_allclose(np.linalg.norm(lote, axis=1), 1.0)
+        if len(set(totais)) == 1:
+            for linha, malha in zip(lote, malhas):
+                assert np.array_equal(linha, extrator.extrair(imagem, malha))
+
+    assert extrator.extrair_lote(imagem, []).shape == (0, extrator.dimensao)
@@ -0,0 +1,28 @@
+import sqlite3
+
+from database import DatabaseManager
+from escritor_presencas import EscritorPresencas
+
+
+def test_linha_com_falha_nao_perde_o_restante_do_lote(banco_original):
+    db = DatabaseManager(banco_original)
+    db.gravar_lote([("TEMP_REPETIDO", b'\x00' * 64, '2024-01-01 10:00:00')], [], [])
+
+    escritor = EscritorPresencas(db, max_lote=100, intervalo_ms=60000)
+    escritor.registrar_presenca(1, 'conhecida', 0.9, '2024-01-01 11:00:00')
+    # Colisão de codigo_temp: a inserção e a presença dessa desconhecida falham
+    escritor.fila.put(('desconhecida', ("TEMP_REPETIDO", b'\x01' * 64, '2024-01-01 11:00:01')))
+    escritor.registrar_presenca_desconhecida("TEMP_REPETIDO", 0.0, '2024-01-01 11:00:01')
+    codigo = escritor.adicionar_pessoa_desconhecida(b'\x02' * 64, '2024-01-01 11:00:02')
+    escritor.registrar_presenca_desconhecida(codigo, 0.0, '2024-01-01 11:00:02')
+    escritor.registrar_presenca(2, 'conhecida', 0.8, '2024-01-01 11:00:03')
+    escritor.parar()
+
+    assert (escritor.gravados, escritor.descartados) == (4, 2)
+    conn = sqlite3.connect(banco_original)
+    presencas = conn.execute(
+        'SELECT pessoa_id, tipo_pessoa FROM registros_presenca ORDER BY data_presenca'
+    ).fetchall()
+    conn.close()
+    assert [tipo for _, tipo in presencas] == ['conhecida', 'desconhecida', 'conhecida']
+    assert presencas[0][0] == 1 and presencas[2][0] == 2
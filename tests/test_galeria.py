@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+
+from galeria import GaleriaFacial
+from indice_galeria import IndiceIVF, carregar_indice, criar_indice
+
+
+def _vetores(quantidade, dimensao=8, semente=0):
+    return np.random.default_rng(semente).normal(size=(quantidade, dimensao)).astype(np.float32)
+
+
+def test_adicionar_usa_reserva_sem_copiar_a_cada_inclusao():
+    galeria = GaleriaFacial()
+    vetores = _vetores(100)
+    reservas = set()
+    for chave, vetor in enumerate(vetores):
+        galeria.adicionar(chave, vetor)
+        reservas.add(id(galeria._reserva[1]))
+
+    # Capacidade dobrando: poucas realocações para 100 inclusões
+    assert len(reservas) <= 4
+    assert len(galeria) == 100
+    for chave, vetor in enumerate(vetores):
+        assert galeria.reconhecer(vetor, 0.99)[0] == chave
+
+
+def test_remover_nao_altera_vistas_anteriores():
+    galeria = GaleriaFacial()
+    vetores = _vetores(10)
+    for chave, vetor in enumerate(vetores):
+        galeria.adicionar(chave, vetor)
+    ids_anteriores = galeria.ids
+
+    galeria.remover([0, 1, 2])
+    assert galeria.ids.tolist() == list(range(3, 10))
+    assert ids_anteriores.tolist() == list(range(10))
+    assert galeria.reconhecer(vetores[0], 0.99) == (None, 0.0)
+
+    galeria.adicionar(10, vetores[0])
+    assert galeria.reconhecer(vetores[0], 0.99)[0] == 10
+    assert ids_anteriores.tolist() == list(range(10))
+
+
+def test_indice_salvo_pela_versao_e_gravado_so_quando_pedido(tmp_path, monkeypatch):
+    caminho = str(tmp_path / 'galeria.indice.npz')
+    vetores = _vetores(200, semente=1)
+    galeria = GaleriaFacial(np.arange(200), vetores, indice=criar_indice('ivf', n_sondas=2),
+                            caminho_indice=caminho, versao=5)
+    assert os.path.exists(caminho) and not galeria.indice_pendente
+
+    # Alteração incremental: índice atualizado em memória, arquivo intacto
+    gravado = os.path.getmtime(caminho)
+    nova = galeria.com_alteracoes({0}, [200], _vetores(1, semente=2), versao=6)
+    assert nova.indice_pendente
+    assert os.path.getmtime(caminho) == gravado
+
+    assert nova.persistir_indice()
+    assert not nova.indice_pendente
+
+    # Mesma versão e mesmas linhas: o índice salvo é restaurado sem treinar
+    def treinar(*args):
+        raise AssertionError("índice treinado de novo")
+
+    with monkeypatch.context() as contexto:
+        contexto.setattr(IndiceIVF, '_treinar', treinar)
+        restaurada = GaleriaFacial.sobre_arrays(nova.ids, nova.matriz, indice=criar_indice('ivf', n_sondas=2),
+                                                caminho_indice=caminho, versao=6)
+    assert np.array_equal(restaurada.indice.ordem, nova.indice.ordem)
+
+    # Outra versão no banco: o arquivo salvo não vale
+    indice = criar_indice('ivf', n_sondas=2)
+    assert not carregar_indice(caminho, indice, nova.matriz, nova.ids, 7)
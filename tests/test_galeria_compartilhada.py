@@ -0,0 +1,17 @@
+import numpy as np
+
+from galeria import GaleriaFacial
+from galeria_compartilhada import PublicadorGaleria
+
+
+def test_varios_publicadores_no_mesmo_processo():
+    galeria = GaleriaFacial(np.arange(4), np.random.default_rng(0).normal(size=(4, 8)))
+    primeiro = PublicadorGaleria()
+    segundo = PublicadorGaleria()
+    try:
+        assert primeiro.nome != segundo.nome
+        assert primeiro.publicar(galeria, 1) == 1
+        assert segundo.publicar(galeria, 2) == 1
+    finally:
+        primeiro.fechar()
+        segundo.fechar()
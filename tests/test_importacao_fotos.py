@@ -0,0 +1,52 @@
+import csv
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+
+from database import DatabaseManager
+from importacao_fotos import DiarioImportacao, importar_fotos
+
+
+def _preparar_importacao(tmp_path, quantidade=3):
+    """CSV com as fotos já processadas no diário: a importação só grava no banco"""
+    caminho_csv = str(tmp_path / 'cadastro.csv')
+    with open(caminho_csv, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(['arquivo', 'nome'])
+        escritor.writerows((f"foto{i}.jpg", f"Pessoa {i}") for i in range(quantidade))
+
+    diario = DiarioImportacao(caminho_csv + '.importacao')
+    rng = np.random.default_rng(0)
+    for i in range(quantidade):
+        diario.registrar(f"foto{i}.jpg", rng.normal(size=16).astype(np.float32), 1.0)
+    diario.fechar()
+    return caminho_csv
+
+
+def _total_pessoas(caminho_banco):
+    db = DatabaseManager(caminho_banco)
+    try:
+        return len(db.obter_alteracoes_pessoas(0)[1])
+    finally:
+        db.fechar()
+
+
+def test_interrupcao_antes_da_conclusao_nao_duplica(tmp_path, monkeypatch):
+    caminho_csv = _preparar_importacao(tmp_path)
+    caminho_banco = str(tmp_path / 'banco.db')
+
+    # Queda entre a gravação no banco e a linha de conclusão do diário
+    def interromper(self, pessoas):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as contexto:
+        contexto.setattr(DiarioImportacao, 'concluir', interromper)
+        with pytest.raises(KeyboardInterrupt):
+            importar_fotos(caminho_csv, db_path=caminho_banco)
+    assert _total_pessoas(caminho_banco) == 3
+
+    importar_fotos(caminho_csv, db_path=caminho_banco)
+    assert _total_pessoas(caminho_banco) == 3
+    assert DiarioImportacao(caminho_csv + '.importacao').concluido
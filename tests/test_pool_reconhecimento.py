@@ -0,0 +1,45 @@
+import threading
+
+from pipeline_video import FilaProcessamento
+from pool_reconhecimento import PoolReconhecimento
+
+
+def _pool(trabalhadores=2):
+    registrados = []
+    lock = threading.Lock()
+
+    def reconhecer(encodings):
+        return [(encoding, 1.0) for encoding in encodings]
+
+    def registrar(item, resultado):
+        with lock:
+            registrados.append(resultado[0])
+
+    fila = FilaProcessamento(capacidade=100, politica='bloquear')
+    return PoolReconhecimento(fila, reconhecer, registrar, trabalhadores=trabalhadores, tamanho_lote=4), registrados
+
+
+def _sessao(pool, inicio, total=20):
+    pool.iniciar()
+    for i in range(inicio, inicio + total):
+        assert pool.fila.colocar((i, None, i, 0.0))
+    pool.parar()
+
+
+def test_pool_reinicia_depois_de_parar():
+    pool, registrados = _pool()
+
+    _sessao(pool, 0)
+    assert not pool.ativo
+    _sessao(pool, 100)
+
+    assert sorted(registrados) == list(range(20)) + list(range(100, 120))
+
+
+def test_iniciar_duas_vezes_nao_duplica_trabalhadores():
+    pool, _ = _pool(trabalhadores=3)
+    pool.iniciar()
+    pool.iniciar()
+
+    assert len(pool._threads) == 3
+    pool.parar()
@@ -0,0 +1,19 @@
+import sys
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('cv2')
+
+import processamento_lote
+
+
+def test_inicio_recusado_para_diretorio(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(sys, 'argv', ['processamento_lote.py', str(tmp_path), '--inicio', '2024-01-07 09:00:00'])
+    with pytest.raises(SystemExit) as saida:
+        processamento_lote.main()
+    assert saida.value.code == 2
+    assert "--inicio" in capsys.readouterr().err
+
+    with pytest.raises(ValueError):
+        processamento_lote.processar_gravacoes(str(tmp_path), inicio=datetime(2024, 1, 7, 9))
@@ -0,0 +1,139 @@
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+pytest.importorskip('mediapipe')
+
+import reconhecimento_facial
+from pipeline_video import FilaProcessamento
+from pool_reconhecimento import PoolReconhecimento
+from reconhecimento_facial import FaceRecognitionSystem
+
+
+class CameraFalsa:
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+
+class PipelineFalso:
+    def __init__(self, cap, processar):
+        pass
+
+    def iniciar(self):
+        pass
+
+    def parar(self):
+        pass
+
+
+class EscritorFalso:
+    def descarregar(self):
+        pass
+
+
+def test_duas_sessoes_seguidas_reconhecem(monkeypatch):
+    registrados = []
+    lock = threading.Lock()
+
+    def registrar(item, resultado):
+        with lock:
+            registrados.append(item[0])
+
+    # Sistema montado sem câmera nem MediaPipe: só o que a sessão usa
+    sistema = FaceRecognitionSystem.__new__(FaceRecognitionSystem)
+    sistema.fila_processamento = FilaProcessamento(capacidade=16, politica='bloquear')
+    sistema.pool_reconhecimento = PoolReconhecimento(
+        sistema.fila_processamento, lambda encodings: [(None, 0.0)] * len(encodings), registrar
+    )
+    sistema.pool_reconhecimento.iniciar()
+    sistema.escritor = EscritorFalso()
+    sistema.desenhar = True
+
+    def executar(self, pipeline, *args):
+        # Cada sessão produz uma face e termina
+        assert self.fila_processamento.colocar((f"face {len(registrados)}", None, 0, 0.0))
+
+    monkeypatch.setattr(reconhecimento_facial.cv2, 'VideoCapture', lambda indice: CameraFalsa())
+    monkeypatch.setattr(reconhecimento_facial, 'PipelineVideo', PipelineFalso)
+    monkeypatch.setattr(FaceRecognitionSystem, '_executar_sem_interface', executar)
+    monkeypatch.setattr(FaceRecognitionSystem, 'iniciar_sincronizacao', lambda self: None)
+    monkeypatch.setattr(FaceRecognitionSystem, 'parar_sincronizacao', lambda self: None)
+    monkeypatch.setattr(FaceRecognitionSystem, 'resumo_desempenho', lambda self, pipeline: [])
+
+    sistema.iniciar_reconhecimento(sem_interface=True)
+    sistema.iniciar_reconhecimento(sem_interface=True)
+
+    assert registrados == ["face 0", "face 1"]
+
+
+def test_cache_de_desconhecidos_respeita_o_limite():
+    sistema = FaceRecognitionSystem.__new__(FaceRecognitionSystem)
+    sistema.limite_desconhecidas = 10
+    sistema.pessoas_desconhecidas = reconhecimento_facial.OrderedDict()
+    sistema.galeria_desconhecidas = reconhecimento_facial.GaleriaFacial()
+    vetores = np.random.default_rng(0).normal(size=(30, 8)).astype(np.float32)
+
+    for chave, vetor in enumerate(vetores):
+        sistema.pessoas_desconhecidas[chave] = f"DESC_{chave}"
+        sistema.galeria_desconhecidas.adicionar(chave, vetor)
+        # O primeiro visitante continua sendo visto
+        sistema.pessoas_desconhecidas.move_to_end(0)
+        sistema._podar_desconhecidas()
+
+    assert len(sistema.pessoas_desconhecidas) <= 10
+    assert sorted(sistema.galeria_desconhecidas.ids.tolist()) == sorted(sistema.pessoas_desconhecidas)
+    assert 0 in sistema.pessoas_desconhecidas
+    assert 29 in sistema.pessoas_desconhecidas
+
+
+def test_reconhecimento_recusado_sem_trabalhadores(monkeypatch, capsys):
+    sistema = FaceRecognitionSystem.__new__(FaceRecognitionSystem)
+    sistema.pool_reconhecimento = None
+
+    def abrir_camera(indice):
+        raise AssertionError("câmera aberta sem trabalhadores")
+    monkeypatch.setattr(reconhecimento_facial.cv2, 'VideoCapture', abrir_camera)
+
+    sistema.iniciar_reconhecimento(sem_interface=True)
+    assert "não está disponível" in capsys.readouterr().out
+
+
+class EscritorDesconhecidas:
+    def __init__(self):
+        self.codigos = []
+
+    def adicionar_pessoa_desconhecida(self, encoding, data):
+        self.codigos.append(f"TEMP_{len(self.codigos)}")
+        return self.codigos[-1]
+
+    def registrar_presenca_desconhecida(self, *args):
+        pass
+
+    def atualizar_deteccao_desconhecida(self, *args):
+        pass
+
+
+def test_desconhecidos_parecidos_nao_viram_o_mesmo_visitante():
+    sistema = FaceRecognitionSystem.__new__(FaceRecognitionSystem)
+    sistema.tolerancia = 0.6
+    sistema.tolerancia_desconhecidas = 0.998
+    sistema.limite_desconhecidas = 10
+    sistema.pessoas_desconhecidas = reconhecimento_facial.OrderedDict()
+    sistema.galeria_desconhecidas = reconhecimento_facial.GaleriaFacial()
+    sistema._proxima_chave_desconhecida = 0
+    sistema.deteccoes_recentes = reconhecimento_facial.JanelaDeteccoes(0)
+    sistema.escritor = EscritorDesconhecidas()
+
+    # Dois rostos com similaridade 0.99: acima da tolerância de reconhecimento,
+    # mas ainda duas pessoas diferentes
+    primeiro = np.array([1.0, 0.0])
+    segundo = np.array([0.99, np.sqrt(1 - 0.99 ** 2)])
+    for encoding in (primeiro, segundo, primeiro):
+        sistema._registrar_deteccao(encoding, None, 0.0)
+
+    assert sistema.escritor.codigos == ["TEMP_0", "TEMP_1"]